@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Pos = Tuple[int, int]
+
+_OFFSETS4 = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class ArticulationOracle:
+    """
+    Egy rögzített cellahalmaz 4-szomszédsági gráfjának DFS-erdője Tarjan-féle
+    alacsony értékekkel (disc / low), egyszer felépítve O(n) időben. Ebből pontosan,
+    BFS nélkül megválaszolható, hogy egy cella elvétele, hozzáadása vagy egy modul
+    áthelyezése után összefüggő marad-e a halmaz: egy cella elvétele után a komponense
+    a DFS-fában szétváló gyerek-részfákra és a szülő felőli részre bomlik, így
+    elég megnézni, hogy a célcella szomszédai minden darabot érintenek-e.
+    A halmaz változása után új oracle-t kell építeni.
+    """
+    __slots__ = ('_cells', '_disc', '_low', '_last', '_parent', '_children', '_comp', '_components',
+                 '_articulation')
+
+    def __init__(self, cells: Iterable[Pos]):
+        self._cells: Set[Pos] = cells if isinstance(cells, (set, frozenset)) else set(cells)
+        # felfedezési idő, a részfából elérhető legkorábbi idő és a részfa utolsó ideje
+        self._disc: Dict[Pos, int] = {}
+        self._low: Dict[Pos, int] = {}
+        self._last: Dict[Pos, int] = {}
+        self._parent: Dict[Pos, Optional[Pos]] = {}
+        self._children: Dict[Pos, List[Pos]] = {}
+        # cella -> a DFS-fájának gyökere (komponensazonosító)
+        self._comp: Dict[Pos, Pos] = {}
+        self._components = 0
+        self._articulation: Optional[Set[Pos]] = None
+        self._build()
+
+    def _build(self) -> None:
+        cells = self._cells
+        disc, low, last = self._disc, self._low, self._last
+        parent, children, comp = self._parent, self._children, self._comp
+        t = 0
+        for root in cells:
+            if root in disc:
+                continue
+            self._components += 1
+            disc[root] = low[root] = t
+            t += 1
+            parent[root] = None
+            children[root] = []
+            comp[root] = root
+            # (cella, a következő vizsgálandó szomszéd indexe)
+            stack = [[root, 0]]
+            while stack:
+                frame = stack[-1]
+                v = frame[0]
+                i = frame[1]
+                while i < 4:
+                    dx, dy = _OFFSETS4[i]
+                    i += 1
+                    w = (v[0] + dx, v[1] + dy)
+                    if w not in cells:
+                        continue
+                    dw = disc.get(w)
+                    if dw is None:
+                        disc[w] = low[w] = t
+                        t += 1
+                        parent[w] = v
+                        children[w] = []
+                        children[v].append(w)
+                        comp[w] = root
+                        frame[1] = i
+                        stack.append([w, 0])
+                        break
+                    if w != parent[v] and dw < low[v]:
+                        low[v] = dw
+                else:
+                    stack.pop()
+                    last[v] = t - 1
+                    p = parent[v]
+                    if p is not None and low[v] < low[p]:
+                        low[p] = low[v]
+
+    def __contains__(self, p: Pos) -> bool:
+        return p in self._cells
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    @property
+    def components(self) -> int:
+        """A halmaz 4-összefüggő komponenseinek száma."""
+        return self._components
+
+    @property
+    def connected(self) -> bool:
+        return self._components <= 1
+
+    def is_articulation(self, p: Pos) -> bool:
+        """Elvágó pont-e p, azaz több darabra bontja-e a komponensét az elvétele."""
+        return p in self._cells and self._pieces_without(p) - (self._components - 1) > 1
+
+    def articulation_points(self) -> Set[Pos]:
+        if self._articulation is None:
+            self._articulation = {p for p in self._cells if self.is_articulation(p)}
+        return self._articulation
+
+    def _separated(self, src: Pos) -> int:
+        """src azon gyerekeinek száma, amelyek részfája src nélkül leszakad."""
+        d = self._disc[src]
+        low = self._low
+        return sum(1 for c in self._children[src] if low[c] >= d)
+
+    def _pieces_without(self, src: Pos) -> int:
+        """A halmaz komponenseinek száma src elvétele után."""
+        own = self._separated(src) + (0 if self._parent[src] is None else 1)
+        return self._components - 1 + own
+
+    def _piece(self, q: Pos, src: Pos):
+        """Melyik darabba esik q (q != src) src elvétele után."""
+        comp = self._comp[q]
+        if comp != self._comp[src]:
+            return comp
+        disc = self._disc
+        dq = disc[q]
+        if dq < disc[src] or dq > self._last[src]:
+            # nem src részfájában van: a szülő felőli darab
+            return None
+        for c in self._children[src]:
+            if disc[c] <= dq <= self._last[c]:
+                return c if self._low[c] >= disc[src] else None
+        return None
+
+    def can_remove(self, p: Pos) -> bool:
+        """Összefüggő marad-e a halmaz a p cella elvétele után."""
+        if p not in self._cells:
+            return self.connected
+        return self._pieces_without(p) <= 1
+
+    def can_add(self, p: Pos) -> bool:
+        """Összefüggő lesz-e a halmaz a (szabad) p cella hozzáadása után."""
+        if p in self._cells:
+            return self.connected
+        if self._components == 0:
+            return True
+        comp = self._comp
+        cells = self._cells
+        x, y = p
+        touched = {comp[q] for q in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)) if q in cells}
+        return len(touched) == self._components
+
+    def can_move(self, src: Pos, dst: Pos) -> bool:
+        """
+        Összefüggő-e a (halmaz - {src}) | {dst} halmaz. A szomszédosság nem feltétel;
+        a foglalt dst vagy a halmazon kívüli src esetek is pontosak.
+        """
+        cells = self._cells
+        if src not in cells:
+            return self.can_add(dst)
+        if dst == src:
+            return self.connected
+        if dst in cells:
+            return self.can_remove(src)
+        pieces = self._pieces_without(src)
+        if pieces == 0:
+            return True
+        if pieces > 4:
+            return False
+        x, y = dst
+        touched = {self._piece(q, src)
+                   for q in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+                   if q != src and q in cells}
+        return len(touched) == pieces
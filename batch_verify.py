@@ -0,0 +1,168 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from connectivity import is_connected
+from zobrist import configuration_hash, zobrist_key
+
+Pos = Tuple[int, int]
+Moves = Dict[int, Tuple[Pos, Pos]]
+
+# a változott cellák körül ekkora sugarú ablakokban épül a lokális union-find
+LOCAL_RADIUS = 2
+
+
+class _UnionFind:
+    __slots__ = ('parent', 'size', 'open')
+
+    def __init__(self):
+        self.parent: Dict[Pos, Pos] = {}
+        self.size: Dict[Pos, int] = {}
+        # gyökér -> van-e a halmaznak foglalt szomszédja a vizsgált tartományon kívül
+        self.open: Dict[Pos, bool] = {}
+
+    def add(self, p: Pos) -> None:
+        if p not in self.parent:
+            self.parent[p] = p
+            self.size[p] = 1
+            self.open[p] = False
+
+    def find(self, p: Pos) -> Pos:
+        parent = self.parent
+        while parent[p] != p:
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    def union(self, a: Pos, b: Pos) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        self.open[ra] = self.open[ra] or self.open[rb]
+
+
+class MoveSetVerifier:
+    """
+    Egy rögzített konfiguráció (cells) és rajta végrehajtott mozgáshalmazok: összefüggő
+    marad-e a (cells - források) | célok halmaz. Ha cells összefüggő, az új halmaz minden
+    komponense tartalmaz egy célcellát vagy egy kiürült cella szomszédját, ezért elég
+    ezeket a "terminálokat" összekötni: a union-find csak a változott cellák körüli kis
+    ablakokban épül, a változatlan rész összefüggőségét pedig a cells-ről tudjuk.
+    Ha a lokális kép nem dönt, a teljes új halmazon fut union-find; ennek verdiktje a
+    CONNECTIVITY_CACHE-be kerül, a cells Zobrist-hash-éből a változott cellákkal képzett kulccsal.
+    """
+
+    def __init__(self, cells: Set[Pos], connected: Optional[bool] = None, radius: int = LOCAL_RADIUS,
+                 key: Optional[int] = None):
+        self.cells = cells
+        self.radius = radius
+        if connected is None:
+            connected = is_connected(cells)
+        self.connected = connected
+        # a cells hash-e: a hívó megadhatja, különben az első teljes ellenőrzéskor számoljuk
+        self._key = key
+
+    def is_connected_after(self, moves: Iterable[Tuple[Pos, Pos]]) -> bool:
+        """moves: (forrás, cél) párok; a forrásokat egyszerre ürítjük, a célokat egyszerre töltjük."""
+        vacated: Set[Pos] = set()
+        arrived: Set[Pos] = set()
+        for src, tgt in moves:
+            vacated.add(src)
+            arrived.add(tgt)
+        return self.is_connected_after_change(vacated, arrived)
+
+    def is_connected_after_change(self, vacated: Set[Pos], arrived: Set[Pos]) -> bool:
+        """Összefüggő-e a (cells - vacated) | arrived halmaz."""
+        cells = self.cells
+
+        def member(p: Pos) -> bool:
+            return p in arrived or (p in cells and p not in vacated)
+
+        removed = vacated & cells
+        if not self.connected or not removed:
+            # a terminálos érvelés egy összefüggő, ténylegesen megbontott konfigurációra épül
+            return self._full(vacated, arrived)
+
+        terminals = set(arrived)
+        for x, y in removed:
+            for q in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if member(q):
+                    terminals.add(q)
+        if len(terminals) <= 1:
+            return True
+
+        verdict = self._local(member, vacated | arrived, terminals)
+        if verdict is not None:
+            return verdict
+        return self._full(vacated, arrived)
+
+    def _local(self, member, changed: Set[Pos], terminals: Set[Pos]) -> Optional[bool]:
+        r = self.radius
+        region: Set[Pos] = set()
+        for cx, cy in changed:
+            for dx in range(-r, r + 1):
+                for dy in range(-r, r + 1):
+                    region.add((cx + dx, cy + dy))
+        uf = _UnionFind()
+        for p in region:
+            if member(p):
+                uf.add(p)
+        for p in list(uf.parent):
+            x, y = p
+            for q in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if q in region:
+                    if q in uf.parent:
+                        uf.union(p, q)
+                elif member(q):
+                    root = uf.find(p)
+                    uf.open[root] = True
+        roots = {uf.find(t) for t in terminals}
+        if len(roots) == 1:
+            return True
+        if any(not uf.open[root] for root in roots):
+            # van olyan terminál-komponens, amely teljesen a tartományon belül záródik,
+            # miközben más terminál nincs benne: biztosan szétesik
+            return False
+        return None
+
+    def _full(self, vacated: Set[Pos], arrived: Set[Pos]) -> bool:
+        cells = self.cells
+        if self._key is None:
+            self._key = configuration_hash(cells)
+        key = self._key
+        for p in vacated:
+            if p in cells and p not in arrived:
+                key ^= zobrist_key(p)
+        for p in arrived:
+            if p not in cells:
+                key ^= zobrist_key(p)
+        after = {p for p in cells if p not in vacated} | arrived
+        return is_connected(after, key)
+
+    def failing_subset(self, moves: Moves) -> List[int]:
+        """
+        Ha a mozgáshalmaz szétbontja a konfigurációt, a bűnös mozgások id-i: egyetlen
+        mozgás, ha önmagában is szétbont, egyébként egy tartalmazásra minimális részhalmaz
+        (egyik eleme sem hagyható el úgy, hogy továbbra is szétbontson). Üres lista, ha
+        a teljes halmaz biztonságos.
+        """
+        if self.is_connected_after(moves.values()):
+            return []
+        mids = sorted(moves)
+        for mid in mids:
+            if not self.is_connected_after((moves[mid],)):
+                return [mid]
+        # a szétbontás nem monoton a részhalmazokra: egy korábban megtartott elem a
+        # kisebb halmazból már elhagyható lehet, ezért a törlő kört a fixpontig ismételjük
+        culprits = list(mids)
+        changed = True
+        while changed:
+            changed = False
+            for mid in list(culprits):
+                trial = [m for m in culprits if m != mid]
+                if trial and not self.is_connected_after(moves[m] for m in trial):
+                    culprits = trial
+                    changed = True
+        return culprits
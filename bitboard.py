@@ -0,0 +1,107 @@
+from typing import Iterable, Iterator, Tuple
+
+Pos = Tuple[int, int]
+
+
+class BitboardFrame:
+    """
+    Egy téglalap alakú rácsrészlet sorfolytonos bitkiosztása: az (x, y) cella bitje
+    (y - y0) * width + (x - x0). Egy konfiguráció így egyetlen Python int, amelyet
+    C sebességgel lehet összehasonlítani (==), hash-elni, kombinálni (&, |, ^) és
+    megszámolni (bit_count). Csak az azonos frame-ben kódolt bitboardok vethetők össze.
+    """
+    __slots__ = ('x0', 'y0', 'width', 'height', 'full', '_not_first_col', '_not_last_col')
+
+    def __init__(self, x0: int, y0: int, width: int, height: int):
+        if width <= 0 or height <= 0:
+            raise ValueError("Bitboard frame must not be empty")
+        self.x0 = x0
+        self.y0 = y0
+        self.width = width
+        self.height = height
+        self.full = (1 << (width * height)) - 1
+        first_col = 0
+        for row in range(height):
+            first_col |= 1 << (row * width)
+        # oszlopmaszkok, hogy a vízszintes eltolás ne csorduljon át a szomszéd sorba
+        self._not_first_col = self.full & ~first_col
+        self._not_last_col = self.full & ~(first_col << (width - 1))
+
+    @classmethod
+    def around(cls, positions: Iterable[Pos], margin: int = 0) -> "BitboardFrame":
+        """A pozíciók befoglaló téglalapja, minden irányban `margin` cellával bővítve."""
+        positions = list(positions)
+        if not positions:
+            return cls(0, 0, 1, 1)
+        min_x = min(x for x, _ in positions) - margin
+        max_x = max(x for x, _ in positions) + margin
+        min_y = min(y for _, y in positions) - margin
+        max_y = max(y for _, y in positions) + margin
+        return cls(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
+
+    def __repr__(self) -> str:
+        return f'BitboardFrame(x0={self.x0}, y0={self.y0}, width={self.width}, height={self.height})'
+
+    def contains(self, pos: Pos) -> bool:
+        return 0 <= pos[0] - self.x0 < self.width and 0 <= pos[1] - self.y0 < self.height
+
+    def index(self, pos: Pos) -> int:
+        c = pos[0] - self.x0
+        r = pos[1] - self.y0
+        if not (0 <= c < self.width and 0 <= r < self.height):
+            raise ValueError(f"Position {pos} is outside of {self!r}")
+        return r * self.width + c
+
+    def encode(self, positions: Iterable[Pos]) -> int:
+        bits = 0
+        for pos in positions:
+            bits |= 1 << self.index(pos)
+        return bits
+
+    def decode(self, bits: int) -> Iterator[Pos]:
+        """A beállított bitek pozíciói, sorfolytonos sorrendben."""
+        width = self.width
+        while bits:
+            low = bits & -bits
+            i = low.bit_length() - 1
+            yield (self.x0 + i % width, self.y0 + i // width)
+            bits ^= low
+
+    def move(self, bits: int, sources: Iterable[Pos], targets: Iterable[Pos]) -> int:
+        """Egy párhuzamos lépés hatása: a forráscellák kiürülnek, a célcellák foglaltak lesznek."""
+        vacated = 0
+        for pos in sources:
+            vacated |= 1 << self.index(pos)
+        return (bits & ~vacated) | self.encode(targets)
+
+    @staticmethod
+    def difference(bits: int, other: int) -> int:
+        return bits & ~other
+
+    @staticmethod
+    def popcount(bits: int) -> int:
+        return bits.bit_count()
+
+    def shift(self, bits: int, dx: int, dy: int) -> int:
+        """Minden foglalt cellát (dx, dy)-nal eltol; ami kilóg a frame-ből, elveszik."""
+        for _ in range(abs(dx)):
+            if dx > 0:
+                bits = (bits << 1) & self._not_first_col
+            else:
+                bits = (bits >> 1) & self._not_last_col
+        if dy > 0:
+            bits = (bits << (dy * self.width)) & self.full
+        elif dy < 0:
+            bits >>= -dy * self.width
+        return bits
+
+    def neighbors4(self, bits: int) -> int:
+        """Azok a cellák, amelyeknek van 4-szomszédos foglalt cellája."""
+        return (self.shift(bits, 1, 0) | self.shift(bits, -1, 0)
+                | self.shift(bits, 0, 1) | self.shift(bits, 0, -1))
+
+    def neighbors8(self, bits: int) -> int:
+        """Azok a cellák, amelyeknek van 8-szomszédos foglalt cellája."""
+        sideways = self.shift(bits, 1, 0) | self.shift(bits, -1, 0)
+        row = bits | sideways
+        return sideways | self.shift(row, 0, 1) | self.shift(row, 0, -1)
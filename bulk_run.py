@@ -1,7 +1,6 @@
-import tkinter as tk
-from dumb_ui import DumbUI
 import random
 from generate_inputs import generate_input
+from pipeline import run_reconfiguration
 
 # reading config file into a list
 def load_matrix_from_file(filename="default_config_copy.txt"):
@@ -11,7 +10,6 @@ def load_matrix_from_file(filename="default_config_copy.txt"):
     return matrix
 
 if __name__ == "__main__":
-    root = tk.Tk()
     for node_num in range(20, 350):
         successful_runs = 0
         step_counts = []
@@ -31,14 +29,12 @@ if __name__ == "__main__":
 
                 perimeter = 2 * (max(x1, x2) + max(y1, y2))
 
-                stub_matrix = load_matrix_from_file("stub_phase3_matrix.txt")
-                app = DumbUI(matrix, goal_matrix)
+                # headless run: no Tk root and no UI objects in the loop
+                result = run_reconfiguration(matrix, goal_matrix)
+                if not result.success:
+                    raise RuntimeError(result.error)
+                step_count = result.step_count
 
-                step_count = 0
-                while app.phase_num < 4:
-                    app.next_step()
-                    step_count+=1
-                
                 successful_runs += 1
                 step_counts.append([i, perimeter, step_count])
                 print('step_count:', step_count)
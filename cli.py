@@ -0,0 +1,156 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import tracing
+from grid import GRID_TYPES
+from pipeline import DEFAULT_MAX_STEPS, run_reconfiguration
+
+# Parancssori futtatás: start/goal párok tervezése a teljes négyfázisú pipeline-nal,
+# gépi feldolgozásra szánt (JSON vagy pickle) kimenettel. A nyomkövetés a stderr-re
+# megy, így a stdout-ra írt eredményt nem keveri össze.
+#
+#   python cli.py configurations/ --goal configurations/001-goal.txt --jobs 4 --quiet
+
+CONFIG_SUFFIX = '.txt'
+
+
+def expand_paths(patterns: Sequence[str]) -> List[str]:
+    """Fájlok, könyvtárak (a bennük lévő *.txt) és glob minták rendezett, ismétlés nélküli listája."""
+    paths: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = glob.glob(os.path.join(pattern, '*' + CONFIG_SUFFIX))
+        elif glob.has_magic(pattern):
+            found = glob.glob(pattern)
+        else:
+            found = [pattern]
+        paths.extend(sorted(found))
+    return list(dict.fromkeys(paths))
+
+
+def pair_configurations(starts: List[str], goals: List[str]) -> List[Tuple[str, str]]:
+    """Egyetlen cél minden starthoz, egyébként azonos számú start és cél sorrendben párosítva."""
+    if len(goals) == 1:
+        return [(start, goals[0]) for start in starts]
+    if len(goals) != len(starts):
+        raise ValueError(f'{len(starts)} start and {len(goals)} goal configurations cannot be paired')
+    return list(zip(starts, goals))
+
+
+def _init_worker(quiet: bool) -> None:
+    if quiet:
+        tracing.quiet()
+    tracing.configure(stream=sys.stderr)
+
+
+def _run_pair(task: Tuple[str, str, int, str, bool]) -> Dict[str, object]:
+    start, goal, max_steps, grid, verbose = task
+    result = run_reconfiguration(start, goal, max_steps=max_steps, grid=grid, verbose=verbose)
+    return {
+        'start': start,
+        'goal': goal,
+        'success': result.success,
+        'goal_reached': result.goal_reached,
+        'phase_steps': result.phase_steps,
+        'schedule_length': result.step_count,
+        'wall_time': round(result.wall_time, 6),
+        'error': result.error,
+    }
+
+
+def plan_all(pairs: List[Tuple[str, str]], jobs: int = 1, quiet: bool = False,
+             max_steps: int = DEFAULT_MAX_STEPS, grid: str = 'dict',
+             verbose: bool = False) -> List[Dict[str, object]]:
+    """
+    Az összes pár tervezése, jobs > 1 esetén külön folyamatokban; a sorrend megmarad.
+    A fázisok nyomkövetése csak verbose (vagy SQUARES_TRACE) esetén jelenik meg.
+    """
+    tasks = [(start, goal, max_steps, grid, verbose and not quiet) for start, goal in pairs]
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_worker(quiet)
+        return [_report(_run_pair(task), quiet) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(quiet,)) as pool:
+        return [_report(record, quiet) for record in pool.map(_run_pair, tasks)]
+
+
+def _report(record: Dict[str, object], quiet: bool) -> Dict[str, object]:
+    if not quiet:
+        status = 'ok' if record['goal_reached'] else ('incomplete' if record['success'] else 'failed')
+        print(f"{record['start']}: {status}, {record['schedule_length']} steps, "
+              f"{record['wall_time']:.2f}s", file=sys.stderr)
+    return record
+
+
+def write_results(records: List[Dict[str, object]], output: Optional[str], fmt: str) -> None:
+    if fmt == 'pickle':
+        if output is None:
+            pickle.dump(records, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, 'wb') as f:
+                pickle.dump(records, f)
+        return
+    if fmt == 'jsonl':
+        text = ''.join(json.dumps(record) + '\n' for record in records)
+    else:
+        text = json.dumps(records, indent=2) + '\n'
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        with open(output, 'w') as f:
+            f.write(text)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Plan sliding-squares reconfigurations with the four-phase pipeline.')
+    parser.add_argument('start', nargs='+',
+                        help='start configuration files, directories or glob patterns')
+    parser.add_argument('-g', '--goal', nargs='+', required=True,
+                        help='goal configuration(s): one for all starts, or one per start')
+    parser.add_argument('-o', '--output', help='write results here instead of stdout')
+    parser.add_argument('-f', '--format', choices=('json', 'jsonl', 'pickle'), default='json',
+                        help='output format (default: json)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes (default: 1)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='no progress lines and no trace output')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='show the phases\' trace output (default: only with SQUARES_TRACE)')
+    parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS,
+                        help=f'abort a run after this many steps (default: {DEFAULT_MAX_STEPS})')
+    parser.add_argument('--grid', choices=tuple(GRID_TYPES), default='dict',
+                        help='grid storage: dict, numpy array, or sparse 32x32 tiles (default: dict)')
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    starts = expand_paths(args.start)
+    goals = expand_paths(args.goal)
+    if not starts:
+        parser.error('no start configurations found')
+    if not goals:
+        parser.error('no goal configurations found')
+    try:
+        pairs = pair_configurations(starts, goals)
+    except ValueError as e:
+        parser.error(str(e))
+
+    records = plan_all(pairs, jobs=args.jobs, quiet=args.quiet, max_steps=args.max_steps,
+                       grid=args.grid, verbose=args.verbose)
+    write_results(records, args.output, args.format)
+    return 0 if all(record['goal_reached'] for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+from collections import OrderedDict, deque
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from grid import ChunkedGrid
+
+try:
+    import numpy as np
+except ImportError:  # numpy nélkül a tiszta Python BFS fut
+    np = None
+
+try:
+    from scipy import ndimage
+except ImportError:  # scipy nélkül a numpy-s union-find címkéz
+    ndimage = None
+
+Pos = Tuple[int, int]
+
+# Összefüggő komponensek címkézése pozícióhalmazokon, 4-szomszédsággal. A halmazt
+# egy (keretezett) foglaltsági tömbbe írjuk, és azt címkézzük: scipy.ndimage.label,
+# ha elérhető, különben vektorizált union-find numpy-val. numpy nélkül, vagy ha a
+# halmaz kicsi és a tömb felépítése többe kerülne, a régi deque-es BFS fut.
+
+# ennél kevesebb cellára a BFS gyorsabb, mint a tömb felépítése
+VECTOR_MIN_CELLS = 128
+# ennyi konfiguráció összefüggőségi verdiktjét tartjuk meg
+CACHE_SIZE = 4096
+
+
+class VerdictCache:
+    """
+    Korlátos LRU gyorsítótár az is_connected() verdiktjeinek. A kulcs a halmaz
+    Zobrist-hash-e (ugyanaz, mint az Environment.occupancy_hash) és a cellaszám;
+    a találatokat és a tévedéseket (hits / misses) számolja.
+    """
+    __slots__ = ('maxsize', 'hits', 'misses', '_entries')
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, bool]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bool]:
+        verdict = self._entries.get(key)
+        if verdict is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return verdict
+
+    def put(self, key: Hashable, verdict: bool) -> None:
+        entries = self._entries
+        entries[key] = verdict
+        entries.move_to_end(key)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f'VerdictCache(size={len(self._entries)}, hits={self.hits}, misses={self.misses})'
+
+
+CONNECTIVITY_CACHE = VerdictCache()
+
+
+def _neighbors4(p: Pos) -> List[Pos]:
+    x, y = p
+    return [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+
+
+def _bfs_is_connected(positions: Set[Pos]) -> bool:
+    start = next(iter(positions))
+    visited = {start}
+    q = deque([start])
+    while q:
+        c = q.popleft()
+        for n in _neighbors4(c):
+            if n in positions and n not in visited:
+                visited.add(n)
+                q.append(n)
+    return len(visited) == len(positions)
+
+
+def _bfs_components(positions: Set[Pos]) -> List[Set[Pos]]:
+    components = []
+    rem = set(positions)
+    while rem:
+        start = next(iter(rem))
+        comp = set()
+        q = deque([start])
+        visited = {start}
+        while q:
+            cur = q.popleft()
+            comp.add(cur)
+            rem.discard(cur)
+            for n in _neighbors4(cur):
+                if n in rem and n not in visited:
+                    visited.add(n)
+                    q.append(n)
+        components.append(comp)
+    return components
+
+
+def _occupancy(cells: List[Pos]):
+    """Keretezett bool tömb a cellákból, és a cellák [sor, oszlop] indexei."""
+    xy = np.array(cells, dtype=np.int64)
+    cols = xy[:, 0] - xy[:, 0].min() + 1
+    rows = xy[:, 1] - xy[:, 1].min() + 1
+    occ = np.zeros((int(rows.max()) + 2, int(cols.max()) + 2), dtype=bool)
+    occ[rows, cols] = True
+    return occ, rows, cols
+
+
+def _label_union_find(occ):
+    """
+    scipy nélküli címkézés: a foglalt cellák szomszéd-élein vektorizált union-find
+    (minden körben a nagyobb gyökeret a kisebbre akasztjuk, majd pointer jumping),
+    amíg minden él két vége azonos gyökérre mutat. Címkék 1..n, háttér 0.
+    """
+    flat = occ.ravel()
+    width = occ.shape[1]
+    idx = np.flatnonzero(flat)
+    compact = np.zeros(flat.size, dtype=np.int64)
+    compact[idx] = np.arange(idx.size)
+    # a keret miatt idx + 1 és idx + width sosem fut ki a tömbből
+    right = idx[flat[idx + 1]]
+    up = idx[flat[idx + width]]
+    a = compact[np.concatenate((right, up))]
+    b = compact[np.concatenate((right + 1, up + width))]
+
+    parent = np.arange(idx.size)
+    while True:
+        pa = parent[a]
+        pb = parent[b]
+        differ = pa != pb
+        if not differ.any():
+            break
+        lo = np.minimum(pa[differ], pb[differ])
+        hi = np.maximum(pa[differ], pb[differ])
+        np.minimum.at(parent, hi, lo)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+    roots, dense = np.unique(parent, return_inverse=True)
+    labels = np.zeros(flat.size, dtype=np.int64)
+    labels[idx] = dense + 1
+    return labels.reshape(occ.shape), roots.size
+
+
+def _label(occ):
+    if ndimage is not None:
+        # az alapértelmezett struktúra 2D-ben éppen a 4-szomszédság
+        return ndimage.label(occ)
+    return _label_union_find(occ)
+
+
+def _use_vector(positions) -> bool:
+    return np is not None and len(positions) >= VECTOR_MIN_CELLS
+
+
+def is_connected(positions: Set[Pos], key: Optional[int] = None) -> bool:
+    """
+    Igaz, ha a pozíciók 4-szomszédsággal egyetlen komponenst alkotnak (üres és egyelemű
+    halmazra is). Ha a hívó megadja a halmaz már ismert Zobrist-hash-ét (`key`, pl.
+    env.occupancy_hash), a verdikt a CONNECTIVITY_CACHE-be kerül; kulcs nélkül nem
+    hash-elünk, mert az egy újabb bejárás lenne a gyorsítótár nélküli forró úton.
+    """
+    n = len(positions)
+    if n <= 1:
+        return True
+    if key is None:
+        return _compute_connected(positions)
+    verdict = CONNECTIVITY_CACHE.get((key, n))
+    if verdict is None:
+        verdict = _compute_connected(positions)
+        CONNECTIVITY_CACHE.put((key, n), verdict)
+    return verdict
+
+
+def _compute_connected(positions: Set[Pos]) -> bool:
+    if _use_vector(positions):
+        occ, _, _ = _occupancy(list(positions))
+        return int(_label(occ)[1]) == 1
+    return _bfs_is_connected(positions)
+
+
+def find_connected_components(positions: Set[Pos]) -> List[Set[Pos]]:
+    """A pozícióhalmaz komponensei; a sorrend a komponensek első cellájának bejárási sorrendje."""
+    if not positions:
+        return []
+    if not _use_vector(positions):
+        return _bfs_components(positions)
+    cells = list(positions)
+    occ, rows, cols = _occupancy(cells)
+    labels, _ = _label(occ)
+    by_label: Dict[int, Set[Pos]] = {}
+    for p, label in zip(cells, labels[rows, cols].tolist()):
+        comp = by_label.get(label)
+        if comp is None:
+            comp = by_label[label] = set()
+        comp.add(p)
+    return list(by_label.values())
+
+
+def _tile_labels(occ, cells, size: int) -> Dict[int, int]:
+    """Egy csempe foglalt celláinak (sorfolytonos index) komponenscímkéi a csempén belül."""
+    if np is not None and len(cells) >= VECTOR_MIN_CELLS:
+        tile = np.zeros((size + 2, size + 2), dtype=bool)
+        tile[1:-1, 1:-1] = np.frombuffer(occ, dtype=np.uint8).reshape(size, size) != 0
+        flat = _label(tile)[0][1:-1, 1:-1].ravel().tolist()
+        return {i: flat[i] for i in cells}
+    labels: Dict[int, int] = {}
+    area = size * size
+    n = 0
+    for start in cells:
+        if start in labels:
+            continue
+        n += 1
+        labels[start] = n
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            lx = i % size
+            for j in (i - 1 if lx else -1, i + 1 if lx < size - 1 else -1, i - size, i + size):
+                if 0 <= j < area and occ[j] and j not in labels:
+                    labels[j] = n
+                    stack.append(j)
+    return labels
+
+
+def _tile_components(grid: ChunkedGrid):
+    """
+    Csempénkénti címkézés, majd a szomszédos nem üres csempék határain union-find:
+    az üres csempékhez hozzá sem nyúlunk. Visszaad: csempe -> (index -> címke), és
+    a (csempe, címke) csúcsok gyökérkereső függvénye.
+    """
+    size = grid.chunk_size
+    labels = {key: _tile_labels(chunk.occ, chunk.values, size) for key, chunk in grid.chunks()}
+    parent: Dict[Tuple[Pos, int], Tuple[Pos, int]] = {}
+
+    def find(node):
+        root = node
+        while root in parent:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+
+    last = size - 1
+    for key, chunk in grid.chunks():
+        cx, cy = key
+        occ, own = chunk.occ, labels[key]
+        east = grid.chunk((cx + 1, cy))
+        if east is not None:
+            other, theirs = east.occ, labels[(cx + 1, cy)]
+            for row in range(0, size * size, size):
+                if occ[row + last] and other[row]:
+                    union((key, own[row + last]), ((cx + 1, cy), theirs[row]))
+        north = grid.chunk((cx, cy + 1))
+        if north is not None:
+            other, theirs = north.occ, labels[(cx, cy + 1)]
+            top = last * size
+            for lx in range(size):
+                if occ[top + lx] and other[lx]:
+                    union((key, own[top + lx]), ((cx, cy + 1), theirs[lx]))
+    return labels, find
+
+
+def grid_is_connected(grid) -> bool:
+    """
+    Az is_connected() egy rács foglalt celláira. ChunkedGrid-en csempénként címkézünk,
+    és csak a szomszédos nem üres csempék határát vizsgáljuk, így a költség a modulok
+    számával arányos; más rácson a cellahalmazon fut az is_connected(). Nem kerül a
+    gyorsítótárba: a rács tartalmának nincs karbantartott hash-e.
+    """
+    if not isinstance(grid, ChunkedGrid):
+        return is_connected(set(grid.occupied.keys()))
+    if len(grid.occupied) <= 1:
+        return True
+    labels, find = _tile_components(grid)
+    roots = set()
+    for tile, by_index in labels.items():
+        for label in set(by_index.values()):
+            roots.add(find((tile, label)))
+        if len(roots) > 1:
+            return False
+    return len(roots) == 1
+
+
+def grid_components(grid) -> List[Set[Pos]]:
+    """A find_connected_components() egy rács foglalt celláira (ChunkedGrid-en csempénként)."""
+    if not isinstance(grid, ChunkedGrid):
+        return find_connected_components(set(grid.occupied.keys()))
+    size = grid.chunk_size
+    labels, find = _tile_components(grid)
+    by_root: Dict[Tuple[Pos, int], Set[Pos]] = {}
+    for (cx, cy), by_index in labels.items():
+        for i, label in by_index.items():
+            root = find(((cx, cy), label))
+            comp = by_root.get(root)
+            if comp is None:
+                comp = by_root[root] = set()
+            comp.add((cx * size + i % size, cy * size + i // size))
+    return list(by_root.values())
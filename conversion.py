@@ -0,0 +1,159 @@
+from typing import Iterable, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy nélkül a tiszta Python út fut
+    np = None
+
+
+Pos = Tuple[int, int]
+Bounds = Tuple[int, int, int, int]
+Cell = Tuple[int, int]
+
+# Mátrix <-> pozícióhalmaz átalakítás, amit minden fázis és a UI közösen használ.
+# A mátrix GUI-tájolású (az első sor a legfelső, azaz max_y), 1 = modul; a rács
+# koordinátái (x, y) = (oszlop, sorok - 1 - sor). Ha van numpy, egy np.nonzero /
+# fancy-index lépés végzi a munkát, cellánkénti Python ciklus nélkül.
+
+
+def positions_from_matrix(matrix) -> List[Pos]:
+    """A mátrix 1-es celláinak rácspozíciói sorfolytonos (GUI) sorrendben."""
+    rows = len(matrix)
+    if rows == 0:
+        return []
+    if np is not None:
+        try:
+            arr = np.asarray(matrix)
+        except ValueError:  # eltérő hosszú sorok
+            arr = None
+        if arr is not None and arr.ndim == 2 and arr.dtype != object:
+            r, c = np.nonzero(arr == 1)
+            return list(zip(c.tolist(), (rows - 1 - r).tolist()))
+    return [(x, rows - 1 - y)
+            for y, row in enumerate(matrix)
+            for x, value in enumerate(row)
+            if value == 1]
+
+
+def bounds_of(positions: Iterable[Pos]) -> Optional[Bounds]:
+    positions = list(positions)
+    if not positions:
+        return None
+    xs = [x for x, _ in positions]
+    ys = [y for _, y in positions]
+    return (min(xs), max(xs), min(ys), max(ys))
+
+
+def matrix_from_positions(positions: Iterable[Pos], bounds: Optional[Bounds] = None) -> List[List[int]]:
+    """
+    GUI-tájolású 0/1 mátrix a `bounds` = (min_x, max_x, min_y, max_y) téglalapra
+    (alapból a pozíciók befoglaló téglalapja). A téglalapon kívüli pozíciók kimaradnak.
+    """
+    positions = list(positions)
+    if bounds is None:
+        bounds = bounds_of(positions)
+        if bounds is None:
+            return [[]]
+    min_x, max_x, min_y, max_y = bounds
+    rows = max_y - min_y + 1
+    cols = max_x - min_x + 1
+    if np is not None and positions:
+        arr = np.zeros((rows, cols), dtype=np.int8)
+        xy = np.array(positions, dtype=np.int64)
+        gx = xy[:, 0] - min_x
+        gy = max_y - xy[:, 1]
+        inside = (gx >= 0) & (gx < cols) & (gy >= 0) & (gy < rows)
+        arr[gy[inside], gx[inside]] = 1
+        return arr.tolist()
+    matrix = [[0] * cols for _ in range(rows)]
+    for x, y in positions:
+        gx = x - min_x
+        gy = max_y - y
+        if 0 <= gx < cols and 0 <= gy < rows:
+            matrix[gy][gx] = 1
+    return matrix
+
+
+class MatrixUpdate:
+    """
+    Egy MatrixMirror.update() eredménye: az új mátrix, a megváltozott cellák
+    (sor, oszlop) GUI-koordinátákban és a mátrix, amihez képest változtak. Ha a
+    mátrix mérete vagy kerete változott, `changed` None, és a teljes mátrixot újra
+    kell rajzolni.
+    """
+    __slots__ = ('matrix', 'changed', 'previous')
+
+    def __init__(self, matrix: List[List[int]], changed: Optional[List[Cell]], previous=None):
+        self.matrix = matrix
+        self.changed = changed
+        self.previous = previous
+
+    @property
+    def resized(self) -> bool:
+        return self.changed is None
+
+    def region(self) -> Optional[Tuple[int, int, int, int]]:
+        """A megváltozott cellák befoglaló téglalapja (sor0, oszlop0, sor1, oszlop1), vagy None."""
+        if not self.changed:
+            return None
+        rs = [r for r, _ in self.changed]
+        cs = [c for _, c in self.changed]
+        return (min(rs), min(cs), max(rs), max(cs))
+
+
+class MatrixMirror:
+    """
+    Az utoljára megjelenített konfiguráció és mátrixa. Az update() csak a pozícióhalmazok
+    különbségét dolgozza fel (O(n + változás), nem O(W×H)); változatlan keret esetén
+    a korábbi mátrixot nem módosítja, hanem csak a változott sorokat másolja le.
+    """
+
+    def __init__(self):
+        self._positions: Set[Pos] = set()
+        self._bounds: Optional[Bounds] = None
+        self.matrix: List[List[int]] = [[]]
+
+    def update(self, positions: Iterable[Pos], bounds: Optional[Bounds] = None) -> MatrixUpdate:
+        positions = set(positions)
+        previous = self.matrix
+        if bounds is None:
+            bounds = bounds_of(positions)
+        if bounds is None or bounds != self._bounds:
+            self._positions = positions
+            self._bounds = bounds
+            self.matrix = matrix_from_positions(positions, bounds)
+            return MatrixUpdate(self.matrix, None)
+
+        min_x, max_x, min_y, max_y = bounds
+        rows = max_y - min_y + 1
+        cols = max_x - min_x + 1
+        changed: List[Cell] = []
+        matrix = list(self.matrix)
+        copied: Set[int] = set()
+        for cells, value in ((self._positions - positions, 0), (positions - self._positions, 1)):
+            for x, y in cells:
+                gx = x - min_x
+                gy = max_y - y
+                if not (0 <= gx < cols and 0 <= gy < rows):
+                    continue
+                if gy not in copied:
+                    matrix[gy] = list(matrix[gy])
+                    copied.add(gy)
+                matrix[gy][gx] = value
+                changed.append((gy, gx))
+        self._positions = positions
+        if changed:
+            self.matrix = matrix
+        return MatrixUpdate(self.matrix, changed, previous)
+
+
+def show(ui, update: MatrixUpdate) -> None:
+    """
+    Átadja a frissítést a UI-nak: csak a változott cellákat, ha a UI ezt támogatja
+    és éppen a frissítés alapjául szolgáló mátrixot mutatja.
+    """
+    refresh = getattr(ui, 'refresh_cells', None)
+    if refresh is not None and not update.resized and getattr(ui, 'matrix', None) is update.previous:
+        refresh(update.matrix, update.changed)
+    else:
+        ui.update_matrix(update.matrix)
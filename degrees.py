@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+Pos = Tuple[int, int]
+
+_OFFSETS4 = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_OFFSETS8 = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class NeighborDegrees:
+    """
+    Egy foglalt cellahalmaz cellánkénti 4- és 8-szomszédos fokszáma, inkrementálisan
+    karbantartva. Csak a nem nulla fokszámú cellák szerepelnek (a foglalt cellák és a
+    közvetlen környezetük), egy cella ki- vagy beléptetése 12 bejegyzést módosít.
+    A halmazt magát a hívó tartja nyilván: add/remove csak foglaltságváltáskor hívható.
+    """
+    __slots__ = ('_deg4', '_deg8')
+
+    def __init__(self, cells: Iterable[Pos] = ()):
+        self._deg4: Dict[Pos, int] = {}
+        self._deg8: Dict[Pos, int] = {}
+        for p in cells:
+            self.add(p)
+
+    def copy(self) -> "NeighborDegrees":
+        clone = NeighborDegrees.__new__(NeighborDegrees)
+        clone._deg4 = self._deg4.copy()
+        clone._deg8 = self._deg8.copy()
+        return clone
+
+    def clear(self) -> None:
+        self._deg4.clear()
+        self._deg8.clear()
+
+    def _bump(self, p: Pos, d: int) -> None:
+        x, y = p
+        for table, offsets in ((self._deg4, _OFFSETS4), (self._deg8, _OFFSETS8)):
+            for dx, dy in offsets:
+                q = (x + dx, y + dy)
+                n = table.get(q, 0) + d
+                if n:
+                    table[q] = n
+                else:
+                    del table[q]
+
+    def add(self, p: Pos) -> None:
+        """A p cella foglalttá vált."""
+        self._bump(p, 1)
+
+    def remove(self, p: Pos) -> None:
+        """A p cella kiürül."""
+        self._bump(p, -1)
+
+    def degree4(self, p: Pos) -> int:
+        return self._deg4.get(p, 0)
+
+    def degree8(self, p: Pos) -> int:
+        return self._deg8.get(p, 0)
+
+    def is_leaf(self, p: Pos) -> bool:
+        """Pontosan egy 4-szomszédja van (összefüggő halmazból elhagyható)."""
+        return self._deg4.get(p, 0) == 1
+
+    # --- O(1) előszűrések -------------------------------------------------------------
+    # Mindhárom True/False értéke pontos (ugyanaz, amit a teljes BFS adna), None esetén
+    # a hívónak kell a teljes összefüggőség-vizsgálatot elvégeznie. `size` a halmaz
+    # mérete, `connected` hogy a halmaz jelenleg összefüggő-e.
+
+    def check_add(self, p: Pos, size: int, connected: bool) -> Optional[bool]:
+        """Összefüggő marad-e a halmaz a (szabad) p cella hozzáadása után."""
+        if size == 0:
+            return True
+        if not self._deg4.get(p, 0):
+            return False
+        return True if connected else None
+
+    def check_remove(self, p: Pos, size: int, connected: bool) -> Optional[bool]:
+        """Összefüggő marad-e a halmaz a (foglalt) p cella elvétele után."""
+        if size <= 2:
+            return True
+        if connected and self._deg4.get(p, 0) == 1:
+            return True
+        return None
+
+    def check_move(self, src: Pos, dst: Pos, size: int, connected: bool) -> Optional[bool]:
+        """Összefüggő marad-e a halmaz, ha a (foglalt) src cella a (szabad) dst cellára lép."""
+        if size <= 1:
+            return True
+        adjacent = abs(src[0] - dst[0]) + abs(src[1] - dst[1]) == 1
+        if self._deg4.get(dst, 0) - adjacent <= 0:
+            # dst-nek nem maradna szomszédja
+            return False
+        if connected and self._deg4.get(src, 0) == 1:
+            return True
+        return None
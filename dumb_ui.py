@@ -1,5 +1,3 @@
-import tkinter as tk
-from PIL import Image, ImageTk
 from phases import (phase_1, phase_2, phase_3, phase_4)
 from phases.phase_3 import Phase_3
 from phases.phase_1 import Phase1
@@ -49,19 +47,20 @@ class DumbUI:
                     self.phase_num += 1
             case 1:
                 if not self.phase_2:
-                    self.phase_2 = Phase2(self)
+                    self.phase_2 = Phase2(self, env=self.phase_1.env if self.phase_1 else None)
                 if self.phase_2.execute_step():
                     self.phase_num += 1
             case 2:
                 if not self.phase_3:
-                    self.phase_3 = Phase_3(self)
+                    self.phase_3 = Phase_3(self, env=self.phase_2.env if self.phase_2 else None)
                 if not self.sweep_done:
                     self.sweep_done = self.phase_3.execute_step()
                 elif self.phase_3.execute_histogram_step() == True:
                     self.phase_num += 1
             case 3:
                 if not self.phase_4:
-                    self.phase_4 = phase_4.Phase4(self, "configurations/001-goal.txt")
+                    self.phase_4 = phase_4.Phase4(self, "configurations/001-goal.txt",
+                                                  env=self.phase_3.env if self.phase_3 else None)
                 self.phase_4.execute_step()
                 if self.phase_4.is_done():
                     self.phase_num += 1
@@ -1,122 +1,706 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import collections
-from grid import Grid
-from structures.module import Module, Move
+from grid import Grid, ArrayGrid, ChunkedGrid
+from degrees import NeighborDegrees
+from runs import RunIndex
+from conversion import positions_from_matrix, matrix_from_positions
+# configuration_hash innen is importálható marad (korábban itt volt definiálva)
+from zobrist import configuration_hash, zobrist_key, zobrist_labeled_key
+from structures.module import Module, ModuleStore, MoveBatch, Move
 from collision import detect_collisions   
+from tracing import get_tracer
+
+_trace = get_tracer('environment')
 
 Pos = Tuple[int, int]
 
 
+def extended_height(height: int) -> int:
+    """A bounding box magasságát a következő 3-mal osztható értékre egészíti ki."""
+    if height % 3 != 0:
+        height += 3 - (height % 3)
+    return height
+
+
+def extended_perimeter(width: int, height: int) -> int:
+    """Az extended bounding box kerülete (P)."""
+    return 2 * (width + extended_height(height))
+
+
+class EnvSnapshot:
+    """
+    Egy Environment állapotának csak olvasható pillanatképe. A modulok pozícióit
+    egy több pillanatkép által közösen használt alapból és az azóta elmozdult
+    modulok eltéréséből (delta) állítja elő; a mátrixot csak kérésre számolja ki.
+    """
+    __slots__ = ('_base', '_delta', '_bounds', '_matrix')
+
+    def __init__(self, base, delta: Dict[int, Optional[Pos]]):
+        self._base = base
+        self._delta = delta
+        self._bounds = None
+        self._matrix = None
+
+    def positions(self):
+        ids, xs, ys, placed = self._base
+        delta = self._delta
+        for slot in range(len(ids)):
+            mid = ids[slot]
+            if mid in delta:
+                pos = delta[mid]
+                if pos is not None:
+                    yield pos
+            elif placed[slot]:
+                yield (xs[slot], ys[slot])
+
+    def find_bounds(self) -> Tuple[int, int, int, int]:
+        if self._bounds is None:
+            positions = list(self.positions())
+            if not positions:
+                self._bounds = [None, None, None, None]
+            else:
+                xs = [x for x, _ in positions]
+                ys = [y for _, y in positions]
+                self._bounds = [min(xs), max(xs), min(ys), max(ys)]
+        return list(self._bounds)
+
+    def matrix_from_environment(self) -> List[List[int]]:
+        if self._matrix is None:
+            self._matrix = matrix_from_positions(self.positions(), tuple(self.find_bounds()))
+        return self._matrix
+
+
+# a StepResult.rejected okai
+REJECT_UNKNOWN = 'unknown_module'
+REJECT_UNPLACED = 'unplaced'
+REJECT_OUT_OF_BOUNDS = 'out_of_bounds'
+REJECT_SAME_TARGET = 'same_target'
+REJECT_SWAP = 'swap'
+REJECT_OCCUPIED = 'occupied'
+
+
+class StepResult:
+    """
+    Egy Environment.step() eredménye: a végrehajtott mozgások (applied), az elutasított
+    modulok az okkal (rejected) és a kiszámított célpontok (targets).
+    """
+    __slots__ = ('applied', 'rejected', 'targets')
+
+    def __init__(self, applied: MoveBatch, rejected: Dict[int, str], targets: Dict[int, Pos]):
+        self.applied = applied
+        self.rejected = rejected
+        self.targets = targets
+
+    def __bool__(self) -> bool:
+        return bool(self.applied) or not self.rejected
+
+    def __repr__(self) -> str:
+        return f'StepResult(applied={len(self.applied)}, rejected={self.rejected!r})'
+
+
+class MoveEvent:
+    """
+    Egy végrehajtott lépés (step, transformation vagy revert) a feliratkozók számára:
+    az elmozdult modulok id-je, valamint a régi és az új pozíciójuk azonos sorrendben.
+    """
+    __slots__ = ('ids', 'sources', 'targets')
+
+    def __init__(self, ids: List[int], sources: List[Pos], targets: List[Pos]):
+        self.ids = ids
+        self.sources = sources
+        self.targets = targets
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self):
+        """(id, forrás, cél) hármasok."""
+        return zip(self.ids, self.sources, self.targets)
+
+    def __repr__(self) -> str:
+        return f'MoveEvent({len(self.ids)} moves)'
+
+
 class Environment:
-    def __init__(self):
-        self.grid = Grid()
-        self.modules: Dict[int, Module] = {}
+    def __init__(self, grid: Optional[Grid] = None):
+        # ArrayGrid() átadásával numpy tömbös, ChunkedGrid() átadásával csempézett ritka tárolás kérhető
+        self.grid = grid if grid is not None else Grid()
+        self.modules: ModuleStore = ModuleStore(owner=self)
+        # pozíció -> modul id index, a ModuleStore minden pozícióváltozáskor frissíti
+        self._index: Dict[Pos, int] = {}
+        # átmenetileg ugyanarra a cellára kerülő további modulok
+        self._stacked: Dict[Pos, List[int]] = {}
+        # soronkénti / oszloponkénti modulszám, ebből tartjuk karban a határokat
+        self._row_counts: Dict[int, int] = {}
+        self._col_counts: Dict[int, int] = {}
+        self._min_x: Optional[int] = None
+        self._max_x: Optional[int] = None
+        self._min_y: Optional[int] = None
+        self._max_y: Optional[int] = None
+        # a foglaltság és az (id, pozíció) párok Zobrist-hash-e, az indexszel együtt frissül
+        self._occupancy_hash = 0
+        self._labeled_hash = 0
+        # a foglalt cellák soronkénti (y -> x szakaszok) és oszloponkénti (x -> y szakaszok) futamai
+        self._row_runs = RunIndex()
+        self._col_runs = RunIndex()
+        # pillanatképek közös alapja és az azóta elmozdult modulok
+        self._snapshot_base = None
+        self._snapshot_delta: Dict[int, Optional[Pos]] = {}
+        # mozgásnapló a spekulatív tervezéshez: (modul id, régi pozíció) bejegyzések
+        # és a nyitott checkpoint-ok tokenjei; napló nélkül None
+        self._journal: Optional[List[Tuple[int, Optional[Pos]]]] = None
+        self._open_tokens: List[Tuple[int, int, int]] = []
+        self._token_serial = 0
+        # mozgásesemények feliratkozói; üres listánál az eseményt össze sem állítjuk
+        self._move_listeners: List[Callable[[MoveEvent], None]] = []
+
+    @classmethod
+    def from_matrix(cls, matrix, grid: Optional[Grid] = None) -> "Environment":
+        """GUI-tájolású 0/1 mátrixból épít környezetet; a modulok id-je sorfolytonosan 1-től nő."""
+        env = cls(grid)
+        for mid, pos in enumerate(positions_from_matrix(matrix), start=1):
+            env.add_module(Module(mid, pos))
+        return env
 
     def add_module(self, module: Module):
-        if module.pos in self.grid.occupied:
+        if self._journal is not None:
+            raise RuntimeError("Cannot add modules while a move journal is open")
+        if module.pos is not None and module.pos in self.grid.occupied:
             raise ValueError("Cell occupied")
-        self.modules[module.id] = module
-        self.grid.place(module.id, module.pos)
+        self.modules.add(module)
+        self._snapshot_base = None
+        self._index_add(module.id, module.pos)
+        if module.pos is not None:
+            self.grid.place(module.id, module.pos)
 
-    
+    def remove_module(self, mid: int) -> Optional[Module]:
+        if self._journal is not None:
+            raise RuntimeError("Cannot remove modules while a move journal is open")
+        if mid not in self.modules:
+            return None
+        pos = self.modules.position(mid)
+        if pos is not None and self.grid.occupied.get(pos) == mid:
+            self.grid.remove(pos)
+        self._index_discard(mid, pos)
+        self._snapshot_base = None
+        return self.modules.remove(mid)
 
-    def step(self, actions: Dict[int, Move]) -> bool:
-        if not actions:
-            return True
+    def _module_moved(self, mid: int, old_pos, new_pos) -> None:
+        """A ModuleStore hívja, így az index minden mozgatás után szinkronban marad."""
+        self._index_discard(mid, old_pos)
+        self._index_add(mid, new_pos)
+        if self._snapshot_base is not None:
+            self._snapshot_delta[mid] = new_pos
+        if self._journal is not None:
+            self._journal.append((mid, old_pos))
+
+    def _index_add(self, mid: int, pos) -> None:
+        if pos is None:
+            return
+        pos = tuple(pos)
+        self._count_add(pos[0], pos[1])
+        self._labeled_hash ^= zobrist_labeled_key(mid, pos)
+        occupant = self._index.get(pos)
+        if occupant is None:
+            self._index[pos] = mid
+            self._occupancy_hash ^= zobrist_key(pos)
+            self._row_runs.add(pos[1], pos[0])
+            self._col_runs.add(pos[0], pos[1])
+        elif occupant != mid:
+            self._stacked.setdefault(pos, []).append(mid)
+
+    def _index_discard(self, mid: int, pos) -> None:
+        if pos is None:
+            return
+        pos = tuple(pos)
+        self._count_discard(pos[0], pos[1])
+        self._labeled_hash ^= zobrist_labeled_key(mid, pos)
+        stacked = self._stacked.get(pos)
+        if self._index.get(pos) == mid:
+            if stacked:
+                self._index[pos] = stacked.pop(0)
+            else:
+                del self._index[pos]
+                self._occupancy_hash ^= zobrist_key(pos)
+                self._row_runs.remove(pos[1], pos[0])
+                self._col_runs.remove(pos[0], pos[1])
+        elif stacked and mid in stacked:
+            stacked.remove(mid)
+        if stacked is not None and not stacked:
+            del self._stacked[pos]
+
+    def copy(self) -> "Environment":
+        """Gyors másolat: a modulok tömbjei és a lapos indexek másolódnak, objektumgráf nélkül."""
+        clone = Environment.__new__(Environment)
+        clone.grid = self.grid.copy()
+        clone.modules = self.modules.copy(owner=clone)
+        clone._index = self._index.copy()
+        clone._stacked = {pos: list(mids) for pos, mids in self._stacked.items()}
+        clone._row_counts = self._row_counts.copy()
+        clone._col_counts = self._col_counts.copy()
+        clone._min_x, clone._max_x = self._min_x, self._max_x
+        clone._min_y, clone._max_y = self._min_y, self._max_y
+        clone._occupancy_hash = self._occupancy_hash
+        clone._labeled_hash = self._labeled_hash
+        clone._row_runs = self._row_runs.copy()
+        clone._col_runs = self._col_runs.copy()
+        clone._snapshot_base = None
+        clone._snapshot_delta = {}
+        clone._journal = None
+        clone._open_tokens = []
+        clone._token_serial = 0
+        # a feliratkozók az eredeti környezethez tartoznak, a másolathoz nem
+        clone._move_listeners = []
+        return clone
 
-        # 1️⃣ Célpontok kiszámítása
+    def snapshot(self) -> EnvSnapshot:
+        """
+        Pillanatkép az env_queue-k számára. A költsége az előző alap óta elmozdult
+        modulok számával arányos; ha ezek túl sokan lennének, új alapot veszünk.
+        """
+        if self._snapshot_base is None or 4 * len(self._snapshot_delta) > len(self.modules):
+            self._snapshot_base = self.modules.freeze()
+            self._snapshot_delta = {}
+        return EnvSnapshot(self._snapshot_base, dict(self._snapshot_delta))
+
+    def __deepcopy__(self, memo):
+        clone = self.copy()
+        memo[id(self)] = clone
+        return clone
+
+    def _count_add(self, x: int, y: int) -> None:
+        self._col_counts[x] = self._col_counts.get(x, 0) + 1
+        self._row_counts[y] = self._row_counts.get(y, 0) + 1
+        if self._min_x is None:
+            self._min_x = self._max_x = x
+            self._min_y = self._max_y = y
+            return
+        if x < self._min_x:
+            self._min_x = x
+        elif x > self._max_x:
+            self._max_x = x
+        if y < self._min_y:
+            self._min_y = y
+        elif y > self._max_y:
+            self._max_y = y
+
+    def _count_discard(self, x: int, y: int) -> None:
+        if self._decrement(self._col_counts, x):
+            if x == self._min_x:
+                self._min_x = self._next_occupied(self._col_counts, x, 1)
+            if x == self._max_x:
+                self._max_x = self._next_occupied(self._col_counts, x, -1)
+        if self._decrement(self._row_counts, y):
+            if y == self._min_y:
+                self._min_y = self._next_occupied(self._row_counts, y, 1)
+            if y == self._max_y:
+                self._max_y = self._next_occupied(self._row_counts, y, -1)
+
+    @staticmethod
+    def _decrement(counts: Dict[int, int], key: int) -> bool:
+        """Csökkenti a számlálót; True, ha a sor/oszlop kiürült."""
+        remaining = counts[key] - 1
+        if remaining:
+            counts[key] = remaining
+            return False
+        del counts[key]
+        return True
+
+    @staticmethod
+    def _next_occupied(counts: Dict[int, int], start: int, direction: int) -> Optional[int]:
+        """A kiürült szélső sor/oszlop utáni első foglalt koordináta."""
+        if not counts:
+            return None
+        key = start
+        for _ in range(len(counts)):
+            key += direction
+            if key in counts:
+                return key
+        # nagy hézag esetén olcsóbb egyszer végignézni a kulcsokat
+        return min(counts) if direction > 0 else max(counts)
+
+    def resolve_step(self, actions: MoveBatch) -> "StepResult":
+        """
+        Kiszámítja a lépés összes célpontját, és kiszűri az ütköző mozgásokat,
+        de semmit nem mozdít el. Azonos célcellánál a legkisebb id nyer, a helycserét
+        (A B helyére, B A helyére) mindkét modulra elutasítjuk, és nem léphet senki olyan
+        cellára, amelyen helyben maradó modul áll. Egy elutasított modul is a helyén
+        marad, így az elutasításokat fixpontig továbbvisszük.
+        """
+        if not isinstance(actions, MoveBatch):
+            actions = MoveBatch(actions)
+        slots = self.modules._slot
+        position = self.modules.position
+        in_bounds = self.grid.in_bounds
+
+        rejected: Dict[int, str] = {}
+        sources: Dict[int, Pos] = {}
         targets: Dict[int, Pos] = {}
-        for mid, mv in actions.items():
-            mod = self.modules[mid]
-            dx, dy = mv.delta
-            tgt = (mod.pos[0] + dx, mod.pos[1] + dy)
-
-            # Ha kimegy a gridből, egyszerűen maradjon helyben
-            if not self.grid.in_bounds(tgt):
-                tgt = mod.pos
+        # célcella -> az oda tartó legkisebb id
+        claims: Dict[Pos, int] = {}
+        for mid, dx, dy in actions.deltas():
+            if mid not in slots:
+                rejected[mid] = REJECT_UNKNOWN
+                continue
+            src = position(mid)
+            if src is None:
+                rejected[mid] = REJECT_UNPLACED
+                continue
+            tgt = (src[0] + dx, src[1] + dy)
+            if not in_bounds(tgt):
+                rejected[mid] = REJECT_OUT_OF_BOUNDS
+                continue
+            sources[mid] = src
             targets[mid] = tgt
+            other = claims.get(tgt)
+            if other is None:
+                claims[tgt] = mid
+            elif mid < other:
+                claims[tgt] = mid
+                rejected[other] = REJECT_SAME_TARGET
+            else:
+                rejected[mid] = REJECT_SAME_TARGET
 
-        # 2️⃣ Minden modult elmozdítunk
-        # régi helyek törlése
-        for mid in actions.keys():
-            src = self.modules[mid].pos
-            self.grid.remove(src)
+        # helycsere: a nyertesek között A célja B forrása és B célja A forrása
+        by_source = {sources[mid]: mid for mid in claims.values()}
+        for tgt, mid in claims.items():
+            other = by_source.get(tgt)
+            if other is not None and other != mid and targets[other] == sources[mid]:
+                rejected[mid] = REJECT_SWAP
 
-        # új helyek beállítása
-        for mid, tgt in targets.items():
-            self.grid.place(mid, tgt)
+        index = self._index
+        stacked = self._stacked
+
+        def held(cell: Pos) -> bool:
+            # áll-e a cellán olyan modul, amelyik ebben a lépésben nem mozdul el
+            occupant = index.get(cell)
+            if occupant is None:
+                return False
+            return any(m not in targets or m in rejected
+                       for m in (occupant, *stacked.get(cell, ())))
+
+        pending = [mid for mid in claims.values() if mid not in rejected]
+        while pending:
+            mid = pending.pop()
+            if mid in rejected or not held(targets[mid]):
+                continue
+            rejected[mid] = REJECT_OCCUPIED
+            # a forrása foglalt marad: az oda tartó mozgást újra kell vizsgálni
+            waiting = claims.get(sources[mid])
+            if waiting is not None and waiting not in rejected:
+                pending.append(waiting)
+
+        if rejected:
+            applied = actions.filter(lambda mid, _: mid in targets and mid not in rejected)
+        else:
+            applied = actions
+        return StepResult(applied, rejected, targets)
+
+    def step(self, actions: MoveBatch) -> "StepResult":
+        """
+        Egy párhuzamos lépés: az ütköző mozgásokat a resolve_step() kiszűri, a többit
+        egyszerre hajtjuk végre. Az eredmény igaz, ha volt mit végrehajtani (vagy üres volt a lépés).
+        """
+        result = self.resolve_step(actions)
+        targets = result.targets
+        if self._move_listeners:
+            ids = list(result.applied)
+            sources = [self.modules.position(mid) for mid in ids]
+
+        # a pozíciók átírása után a forrás- és célcellákat az indexhez igazítjuk, így egy
+        # közös cellán maradó modul cellája nem ürül ki
+        touched = []
+        for mid in result.applied:
+            touched.append(self.modules.position(mid))
+            tgt = targets[mid]
+            touched.append(tgt)
             self.modules[mid].pos = tgt
+        self._sync_grid_cells(touched)
 
-        return True
+        if self._move_listeners and ids:
+            self._notify(MoveEvent(ids, sources, [targets[mid] for mid in ids]))
+        return result
+
+    def _sync_grid_cells(self, cells) -> None:
+        """
+        A megadott cellák grid-bejegyzését az indexhez igazítja: a cella annak a modulnak
+        a neve alatt marad foglalt, amelyiket az index ott tart (közös cellán az elsőként
+        érkezőt), és csak akkor ürül ki, ha egyetlen modul sem maradt rajta.
+        """
+        grid = self.grid
+        index = self._index
+        for cell in dict.fromkeys(cells):
+            if cell is None:
+                continue
+            occupant = index.get(cell)
+            if occupant is None:
+                grid.remove(cell)
+            elif grid.occupied.get(cell) != occupant:
+                grid.place(occupant, cell)
+
+    def checkpoint(self) -> Tuple[int, int, int]:
+        """
+        Megnyitja (vagy folytatja) a mozgásnaplót, és visszaad egy tokent. Az ezután
+        történő pozíció- és cellaváltozások a revert(token) hívással visszavonhatók,
+        a commit(token) pedig elfogadja őket. A tokeneket fordított sorrendben kell lezárni.
+        """
+        if self._journal is None:
+            self._journal = []
+            self.grid._journal = []
+        self._token_serial += 1
+        token = (self._token_serial, len(self._journal), len(self.grid._journal))
+        self._open_tokens.append(token)
+        return token
+
+    def apply(self, actions: MoveBatch) -> Tuple[int, int, int]:
+        """Mint step(), de a visszaadott tokennel a lépés O(k) időben visszavonható."""
+        token = self.checkpoint()
+        self.step(actions)
+        return token
+
+    def revert(self, token: Tuple[int, int, int]) -> None:
+        """Visszaállítja a token óta elmozdult modulokat és a grid érintett celláit."""
+        self._close_token(token)
+        journal, self._journal = self._journal, None
+        _, pos_mark, cell_mark = token
+        if self._move_listeners:
+            moved = list(dict.fromkeys(mid for mid, _ in journal[pos_mark:]))
+            sources = [self.modules.position(mid) for mid in moved]
+        while len(journal) > pos_mark:
+            mid, old_pos = journal.pop()
+            self.modules.set_position(mid, old_pos)
+        self.grid._rollback(cell_mark)
+        self._journal = journal
+        if not self._open_tokens:
+            self._close_journal()
+        if self._move_listeners and moved:
+            # a token óta oda-vissza mozgott modulok nem szerepelnek az eseményben
+            event = MoveEvent([], [], [])
+            for mid, src in zip(moved, sources):
+                tgt = self.modules.position(mid)
+                if tgt != src:
+                    event.ids.append(mid)
+                    event.sources.append(src)
+                    event.targets.append(tgt)
+            if event.ids:
+                self._notify(event)
+
+    def commit(self, token: Tuple[int, int, int]) -> None:
+        """Elfogadja a token óta történt változásokat."""
+        self._close_token(token)
+        if not self._open_tokens:
+            self._close_journal()
+
+    def _close_token(self, token: Tuple[int, int, int]) -> None:
+        # a belső (később nyitott) tokenek a külsővel együtt záródnak
+        for i in range(len(self._open_tokens) - 1, -1, -1):
+            if self._open_tokens[i] == token:
+                del self._open_tokens[i:]
+                return
+        raise ValueError("Unknown or already closed undo token")
+
+    def _close_journal(self) -> None:
+        self._journal = None
+        self.grid._journal = None
+
+    def translate(self, dx: int, dy: int) -> "Environment":
+        """
+        Minden modult (dx, dy)-nal eltol, az id-k megtartásával; self-et adja vissza.
+        Költsége O(n), a mozgáseseményt egyetlen lépésként kapják a feliratkozók.
+        """
+        if self._journal is not None:
+            raise RuntimeError("Cannot translate while a move journal is open")
+        if not (dx or dy):
+            return self
+        position = self.modules.position
+        moved = [(mid, position(mid)) for mid in self.modules.keys() if position(mid) is not None]
+        self.grid.clear()
+        targets = []
+        for mid, (x, y) in moved:
+            tgt = (x + dx, y + dy)
+            self.grid.place(mid, tgt)
+            self.modules.set_position(mid, tgt)
+            targets.append(tgt)
+        self._snapshot_base = None
+        if self._move_listeners and moved:
+            self._notify(MoveEvent([mid for mid, _ in moved], [src for _, src in moved], targets))
+        return self
+
+    def normalize_origin(self) -> "Environment":
+        """
+        A befoglaló téglalap bal alsó sarkát a (0, 0)-ba tolja, azaz ugyanabba a
+        koordináta-rendszerbe, amit a megjelenített mátrixból a from_matrix() adna.
+        """
+        if self._min_x is None:
+            return self
+        return self.translate(-self._min_x, -self._min_y)
+
+    def subscribe(self, listener: Callable[[MoveEvent], None]) -> Callable[[MoveEvent], None]:
+        """
+        Feliratkozás a mozgáseseményekre: a listener minden végrehajtott lépés után
+        egyszer hívódik egy MoveEvent-tel. A listenert adja vissza (unsubscribe-hoz).
+        """
+        self._move_listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener: Callable[[MoveEvent], None]) -> None:
+        self._move_listeners.remove(listener)
+
+    def _notify(self, event: MoveEvent) -> None:
+        # másolaton iterálunk, hogy a listener leiratkozhasson a hívásban
+        for listener in tuple(self._move_listeners):
+            listener(event)
+
+    def positions(self):
+        """Az elhelyezett modulok pozíciói (ahogy az EnvSnapshot.positions() is)."""
+        return self.modules.positions()
 
     def find_module_at(self, pos: Pos, check_for_oob: bool = False):
         min_x, max_x, min_y, max_y = self.find_bounds()
         if pos[0] < min_x or pos[0] > max_x or pos[1] < min_y or pos[1] > max_y:
-            print(pos, 'out of bounds')
+            _trace.debug(pos, 'out of bounds')
             if check_for_oob:
                 return 'oob'
             return None
         # accept list or tuple, normalize to tuple key for dict lookup
-        for module in self.modules.values():
-            if module.pos[0] == pos[0] and module.pos[1] == pos[1]:
-                return module
-        return None
+        mid = self._index.get((pos[0], pos[1]))
+        if mid is None:
+            return None
+        return self.modules[mid]
     
+    def row_run(self, y: int, x: int) -> Optional[Tuple[int, int]]:
+        """Az (x, y) cellát tartalmazó vízszintes foglalt szakasz (min_x, max_x), vagy None."""
+        return self._row_runs.span(y, x)
+
+    def column_run(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Az (x, y) cellát tartalmazó függőleges foglalt szakasz (min_y, max_y), vagy None."""
+        return self._col_runs.span(x, y)
+
+    def row_runs(self, y: int) -> List[Tuple[int, int]]:
+        """Az y sor foglalt szakaszai balról jobbra."""
+        return self._row_runs.spans(y)
+
+    def row_full(self, y: int, min_x: int, max_x: int) -> bool:
+        """
+        Foglalt-e az y sor min_x..max_x közötti minden cellája. Csempézett rácson a
+        csempékből döntünk (egy hiányzó csempe már elég a nemleges válaszhoz), egyébként
+        a futamindexből: tele van, ha a min_x-et tartalmazó szakasz max_x-ig ér.
+        """
+        if min_x > max_x:
+            return True
+        if isinstance(self.grid, ChunkedGrid):
+            return self.grid.row_full(y, min_x, max_x)
+        span = self._row_runs.span(y, min_x)
+        return span is not None and span[1] >= max_x
+
+    def run_length(self, pos: Pos, direction: Move) -> int:
+        """Hány foglalt cella következik egymás után pos-tól (azt is beleértve) a megadott irányban."""
+        dx, dy = direction.delta
+        if dy == 0:
+            span = self._row_runs.span(pos[1], pos[0])
+            if span is None:
+                return 0
+            return span[1] - pos[0] + 1 if dx > 0 else pos[0] - span[0] + 1
+        if dx == 0:
+            span = self._col_runs.span(pos[0], pos[1])
+            if span is None:
+                return 0
+            return span[1] - pos[1] + 1 if dy > 0 else pos[1] - span[0] + 1
+        raise ValueError(f"Run length is only defined for axis directions, got {direction}")
+
+    def first_gap(self, pos: Pos, direction: Move) -> Pos:
+        """Az első üres cella pos-tól (azt is beleértve) a megadott irányban."""
+        n = self.run_length(pos, direction)
+        dx, dy = direction.delta
+        return (pos[0] + n * dx, pos[1] + n * dy)
+
+    def run_modules(self, pos: Pos, direction: Move, limit: Optional[int] = None) -> List[Module]:
+        """
+        A pos-tól a megadott irányban megszakítás nélkül következő modulok (legfeljebb
+        limit darab), vagyis a find_module_at-es léptetés az első résig, cellánkénti
+        próbálgatás nélkül.
+        """
+        n = self.run_length(pos, direction)
+        if limit is not None:
+            n = min(n, max(limit, 0))
+        dx, dy = direction.delta
+        x, y = pos
+        index = self._index
+        return [self.modules[index[(x + i * dx, y + i * dy)]] for i in range(n)]
+
     def matrix_from_environment(self) -> List[List[int]]:
         min_x, max_x, min_y, max_y = self.find_bounds()
 
-        rows = max_y - min_y + 1
-        cols = max_x - min_x + 1
-        matrix = [[0 for _ in range(cols)] for _ in range(rows)]
-
-        for module in self.modules.values():
-            x = module.pos[0]
-            y = module.pos[1]
-            gui_x = x - min_x
-            gui_y = max_y - y
-            matrix[gui_y][gui_x] = 1
+        if isinstance(self.grid, ArrayGrid):
+            # a nézet a következő mozgatással változna, ezért listát adunk ki
+            return self.grid.matrix_view(min_x, max_x, min_y, max_y).tolist()
+        if isinstance(self.grid, ChunkedGrid):
+            # csak a nem üres csempékből töltjük ki
+            return self.grid.matrix(min_x, max_x, min_y, max_y)
 
-        return matrix
+        return matrix_from_positions(self.modules.positions(), (min_x, max_x, min_y, max_y))
     
     def find_bounds(self) -> Tuple[int, int, int, int]:
-        min_x = None
-        max_x = None
-        min_y = None
-        max_y = None
-
-        for module in self.modules.values():
-            if min_x == None:
-                min_x = module.pos[0]
-            elif module.pos[0] < min_x:
-                min_x = module.pos[0]
-
-            if max_x == None:
-                max_x = module.pos[0]
-            elif module.pos[0] > max_x:
-                max_x = module.pos[0]
-
-            if min_y == None:
-                min_y = module.pos[1]
-            elif module.pos[1] < min_y:
-                min_y = module.pos[1]
-
-            if max_y == None:
-                max_y = module.pos[1]
-            elif module.pos[1] > max_y:
-                max_y = module.pos[1]
-        
-        return [min_x, max_x, min_y, max_y]
+        return [self._min_x, self._max_x, self._min_y, self._max_y]
 
-    def transformation(self, movement_dict: Dict[int, Move]):
-        modules_to_move = {}
-        for id in movement_dict.keys():
-            modules_to_move[id] = self.modules[id]
-        
-        for id, move in movement_dict.items():
-            dx, dy = move.delta
-            new_pos = (modules_to_move[id].pos[0] + dx, modules_to_move[id].pos[1] + dy)
+    @property
+    def extended_bounding_box(self) -> Tuple[int, int, int, int]:
+        """A bounding box, amelynek magassága 3-mal osztható (felfelé kiegészítve)."""
+        if self._min_x is None:
+            return (None, None, None, None)
+        height = extended_height(self._max_y - self._min_y + 1)
+        return (self._min_x, self._max_x, self._min_y, self._min_y + height - 1)
+
+    @property
+    def occupancy_hash(self) -> int:
+        """A foglalt cellák halmazának Zobrist-hash-e (modulonként O(1) frissítéssel)."""
+        return self._occupancy_hash
 
+    @property
+    def labeled_hash(self) -> int:
+        """Az (id, pozíció) párok Zobrist-hash-e: azonos alakzat más kiosztással is eltér."""
+        return self._labeled_hash
+
+    @property
+    def degrees(self) -> NeighborDegrees:
+        """A rács foglalt celláinak 4/8-szomszéd fokszámai (a lépésekkel együtt frissül)."""
+        return self.grid.degrees
+
+    def degree4(self, pos: Pos) -> int:
+        return self.grid.degrees.degree4(tuple(pos))
+
+    def degree8(self, pos: Pos) -> int:
+        return self.grid.degrees.degree8(tuple(pos))
+
+    @property
+    def perimeter(self) -> int:
+        """Az extended bounding box kerülete (P)."""
+        if self._min_x is None:
+            return 0
+        return extended_perimeter(self._max_x - self._min_x + 1, self._max_y - self._min_y + 1)
+
+    def transformation(self, movement_dict: MoveBatch):
+        if not isinstance(movement_dict, MoveBatch):
+            movement_dict = MoveBatch(movement_dict)
+        position = self.modules.position
+
+        targets: Dict[int, Pos] = {}
+        for id, dx, dy in movement_dict.deltas():
+            src = position(id)
+            targets[id] = (src[0] + dx, src[1] + dy)
+
+        touched = [position(id) for id in targets]
+        if self._move_listeners:
+            ids = list(targets)
+            sources = list(touched)
+
+        for id, new_pos in targets.items():
             self.modules[id].pos = new_pos
+            touched.append(new_pos)
+        # a grid is kövesse a modulokat, ugyanúgy mint step()-nél
+        self._sync_grid_cells(touched)
 
+        if self._move_listeners and targets:
+            self._notify(MoveEvent(ids, sources, list(targets.values())))
         return self
-        
\ No newline at end of file
+        
@@ -1,14 +1,44 @@
+from collections.abc import MutableMapping
 from typing import Tuple, Dict, List, Optional
 
+from degrees import NeighborDegrees
+from tracing import get_tracer
+
+try:
+    import numpy as np
+except ImportError:  # a numpy csak az ArrayGrid-hez kell
+    np = None
+
+_trace = get_tracer('grid')
 
 Pos = Tuple[int, int]
 
+# a naplóban így jelöljük, hogy a cella a változás előtt üres volt
+_FREE = object()
+
 
 class Grid:
     def __init__(self, rows: Optional[int] = None, cols: Optional[int] = None):
         self.occupied: Dict[Pos, int] = {}
         self.rows = rows
         self.cols = cols
+        # (cella, régi érték) napló; csak nyitott Environment.checkpoint() alatt él
+        self._journal: Optional[List[Tuple[Pos, object]]] = None
+        # a foglalt cellák 4/8-szomszéd fokszámai, foglaltságváltáskor frissítve
+        self.degrees = NeighborDegrees()
+
+    def copy(self) -> "Grid":
+        clone = Grid.__new__(Grid)
+        clone.occupied = self.occupied.copy()
+        clone.rows = self.rows
+        clone.cols = self.cols
+        clone._journal = None
+        clone.degrees = self.degrees.copy()
+        return clone
+
+    def empty(self) -> "Grid":
+        """Üres rács ugyanazzal a tárolással (és méretekkel)."""
+        return type(self)(self.rows, self.cols)
 
     def in_bounds(self, p: Pos) -> bool:
         if self.rows is None or self.cols is None:
@@ -21,17 +51,50 @@ class Grid:
 
     def place(self, mid, p):
         """Helyezzen el egy modult. Ha a cella már foglalt, felülírjuk (vizuális mód)."""
+        if p not in self.occupied:
+            self.degrees.add(p)
+            if self._journal is not None:
+                self._journal.append((p, _FREE))
+        elif self._journal is not None:
+            self._journal.append((p, self.occupied[p]))
         self.occupied[p] = mid
 
     def remove(self, p):
         """Eltávolít egy modult a cella ból."""
-        self.occupied.pop(p, None)
+        if p in self.occupied:
+            if self._journal is not None:
+                self._journal.append((p, self.occupied[p]))
+            self.degrees.remove(p)
+            del self.occupied[p]
 
     def move(self, mid: int, src: Pos, dst: Pos) -> None:
         if self.occupied.get(src) != mid:
             raise ValueError("Source mismatch")
-        del self.occupied[src]
-        self.occupied[dst] = mid
+        self.remove(src)
+        self.place(mid, dst)
+
+    def clear(self) -> None:
+        """Minden cellát kiürít (naplózva, ha van nyitott napló)."""
+        if self._journal is not None:
+            self._journal.extend(self.occupied.items())
+        self.occupied.clear()
+        self.degrees.clear()
+
+    def row_full(self, y: int, min_x: int, max_x: int) -> bool:
+        """Igaz, ha az y sor min_x..max_x közötti minden cellája foglalt."""
+        occupied = self.occupied
+        return all((x, y) in occupied for x in range(min_x, max_x + 1))
+
+    def _rollback(self, mark: int) -> None:
+        """A napló `mark` utáni bejegyzéseit fordított sorrendben visszajátssza."""
+        journal, self._journal = self._journal, None
+        while len(journal) > mark:
+            p, old = journal.pop()
+            if old is _FREE:
+                self.remove(p)
+            else:
+                self.place(old, p)
+        self._journal = journal
 
     def neighbors4(self, p: Pos) -> List[Pos]:
         x, y = p
@@ -67,7 +130,429 @@ class Grid:
             matrix[-(pos[1]-1)][pos[0]-1] = id
             
         for row in matrix:
-            for id in row:
-                print(id, end='\t')
-            print('')
+            _trace.info('\t'.join(str(id) for id in row))
+
+
+
+class _ArrayOccupied(MutableMapping):
+    """Dict-szerű nézet az ArrayGrid tömbjei fölött (kompatibilitási réteg)."""
+
+    def __init__(self, grid: "ArrayGrid"):
+        self._grid = grid
+
+    def __getitem__(self, p: Pos) -> int:
+        cell = self._grid._cell(p)
+        if cell is None or not self._grid._occ[cell]:
+            raise KeyError(p)
+        return int(self._grid._ids[cell])
+
+    def __setitem__(self, p: Pos, mid) -> None:
+        self._grid.place(mid, p)
+
+    def __delitem__(self, p: Pos) -> None:
+        if p not in self:
+            raise KeyError(p)
+        self._grid.remove(p)
+
+    def __contains__(self, p) -> bool:
+        cell = self._grid._cell(p)
+        return cell is not None and bool(self._grid._occ[cell])
+
+    def __iter__(self):
+        x0, y0 = self._grid.origin
+        rows, cols = np.nonzero(self._grid._occ)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            yield (c + x0, r + y0)
+
+    def __len__(self) -> int:
+        return self._grid._count
+
+    def clear(self) -> None:
+        self._grid.clear()
+
+
+class ArrayGrid(Grid):
+    """
+    Numpy tömbökkel tárolt Grid: egy uint8 foglaltsági és egy int32 modul-id tömb,
+    amelyek az origóval együtt automatikusan nőnek. A tömb [y - y0, x - x0] indexelésű.
+    Az `occupied` attribútum továbbra is dict-ként használható.
+    """
+
+    def __init__(self, rows: Optional[int] = None, cols: Optional[int] = None, capacity: int = 16):
+        if np is None:
+            raise ImportError("ArrayGrid requires numpy")
+        self.rows = rows
+        self.cols = cols
+        self._occ = np.zeros((capacity, capacity), dtype=np.uint8)
+        self._ids = np.zeros((capacity, capacity), dtype=np.int32)
+        self._x0 = 0
+        self._y0 = 0
+        self._count = 0
+        self._journal = None
+        self.degrees = NeighborDegrees()
+        self.occupied = _ArrayOccupied(self)
+
+    def copy(self) -> "ArrayGrid":
+        clone = ArrayGrid.__new__(ArrayGrid)
+        clone.rows = self.rows
+        clone.cols = self.cols
+        clone._occ = self._occ.copy()
+        clone._ids = self._ids.copy()
+        clone._x0 = self._x0
+        clone._y0 = self._y0
+        clone._count = self._count
+        clone._journal = None
+        clone.degrees = self.degrees.copy()
+        clone.occupied = _ArrayOccupied(clone)
+        return clone
+
+    @property
+    def origin(self) -> Pos:
+        """A tömb [0, 0] cellájának rácskoordinátája."""
+        return (self._x0, self._y0)
+
+    def _cell(self, p) -> Optional[Tuple[int, int]]:
+        r = p[1] - self._y0
+        c = p[0] - self._x0
+        h, w = self._occ.shape
+        if 0 <= r < h and 0 <= c < w:
+            return (r, c)
+        return None
+
+    def _ensure(self, p: Pos) -> Tuple[int, int]:
+        cell = self._cell(p)
+        if cell is not None:
+            return cell
+        h, w = self._occ.shape
+        x, y = p
+        min_x, max_x = min(self._x0, x), max(self._x0 + w - 1, x)
+        min_y, max_y = min(self._y0, y), max(self._y0 + h - 1, y)
+        # a bővülő oldalon fél méretnyi tartalék, hogy ne kelljen minden lépésben másolni
+        pad_x = max(4, (max_x - min_x + 1) // 2)
+        pad_y = max(4, (max_y - min_y + 1) // 2)
+        if x < self._x0:
+            min_x -= pad_x
+        if x >= self._x0 + w:
+            max_x += pad_x
+        if y < self._y0:
+            min_y -= pad_y
+        if y >= self._y0 + h:
+            max_y += pad_y
+
+        occ = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+        ids = np.zeros(occ.shape, dtype=np.int32)
+        r0 = self._y0 - min_y
+        c0 = self._x0 - min_x
+        occ[r0:r0 + h, c0:c0 + w] = self._occ
+        ids[r0:r0 + h, c0:c0 + w] = self._ids
+        self._occ, self._ids = occ, ids
+        self._x0, self._y0 = min_x, min_y
+        return self._cell(p)
+
+    def is_free(self, p: Pos) -> bool:
+        return self.in_bounds(p) and p not in self.occupied
+
+    def place(self, mid, p):
+        """Helyezzen el egy modult. Ha a cella már foglalt, felülírjuk (vizuális mód)."""
+        cell = self._ensure(p)
+        if not self._occ[cell]:
+            self._count += 1
+            self.degrees.add(p)
+            if self._journal is not None:
+                self._journal.append((p, _FREE))
+        elif self._journal is not None:
+            self._journal.append((p, int(self._ids[cell])))
+        self._occ[cell] = 1
+        self._ids[cell] = mid
+
+    def remove(self, p):
+        """Eltávolít egy modult a cella ból."""
+        cell = self._cell(p)
+        if cell is not None and self._occ[cell]:
+            if self._journal is not None:
+                self._journal.append((p, int(self._ids[cell])))
+            self._occ[cell] = 0
+            self._ids[cell] = 0
+            self._count -= 1
+            self.degrees.remove(p)
+
+    def move(self, mid: int, src: Pos, dst: Pos) -> None:
+        if self.occupied.get(src) != mid:
+            raise ValueError("Source mismatch")
+        self.remove(src)
+        self.place(mid, dst)
+
+    def clear(self) -> None:
+        if self._journal is not None:
+            self._journal.extend(self.occupied.items())
+        self._occ[:] = 0
+        self._ids[:] = 0
+        self._count = 0
+        self.degrees.clear()
+
+    def neighbors4_counts(self):
+        """Minden cella 4-szomszédos foglalt celláinak száma (a tárolt tömbbel azonos alakban)."""
+        p = np.pad(self._occ, 1)
+        return p[:-2, 1:-1] + p[2:, 1:-1] + p[1:-1, :-2] + p[1:-1, 2:]
+
+    def neighbors8_counts(self):
+        """Minden cella 8-szomszédos foglalt celláinak száma (a tárolt tömbbel azonos alakban)."""
+        p = np.pad(self._occ, 1)
+        return (p[:-2, :-2] + p[:-2, 1:-1] + p[:-2, 2:]
+                + p[1:-1, :-2] + p[1:-1, 2:]
+                + p[2:, :-2] + p[2:, 1:-1] + p[2:, 2:])
+
+    def count_neighbors4(self, p: Pos) -> int:
+        return sum(1 for n in self.neighbors4(p) if n in self.occupied)
+
+    def count_neighbors8(self, p: Pos) -> int:
+        return sum(1 for n in self.neighbors8(p) if n in self.occupied)
+
+    def row(self, y: int, min_x: int, max_x: int):
+        """Az y sor foglaltsága min_x..max_x között (nézet, ha a tárolt területen belül van)."""
+        return self._window(min_x, max_x, y, y)[0]
+
+    def column(self, x: int, min_y: int, max_y: int):
+        """Az x oszlop foglaltsága min_y..max_y között, alulról felfelé."""
+        return self._window(x, x, min_y, max_y)[:, 0]
+
+    def row_full(self, y: int, min_x: int, max_x: int) -> bool:
+        if min_x > max_x:
+            return True
+        return bool(self.row(y, min_x, max_x).all())
+
+    def matrix_view(self, min_x: int, max_x: int, min_y: int, max_y: int):
+        """GUI-tájolású (felül a max_y sor) foglaltsági mátrix; másolás nélküli nézet,
+        ami a következő mozgatásig érvényes."""
+        return self._window(min_x, max_x, min_y, max_y)[::-1]
+
+    def _window(self, min_x: int, max_x: int, min_y: int, max_y: int):
+        h, w = self._occ.shape
+        r0, r1 = min_y - self._y0, max_y - self._y0 + 1
+        c0, c1 = min_x - self._x0, max_x - self._x0 + 1
+        if 0 <= r0 and r1 <= h and 0 <= c0 and c1 <= w:
+            return self._occ[r0:r1, c0:c1]
+        window = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+        sr0, sr1 = max(r0, 0), min(r1, h)
+        sc0, sc1 = max(c0, 0), min(c1, w)
+        if sr0 < sr1 and sc0 < sc1:
+            window[sr0 - r0:sr1 - r0, sc0 - c0:sc1 - c0] = self._occ[sr0:sr1, sc0:sc1]
+        return window
+
+
+class _Chunk:
+    """Egy ChunkedGrid csempe: foglaltsági bájtok sorfolytonosan és a tárolt értékek."""
+    __slots__ = ('occ', 'values', 'count')
+
+    def __init__(self, size: int):
+        self.occ = bytearray(size * size)
+        self.values: Dict[int, object] = {}
+        self.count = 0
+
+    def copy(self) -> "_Chunk":
+        clone = _Chunk.__new__(_Chunk)
+        clone.occ = bytearray(self.occ)
+        clone.values = self.values.copy()
+        clone.count = self.count
+        return clone
+
+
+class _ChunkedOccupied(MutableMapping):
+    """Dict-szerű nézet a ChunkedGrid csempéi fölött (kompatibilitási réteg)."""
+
+    def __init__(self, grid: "ChunkedGrid"):
+        self._grid = grid
+
+    def __getitem__(self, p: Pos):
+        key, i = self._grid._locate(p)
+        chunk = self._grid._chunks.get(key)
+        if chunk is None or not chunk.occ[i]:
+            raise KeyError(p)
+        return chunk.values[i]
+
+    def __setitem__(self, p: Pos, mid) -> None:
+        self._grid.place(mid, p)
+
+    def __delitem__(self, p: Pos) -> None:
+        if p not in self:
+            raise KeyError(p)
+        self._grid.remove(p)
+
+    def __contains__(self, p) -> bool:
+        key, i = self._grid._locate(p)
+        chunk = self._grid._chunks.get(key)
+        return chunk is not None and bool(chunk.occ[i])
+
+    def __iter__(self):
+        size = self._grid.chunk_size
+        for (cx, cy), chunk in list(self._grid._chunks.items()):
+            for i in chunk.values:
+                yield (cx * size + i % size, cy * size + i // size)
+
+    def __len__(self) -> int:
+        return self._grid._count
+
+    def clear(self) -> None:
+        self._grid.clear()
+
+
+class ChunkedGrid(Grid):
+    """
+    Csempékre (alapból 32×32) bontott ritka Grid. Csak a nem üres csempék léteznek,
+    mindegyik saját foglaltsági számlálóval; a kiürült csempét eldobjuk. Így a memória
+    és a téglalap-lekérdezések (cells_in_rect, row_full, matrix) költsége a modulok
+    számával arányos, nem a befoglaló téglalap területével.
+    Az `occupied` attribútum továbbra is dict-ként használható.
+    """
+
+    def __init__(self, rows: Optional[int] = None, cols: Optional[int] = None, chunk_size: int = 32):
+        self.rows = rows
+        self.cols = cols
+        self.chunk_size = chunk_size
+        self._chunks: Dict[Pos, _Chunk] = {}
+        self._count = 0
+        self._journal = None
+        self.degrees = NeighborDegrees()
+        self.occupied = _ChunkedOccupied(self)
+
+    def copy(self) -> "ChunkedGrid":
+        clone = ChunkedGrid.__new__(ChunkedGrid)
+        clone.rows = self.rows
+        clone.cols = self.cols
+        clone.chunk_size = self.chunk_size
+        clone._chunks = {key: chunk.copy() for key, chunk in self._chunks.items()}
+        clone._count = self._count
+        clone._journal = None
+        clone.degrees = self.degrees.copy()
+        clone.occupied = _ChunkedOccupied(clone)
+        return clone
+
+    def empty(self) -> "ChunkedGrid":
+        return ChunkedGrid(self.rows, self.cols, self.chunk_size)
+
+    def chunks(self):
+        """A nem üres csempék ((cx, cy), csempe) párjai; a csempe occ bájtjai sorfolytonosak."""
+        return self._chunks.items()
+
+    def chunk(self, key: Pos) -> Optional[_Chunk]:
+        return self._chunks.get(key)
+
+    def _locate(self, p) -> Tuple[Pos, int]:
+        size = self.chunk_size
+        cx, lx = divmod(p[0], size)
+        cy, ly = divmod(p[1], size)
+        return (cx, cy), ly * size + lx
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    def is_free(self, p: Pos) -> bool:
+        return self.in_bounds(p) and p not in self.occupied
+
+    def place(self, mid, p):
+        """Helyezzen el egy modult. Ha a cella már foglalt, felülírjuk (vizuális mód)."""
+        key, i = self._locate(p)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = _Chunk(self.chunk_size)
+        if self._journal is not None:
+            self._journal.append((p, chunk.values.get(i, _FREE)))
+        if not chunk.occ[i]:
+            chunk.occ[i] = 1
+            chunk.count += 1
+            self._count += 1
+            self.degrees.add(p)
+        chunk.values[i] = mid
+
+    def remove(self, p):
+        """Eltávolít egy modult a cella ból."""
+        key, i = self._locate(p)
+        chunk = self._chunks.get(key)
+        if chunk is None or not chunk.occ[i]:
+            return
+        if self._journal is not None:
+            self._journal.append((p, chunk.values[i]))
+        chunk.occ[i] = 0
+        del chunk.values[i]
+        chunk.count -= 1
+        self._count -= 1
+        self.degrees.remove(p)
+        if not chunk.count:
+            del self._chunks[key]
+
+    def move(self, mid: int, src: Pos, dst: Pos) -> None:
+        if self.occupied.get(src) != mid:
+            raise ValueError("Source mismatch")
+        self.remove(src)
+        self.place(mid, dst)
+
+    def clear(self) -> None:
+        if self._journal is not None:
+            self._journal.extend(self.occupied.items())
+        self._chunks.clear()
+        self._count = 0
+        self.degrees.clear()
+
+    def _chunks_in_rect(self, min_x: int, max_x: int, min_y: int, max_y: int):
+        size = self.chunk_size
+        cx0, cx1 = min_x // size, max_x // size
+        cy0, cy1 = min_y // size, max_y // size
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self._chunks):
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    chunk = self._chunks.get((cx, cy))
+                    if chunk is not None:
+                        yield cx, cy, chunk
+        else:
+            for (cx, cy), chunk in self._chunks.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield cx, cy, chunk
+
+    def cells_in_rect(self, min_x: int, max_x: int, min_y: int, max_y: int):
+        """A téglalap foglalt cellái; az üres csempéket át sem nézzük."""
+        size = self.chunk_size
+        for cx, cy, chunk in self._chunks_in_rect(min_x, max_x, min_y, max_y):
+            for i in chunk.values:
+                x, y = cx * size + i % size, cy * size + i // size
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield (x, y)
+
+    def row_full(self, y: int, min_x: int, max_x: int) -> bool:
+        if min_x > max_x:
+            return True
+        size = self.chunk_size
+        cy, ly = divmod(y, size)
+        for cx in range(min_x // size, max_x // size + 1):
+            chunk = self._chunks.get((cx, cy))
+            if chunk is None:
+                return False
+            lo = max(min_x, cx * size) - cx * size
+            hi = min(max_x, cx * size + size - 1) - cx * size
+            if 0 in chunk.occ[ly * size + lo:ly * size + hi + 1]:
+                return False
+        return True
+
+    def matrix(self, min_x: int, max_x: int, min_y: int, max_y: int) -> List[List[int]]:
+        """GUI-tájolású (felül a max_y sor) 0/1 mátrix, csak a nem üres csempékből töltve."""
+        matrix = [[0] * (max_x - min_x + 1) for _ in range(max_y - min_y + 1)]
+        for x, y in self.cells_in_rect(min_x, max_x, min_y, max_y):
+            matrix[max_y - y][x - min_x] = 1
+        return matrix
+
+
+# a választható tárolások (pipeline / cli --grid)
+GRID_TYPES = {
+    'dict': Grid,
+    'array': ArrayGrid,
+    'chunked': ChunkedGrid,
+}
+
 
+def make_grid(kind: str = 'dict') -> Grid:
+    """Üres rács a GRID_TYPES egyik neve szerint."""
+    try:
+        grid_cls = GRID_TYPES[kind]
+    except KeyError:
+        raise ValueError(f"unknown grid type {kind!r}, expected one of {', '.join(GRID_TYPES)}") from None
+    return grid_cls()
@@ -1,4 +1,6 @@
+import os
 import tkinter as tk
+import tracing
 from ui import RobotUI
 
 # reading config file into a list
@@ -9,6 +11,9 @@ def load_matrix_from_file(filename="default_config_copy.txt"):
     return matrix
 
 if __name__ == "__main__":
+    # show phase progress in the console unless SQUARES_TRACE says otherwise
+    if not os.environ.get('SQUARES_TRACE'):
+        tracing.configure(tracing.INFO)
     root = tk.Tk()
 
     # matrix contains the default_config as a list
@@ -1,16 +1,25 @@
-from copy import deepcopy
 from environment import Environment 
-from structures.module import Module, Move 
+from spanning_forest import SpanningForest
+from connectivity import grid_is_connected
+from articulation import ArticulationOracle
+from simple_points import MOVE_TIERS, check_move
+from conversion import MatrixMirror, show
+from structures.module import Module, Move, MoveBatch
 from structures.skeleton import (
     compute_exoskeleton_from_env,
     _get_center_of_mass, 
     _find_closest_hole, 
     _is_move_connectivity_safe,
+    _disconnecting_moves,
     _update_env_positions,
     is_connected,
     _select_safe_moves
 )
 from typing import Tuple, Set, Dict, List, Optional
+from tracing import get_tracer, DEBUG, ERROR, WARN
+from zobrist import configuration_hash
+
+_trace = get_tracer('phase1')
 
 Pos = Tuple[int, int]
 
@@ -28,9 +37,25 @@ def _get_move_direction(source: Pos, target: Pos) -> Move:
     return Move.STAY
 
 
-def phase1_transformation(env: Environment, exo_target: Set[Pos]) -> List[Dict[int, Move]]:
+def phase1_transformation(env: Environment, exo_target: Set[Pos]) -> List[MoveBatch]:
+    return _phase1_moves(env, exo_target)
+
+
+def phase1_transformation_plan(env: Environment, exo_target: Set[Pos]) -> List[MoveBatch]:
+    token = env.checkpoint()
+    try:
+        return _phase1_moves(env, exo_target, select=False, note=' (planning)')
+    finally:
+        env.revert(token)
+
+
+def _phase1_moves(env: Environment, exo_target: Set[Pos], select: bool = True,
+                  note: str = '') -> List[MoveBatch]:
+    # a lyukkitöltő lépéssor; select=True esetén a lépéseket _select_safe_moves is szűri
     all_moves = []
     max_iterations = 2 * len(env.modules) ** 2
+    # a lépések után csak a feszítő erdőt javítjuk, nem számoljuk újra az összefüggőséget
+    forest = SpanningForest.attach(env)
 
     for i in range(max_iterations):
         current_positions = set(env.grid.occupied.keys())
@@ -38,8 +63,12 @@ def phase1_transformation(env: Environment, exo_target: Set[Pos]) -> List[Dict[i
         if current_positions == exo_target:
             break
 
+        degrees = env.grid.degrees
+        connected = forest.connected
+        key = configuration_hash(current_positions)
+
         holes_to_fill = exo_target - current_positions
-        movement_dict = {}
+        movement_dict = MoveBatch()
 
         cx, cy = _get_center_of_mass(current_positions)
 
@@ -62,129 +91,66 @@ def phase1_transformation(env: Environment, exo_target: Set[Pos]) -> List[Dict[i
             if target_pos:
                 move = _get_move_direction(current_pos, target_pos)
                 if move != Move.STAY and target_pos not in planned_target_positions:
-                    if _is_move_connectivity_safe(current_positions, current_pos, target_pos):
+                    if _is_move_connectivity_safe(current_positions, current_pos, target_pos, degrees, connected, key):
                         movement_dict[mid] = move
                         planned_target_positions.add(target_pos)
                         temp_holes.discard(target_pos)
                         if current_pos in exo_target:
                             temp_holes.add(current_pos)
 
-        if movement_dict:
-            # Use _select_safe_moves to ensure connectivity and prevent collisions
-            safe_movement_dict = _select_safe_moves(env, movement_dict)
-            
-            if safe_movement_dict:
-                if env.step(safe_movement_dict):
-                    # Verify connectivity after step
-                    new_positions = set(env.grid.occupied.keys())
-                    if not is_connected(new_positions):
-                        print(f"[WARN] Phase 1 connectivity broken at step {i+1}. This should not happen.")
-                    all_moves.append(safe_movement_dict)
-                else:
-                    print(f"[WARN] Phase 1 elakadás a {i+1}. lépésben.")
-                    break
-            else:
-                print(f"[WARN] Phase 1 no safe moves at step {i+1}.")
-                if current_positions != exo_target:
-                    print(f"[WARN] Phase 1 elakadás: nem érték el a cél alakzatot.")
-                break
-        else:
+        if not movement_dict:
             if current_positions != exo_target:
-                print(f"[WARN] Phase 1 elakadás: nem érték el a cél alakzatot.")
-            break
-
-    return all_moves
-
-
-def phase1_transformation_plan(env: Environment, exo_target: Set[Pos]) -> List[Dict[int, Move]]:
-   
-    working_env = deepcopy(env)
-    
-    all_moves = []
-    max_iterations = 2 * len(working_env.modules) ** 2
-
-    for i in range(max_iterations):
-        current_positions = set(working_env.grid.occupied.keys())
-
-        if current_positions == exo_target:
+                _trace.warn(f"[WARN] Phase 1 elakadás: nem érték el a cél alakzatot{note}.")
             break
 
-        holes_to_fill = exo_target - current_positions
-        movement_dict = {}
-
-        cx, cy = _get_center_of_mass(current_positions)
-
-        movable_modules_sorted = sorted(
-            list(working_env.modules.values()),
-            key=lambda mod: (
-                mod.pos in exo_target and not _find_closest_hole(mod.pos, holes_to_fill),
-                abs(mod.pos[0] - cx) + abs(mod.pos[1] - cy)
-            )
-        )
-
-        planned_target_positions = set()
-        temp_holes = holes_to_fill.copy()
-
-        for module in movable_modules_sorted:
-            mid = module.id
-            current_pos = module.pos
-            target_pos = _find_closest_hole(current_pos, temp_holes)
-
-            if target_pos:
-                move = _get_move_direction(current_pos, target_pos)
-                if move != Move.STAY and target_pos not in planned_target_positions:
-                    if _is_move_connectivity_safe(current_positions, current_pos, target_pos):
-                        movement_dict[mid] = move
-                        planned_target_positions.add(target_pos)
-                        temp_holes.discard(target_pos)
-                        if current_pos in exo_target:
-                            temp_holes.add(current_pos)
-
-        if movement_dict:
-            if working_env.step(movement_dict):
-                all_moves.append(movement_dict)
-            else:
-                print(f"[WARN] Phase 1 elakadás a {i+1}. lépésben (planning).")
+        step = movement_dict
+        if select:
+            # Use _select_safe_moves to ensure connectivity and prevent collisions
+            step = _select_safe_moves(env, movement_dict)
+            if not step:
+                _trace.warn(f"[WARN] Phase 1 no safe moves at step {i+1}.")
+                _trace.warn(f"[WARN] Phase 1 elakadás: nem érték el a cél alakzatot{note}.")
                 break
-        else:
-            if current_positions != exo_target:
-                print(f"[WARN] Phase 1 elakadás: nem érték el a cél alakzatot (planning).")
+
+        if not env.step(step):
+            _trace.warn(f"[WARN] Phase 1 elakadás a {i+1}. lépésben{note}.")
             break
+        # Verify connectivity after step (only selected steps are meant to keep it)
+        if select and not forest.connected and _trace.level >= WARN:
+            _trace.warn(f"[WARN] Phase 1 connectivity broken at step {i+1}. This should not happen. "
+                        f"Disconnecting moves: {_disconnecting_moves(env, step)}")
+        all_moves.append(step)
 
+    forest.detach()
     return all_moves
 
 
 class Phase1:
 
-    def __init__(self, ui):
+    def __init__(self, ui, env: Optional[Environment] = None):
         self.ui = ui
+        # ha a hívó környezetet ad át, azt használjuk a UI mátrixa helyett
+        self._start_env = env
         self.env: Environment = None
         self.sim_env: Environment = None
         self.initial_env: Environment = None
         self.done: bool = False
 
-        self.steps: List[Dict[int, Move]] = []  # lépések queue-ja
+        self.steps: List[MoveBatch] = []  # lépések queue-ja
         self.has_prepared: bool = False
+        self._mirror = MatrixMirror()
+        # a végrehajtott lépések összefüggőség-ellenőrzéséhez, a lépéssor végéig él
+        self._forest: Optional[SpanningForest] = None
 
 
     def build_env_from_ui(self) -> Tuple[Environment, int]:
-        matrix = self.ui.matrix
-        rows = len(matrix)
-        if rows == 0:
-            return Environment(), 1
-
-        cols = len(matrix[0])
-        env = Environment()
-        mid = 1
+        env = Environment.from_matrix(self.ui.matrix)
+        return env, len(env.modules) + 1
 
-        for y in range(rows):
-            for x in range(cols):
-                if matrix[y][x] == 1:
-                    grid_pos = (x, rows - 1 - y)
-                    env.add_module(Module(mid, grid_pos))
-                    mid += 1
-
-        return env, mid
+    def _initial_env(self) -> Environment:
+        if self._start_env is not None:
+            return self._start_env
+        return self.build_env_from_ui()[0]
 
 
     def _update_ui_with_env(self, env: Environment):
@@ -193,12 +159,12 @@ class Phase1:
         module_count = len(env.modules)
         positions_count = len(final_positions)
         if module_count != positions_count:
-            print(f"[Phase1] WARNING: Module count mismatch! "
+            _trace.warn(f"[Phase1] WARNING: Module count mismatch! "
                   f"Modules: {module_count}, Positions: {positions_count}")
             
             none_pos_modules = [mid for mid, mod in env.modules.items() if mod.pos is None]
             if none_pos_modules:
-                print(f"[Phase1] WARNING: {len(none_pos_modules)} modules have None position: {none_pos_modules}")
+                _trace.warn(f"[Phase1] WARNING: {len(none_pos_modules)} modules have None position: {none_pos_modules}")
             
             position_to_modules: Dict[Pos, List[int]] = {}
             for mid, mod in env.modules.items():
@@ -209,9 +175,9 @@ class Phase1:
             
             duplicates = {pos: mids for pos, mids in position_to_modules.items() if len(mids) > 1}
             if duplicates:
-                print(f"[Phase1] ERROR: {len(duplicates)} positions have multiple modules!")
+                _trace.error(f"[Phase1] ERROR: {len(duplicates)} positions have multiple modules!")
                 for pos, mids in duplicates.items():
-                    print(f"[Phase1]   Position {pos} has {len(mids)} modules: {mids}")
+                    _trace.error(f"[Phase1]   Position {pos} has {len(mids)} modules: {mids}")
                 self._fix_duplicate_positions(env, duplicates)
                 final_positions = {m.pos for m in env.modules.values() if m.pos is not None}
         
@@ -219,62 +185,47 @@ class Phase1:
             self.ui.update_matrix([[]])
             return
         
-        all_x = [p[0] for p in final_positions]
-        all_y = [p[1] for p in final_positions]
-        min_x, max_x = min(all_x), max(all_x)
-        min_y, max_y = min(all_y), max(all_y)
-        
-        rows = max_y - min_y + 1
-        cols = max_x - min_x + 1
-        new_matrix = [[0 for _ in range(cols)] for _ in range(rows)]
-        
-        for x, y in final_positions:
-            gui_x = x - min_x
-            gui_y = max_y - y
-            if 0 <= gui_y < rows and 0 <= gui_x < cols:
-                new_matrix[gui_y][gui_x] = 1
-        
-        matrix_module_count = sum(sum(row) for row in new_matrix)
-        if matrix_module_count != len(final_positions):
-            print(f"[Phase1] WARNING: Matrix module count mismatch! "
-                  f"Expected {len(final_positions)} modules, found {matrix_module_count} in matrix")
-        
-        self.ui.update_matrix(new_matrix)
+        # a keret a pozíciók befoglaló téglalapja, így minden modul bekerül a mátrixba
+        show(self.ui, self._mirror.update(final_positions))
 
 
     def execute_step(self):
         if self.done:
-            print("-- Phase 1 finished")
+            _trace.info("-- Phase 1 finished")
             return True
 
         if not self.has_prepared:
-            self.env, _ = self.build_env_from_ui()
-            
-            sim_env = deepcopy(self.env)
-            
-            exo_target = compute_exoskeleton_from_env(sim_env, ui=None, return_steps=False)
-            
-            phase1_steps = phase1_transformation(sim_env, exo_target)
-            
-            temp_env_for_steps = deepcopy(self.env)
-            compute_steps = compute_exoskeleton_from_env(temp_env_for_steps, ui=None, return_steps=True)
+            self.env = self._initial_env()
             
+            # a teljes tervet naplózva, helyben szimuláljuk, majd visszavonjuk;
+            # a compute_exoskeleton_from_env a célalakzatot a gridben hagyja
+            token = self.env.checkpoint()
+            try:
+                compute_steps = compute_exoskeleton_from_env(self.env, ui=None, return_steps=True)
+                exo_target = set(self.env.grid.occupied.keys())
+
+                phase1_steps = phase1_transformation(self.env, exo_target)
+
+                self.final_positions = set(self.env.grid.occupied.keys())
+            finally:
+                self.env.revert(token)
+
             self.steps = compute_steps + phase1_steps
             
-            self.final_positions = set(sim_env.grid.occupied.keys())
-            
             self.has_prepared = True
             self.done = False
+            self._forest = SpanningForest.attach(self.env)
             
             self._update_ui_with_env(self.env)
-            print(f"Phase 1 initialized. {len(self.steps)} steps planned.")
+            _trace.info(f"Phase 1 initialized. {len(self.steps)} steps planned.")
             return
 
         if not self.steps:
             if hasattr(self, 'final_positions'):
                 _update_env_positions(self.env, self.final_positions)
             
-            print("-- Phase 1 finished")
+            _trace.info("-- Phase 1 finished")
+            self._release_forest()
             self.done = True
             self._update_ui_with_env(self.env)
             self.ui.update_phase_label("Phase 1: Exoskeleton Constructed")
@@ -282,45 +233,20 @@ class Phase1:
 
         step = self.steps.pop(0)
         
-        # Collision detection: check if multiple modules target the same position
-        targets: Dict[int, Pos] = {}
-        for mid, mv in step.items():
-            if mid not in self.env.modules:
-                continue
-            mod = self.env.modules[mid]
-            dx, dy = mv.delta
-            tgt = (mod.pos[0] + dx, mod.pos[1] + dy)
-            if not self.env.grid.in_bounds(tgt):
-                tgt = mod.pos
-            targets[mid] = tgt
-        
-        position_to_modules: Dict[Pos, List[int]] = {}
-        for mid, tgt in targets.items():
-            if tgt not in position_to_modules:
-                position_to_modules[tgt] = []
-            position_to_modules[tgt].append(mid)
-        
-        # Filter out collisions - only allow one module per target position
-        safe_step: Dict[int, Move] = {}
-        for pos, module_ids in position_to_modules.items():
-            if len(module_ids) > 1:
-                module_ids.sort()
-                print(f"[Phase1] WARNING: Collision detected at {pos}! Modules {module_ids} all targeting same position.")
-                print(f"[Phase1] Only allowing module {module_ids[0]} to move, others will stay in place.")
-                mid = module_ids[0]
-                safe_step[mid] = step[mid]
-            else:
-                mid = module_ids[0]
-                safe_step[mid] = step[mid]
+        # Collision detection: conflicting moves are rejected, those modules stay in place
+        resolved = self.env.resolve_step(step)
+        for mid, reason in resolved.rejected.items():
+            _trace.warn(f"[Phase1] WARNING: Move of module {mid} rejected ({reason}), it stays in place.")
         
         # Use _select_safe_moves to ensure connectivity
-        connectivity_safe_step = _select_safe_moves(self.env, safe_step)
+        connectivity_safe_step = _select_safe_moves(self.env, resolved.applied)
         
         if not connectivity_safe_step:
-            print(f"[Phase1] WARNING: No connectivity-safe moves in step. Skipping step.")
+            _trace.warn(f"[Phase1] WARNING: No connectivity-safe moves in step. Skipping step.")
             if not self.steps:
                 if hasattr(self, 'final_positions'):
                     _update_env_positions(self.env, self.final_positions)
+                self._release_forest()
                 self.done = True
                 self._update_ui_with_env(self.env)
                 self.ui.update_phase_label("Phase 1: Exoskeleton Constructed")
@@ -329,36 +255,44 @@ class Phase1:
         success = self.env.step(connectivity_safe_step)
         
         if not success:
-            print(f"Warning: Step execution failed. Skipping step.")
+            _trace.warn(f"Warning: Step execution failed. Skipping step.")
             if not self.steps:
                 if hasattr(self, 'final_positions'):
                     _update_env_positions(self.env, self.final_positions)
+                self._release_forest()
                 self.done = True
                 self._update_ui_with_env(self.env)
                 self.ui.update_phase_label("Phase 1: Exoskeleton Constructed")
             return
         
         # Verify connectivity after step
-        new_positions = {mod.pos for mod in self.env.modules.values() if mod.pos is not None}
-        if not is_connected(new_positions):
-            print(f"[Phase1] ERROR: Connectivity broken after step! This should not happen.")
+        if not self._forest.connected and _trace.level >= ERROR:
+            _trace.error(f"[Phase1] ERROR: Connectivity broken after step! This should not happen. "
+                         f"Disconnecting moves: {_disconnecting_moves(self.env, success.applied)}")
         
         # Sync grid with module positions
         self._sync_grid_with_modules()
 
-        print(f"Step executed: {len(connectivity_safe_step)} modules moved")
-        for mid, mv in connectivity_safe_step.items():
-            cur_pos = self.env.modules[mid].pos
-            prev_pos = (cur_pos[0] - mv.delta[0], cur_pos[1] - mv.delta[1])
-            print(f"  Module {mid}: {prev_pos} -> {cur_pos} ({mv.name})")
+        _trace.info(f"Step executed: {len(connectivity_safe_step)} modules moved")
+        if _trace.level >= DEBUG:
+            for mid, mv in connectivity_safe_step.items():
+                cur_pos = self.env.modules[mid].pos
+                prev_pos = (cur_pos[0] - mv.delta[0], cur_pos[1] - mv.delta[1])
+                _trace.debug(f"  Module {mid}: {prev_pos} -> {cur_pos} ({mv.name})")
 
         self._update_ui_with_env(self.env)
             
       
 
 
+    def _release_forest(self):
+        # a környezet a következő fázishoz kerül, ne frissítsük tovább az erdőt
+        if self._forest is not None:
+            self._forest.detach()
+            self._forest = None
+
     def execute_phase(self):
-        self.env, _ = self.build_env_from_ui()
+        self.env = self._initial_env()
         exo_target = compute_exoskeleton_from_env(self.env)
 
         movement_list = phase1_transformation(self.env, exo_target)
@@ -368,14 +302,14 @@ class Phase1:
         self.ui.update_phase_label(
             f"Phase 1: Exoskeleton Constructed ({len(movement_list)} steps)"
         )
-        print("Phase 1 completed successfully.")
+        _trace.info("Phase 1 completed successfully.")
     
     def _fix_duplicate_positions(self, env: Environment, duplicates: Dict[Pos, List[int]]):
         """Fix duplicate positions by moving modules to empty, connectivity-safe positions."""
         from collections import deque
         from typing import Optional
         
-        print(f"[Phase1] Fixing {len(duplicates)} duplicate positions...")
+        _trace.info(f"[Phase1] Fixing {len(duplicates)} duplicate positions...")
         
         occupied = {mod.pos for mod in env.modules.values() if mod.pos is not None}
         occupied.update(env.grid.occupied.keys())
@@ -399,11 +333,11 @@ class Phase1:
                         if empty_pos in all_moves.values():
                             empty_pos = self._find_nearest_empty_position_connectivity_safe(pos, occupied, env, old_pos, exclude=set(all_moves.values()))
                             if not empty_pos:
-                                print(f"[Phase1] ERROR: Could not find connectivity-safe position for module {mid}!")
+                                _trace.error(f"[Phase1] ERROR: Could not find connectivity-safe position for module {mid}!")
                                 failed_count += 1
                                 continue
                         else:
-                            print(f"[Phase1] WARNING: Position {empty_pos} is occupied! Skipping module {mid}.")
+                            _trace.warn(f"[Phase1] WARNING: Position {empty_pos} is occupied! Skipping module {mid}.")
                             failed_count += 1
                             continue
                     
@@ -411,7 +345,7 @@ class Phase1:
                     test_positions.discard(old_pos)
                     test_positions.add(empty_pos)
                     if not is_connected(test_positions):
-                        print(f"[Phase1] ERROR: Position {empty_pos} breaks connectivity! Skipping module {mid}.")
+                        _trace.error(f"[Phase1] ERROR: Position {empty_pos} breaks connectivity! Skipping module {mid}.")
                         failed_count += 1
                         continue
                     
@@ -420,7 +354,7 @@ class Phase1:
                     occupied.add(empty_pos)
                     fixed_count += 1
                 else:
-                    print(f"[Phase1] ERROR: Could not find connectivity-safe empty position for module {mid}!")
+                    _trace.error(f"[Phase1] ERROR: Could not find connectivity-safe empty position for module {mid}!")
                     failed_count += 1
         
         for mid, new_pos in all_moves.items():
@@ -433,11 +367,11 @@ class Phase1:
             test_positions.add(new_pos)
             
             if not is_connected(test_positions):
-                print(f"[Phase1] ERROR: Moving module {mid} to {new_pos} would break connectivity! Skipping this move.")
+                _trace.error(f"[Phase1] ERROR: Moving module {mid} to {new_pos} would break connectivity! Skipping this move.")
                 failed_count += 1
                 continue
             
-            print(f"[Phase1] Moving module {mid} from duplicate position {old_pos} to {new_pos} (connectivity-safe)")
+            _trace.info(f"[Phase1] Moving module {mid} from duplicate position {old_pos} to {new_pos} (connectivity-safe)")
             
             mod.pos = new_pos
             
@@ -448,21 +382,20 @@ class Phase1:
             env.grid.place(mid, new_pos)
             
             new_positions = {m.pos for m in env.modules.values() if m.pos is not None}
-            if not is_connected(new_positions):
-                print(f"[Phase1] ERROR: Connectivity broken after moving module {mid}! Reverting move.")
+            if not is_connected(new_positions, key=env.occupancy_hash):
+                _trace.error(f"[Phase1] ERROR: Connectivity broken after moving module {mid}! Reverting move.")
                 mod.pos = old_pos
                 env.grid.remove(new_pos)
                 env.grid.place(mid, old_pos)
                 failed_count += 1
                 continue
         
-        print(f"[Phase1] Duplicate fix complete: {fixed_count} modules moved, {failed_count} failed")
-        
-        final_positions = {m.pos for m in env.modules.values() if m.pos is not None}
-        if not is_connected(final_positions):
-            print(f"[Phase1] ERROR: Connectivity broken after duplicate fix! This should not happen.")
+        _trace.info(f"[Phase1] Duplicate fix complete: {fixed_count} modules moved, {failed_count} failed")
         
         self._sync_grid_with_modules()
+        # a szinkron után a rács a hiteles: csempézett rácson csempénként ellenőrzünk
+        if not grid_is_connected(env.grid):
+            _trace.error(f"[Phase1] ERROR: Connectivity broken after duplicate fix! This should not happen.")
     
     def _find_nearest_empty_position_connectivity_safe(self, start_pos: Pos, occupied: Set[Pos], env: Environment, module_pos: Pos, exclude: Optional[Set[Pos]] = None) -> Optional[Pos]:
         """Find nearest empty position that maintains connectivity."""
@@ -474,6 +407,7 @@ class Phase1:
         MAX_SEARCH_DISTANCE = 100
         MAX_VISITED = 2000
         
+        oracle = None
         queue = deque([(start_pos, 0)])
         visited = {start_pos}
         directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
@@ -502,23 +436,27 @@ class Phase1:
                     queue.append((neighbor, neighbor_dist))
                     continue
                 
-                test_positions = occupied.copy()
-                test_positions.discard(module_pos)
-                test_positions.add(neighbor)
-                
-                if is_connected(test_positions):
+                # a 3x3-as tábla és a korlátos BFS a legtöbb jelöltet elveti oracle nélkül;
+                # az occupied halmaz a keresés alatt nem változik, az oracle-t elég egyszer felépíteni
+                verdict = check_move(occupied, module_pos, neighbor) if module_pos in occupied else None
+                if verdict is None:
+                    MOVE_TIERS.full += 1
+                    if oracle is None:
+                        oracle = ArticulationOracle(occupied)
+                    verdict = oracle.can_move(module_pos, neighbor)
+                if verdict:
                     return neighbor
                 
                 queue.append((neighbor, neighbor_dist))
         
         if len(visited) >= MAX_VISITED:
-            print(f"[Phase1] WARNING: Search limit reached ({MAX_VISITED} positions) while looking for connectivity-safe empty position near {start_pos}")
+            _trace.warn(f"[Phase1] WARNING: Search limit reached ({MAX_VISITED} positions) while looking for connectivity-safe empty position near {start_pos}")
         
         return None
     
     def _sync_grid_with_modules(self):
         """Sync grid with module positions, removing duplicates and ensuring consistency."""
-        self.env.grid.occupied.clear()
+        self.env.grid.clear()
         
         position_to_modules: Dict[Pos, List[int]] = {}
         for mid, mod in self.env.modules.items():
@@ -529,7 +467,7 @@ class Phase1:
         
         for pos, module_ids in position_to_modules.items():
             if len(module_ids) > 1:
-                print(f"[Phase1] WARNING: Grid sync found {len(module_ids)} modules at position {pos}: {module_ids}")
+                _trace.warn(f"[Phase1] WARNING: Grid sync found {len(module_ids)} modules at position {pos}: {module_ids}")
                 module_ids.sort()
                 keep_module = module_ids[0]
                 modules_to_fix = module_ids[1:]
@@ -546,12 +484,12 @@ class Phase1:
                         test_positions.discard(pos)
                         test_positions.add(empty_pos)
                         if is_connected(test_positions):
-                            print(f"[Phase1] Moving duplicate module {mid} from {pos} to {empty_pos} during grid sync (connectivity-safe)")
+                            _trace.info(f"[Phase1] Moving duplicate module {mid} from {pos} to {empty_pos} during grid sync (connectivity-safe)")
                             mod.pos = empty_pos
                             self.env.grid.place(mid, empty_pos)
                         else:
-                            print(f"[Phase1] ERROR: Position {empty_pos} breaks connectivity for module {mid} during grid sync!")
+                            _trace.error(f"[Phase1] ERROR: Position {empty_pos} breaks connectivity for module {mid} during grid sync!")
                     else:
-                        print(f"[Phase1] ERROR: Could not find connectivity-safe empty position for duplicate module {mid} during grid sync!")
+                        _trace.error(f"[Phase1] ERROR: Could not find connectivity-safe empty position for duplicate module {mid} during grid sync!")
             else:
                 self.env.grid.place(module_ids[0], pos)
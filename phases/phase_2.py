@@ -1,15 +1,18 @@
-from environment import Environment
-from structures.module import Module, Move
+from environment import Environment, extended_height
+from conversion import MatrixMirror, show
+from structures.module import Module, Move, MoveBatch
 from structures.scaffolding import compute_scaffolding_from_env  # a Phase 2 logikája
 from structures.skeleton import _get_center_of_mass
-from typing import Tuple, Set, Dict, List
-from copy import deepcopy
+from typing import Tuple, Set, Dict, List, Optional
+from tracing import get_tracer, DEBUG
+
+_trace = get_tracer('phase2')
 
 def execute_phase(ui=None):
-    print("Executing Phase 2: Building Scaffolding")
+    _trace.info("Executing Phase 2: Building Scaffolding")
 
     if ui is None:
-        print("No UI reference provided. Phase 2 cannot update GUI.")
+        _trace.info("No UI reference provided. Phase 2 cannot update GUI.")
         return
 
     # --- 1) Read matrix from UI
@@ -37,7 +40,7 @@ def execute_phase(ui=None):
 
     # --- 4) Compute scaffolding
     scaff_cells = compute_scaffolding_from_env(env, center_cell)
-    print(f"Scaffolding generated with {len(scaff_cells)} cells.")
+    _trace.info(f"Scaffolding generated with {len(scaff_cells)} cells.")
 
     # --- 5) Update GUI matrix
     all_positions = scaff_cells
@@ -59,50 +62,45 @@ def execute_phase(ui=None):
     # --- 6) Update GUI
     ui.update_matrix(new_matrix)
     ui.update_phase_label("Phase 2: Scaffolding Constructed")
-    print("Phase 2 completed successfully.")
+    _trace.info("Phase 2 completed successfully.")
 
 class Phase2:
-    def __init__(self, ui):
+    def __init__(self, ui, env: Optional[Environment] = None):
         self.ui = ui
-        self.env, mid = self.build_env_from_ui()
+        if env is not None:
+            # az előző fázis környezete, a megjelenített mátrix koordináta-rendszerébe tolva
+            self.env = env.normalize_origin()
+            min_x, max_x, min_y, max_y = self.env.find_bounds()
+            self._start_rows = max_y - min_y + 1
+        else:
+            self.env, mid = self.build_env_from_ui()
+            self._start_rows = len(self.ui.matrix)
         self.setup()
         self.env_queue = []
+        self._mirror = MatrixMirror()
         self.line_1_done = False
         self.line_2_done = False
         self.line_3_done = False
         self.done = False
 
+    def _display(self, env) -> None:
+        # csak az előzőleg megjelenített állapothoz képest változott cellák frissülnek
+        show(self.ui, self._mirror.update(env.positions(), tuple(env.find_bounds())))
+
     def build_env_from_ui(self) -> Tuple[Environment, int]:
-        matrix = self.ui.matrix
-        rows = len(matrix)
-        if rows == 0:
-            return Environment(), 1
-
-        cols = len(matrix[0])
-        env = Environment()
-        mid = 1
-
-        for y in range(rows):
-            for x in range(cols):
-                if matrix[y][x] == 1:
-                    grid_pos = (x, rows - 1 - y)
-                    env.add_module(Module(mid, grid_pos))
-                    mid += 1
-
-        return env, mid
+        env = Environment.from_matrix(self.ui.matrix)
+        return env, len(env.modules) + 1
     
     def setup(self):
         # Calculating extended bounding box, so that its height is multiple of 3
-        bounding_box_height = max(len(self.ui.matrix) , len(self.ui.goal_matrix))
-        extended_bounding_box_height = bounding_box_height
-        if bounding_box_height % 3 != 0:
-            extended_bounding_box_height += 3 - (bounding_box_height % 3)
+        bounding_box_height = max(self._start_rows, len(self.ui.goal_matrix))
+        extended_bounding_box_height = extended_height(bounding_box_height)
         
         min_x, max_x, min_y, max_y = self.env.find_bounds()
         self.max_x = max_x
         self.min_y = min_y
         self.max_y = min_y + extended_bounding_box_height - 1
-        print('Max x:', self.max_x, 'Min y:', self.min_y, 'Max y:', self.max_y)
+        _trace.debug('Max x:', self.max_x, 'Min y:', self.min_y, 'Max y:', self.max_y)
         positions = []
         for module in self.env.modules.values():
             positions.append(module.pos)
@@ -133,58 +131,57 @@ class Phase2:
 
 
         if type(self.env.find_module_at(self.center_pos)) == Module:
-            print('Baj van!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+            _trace.warn('Baj van!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
 
         if self.center_pos[0] == self.max_x - 2:
             self.center_pos[0] = self.max_x - 3
             module_to_move = self.env.find_module_at([self.max_x - 3, self.center_pos[1]])
-            movement_dict = {}
+            movement_dict = MoveBatch()
             movement_dict[module_to_move.id] = Move.EAST
             self.env.transformation(movement_dict)
-            self.env_queue.append(deepcopy(self.env))
+            self.env_queue.append(self.env.snapshot())
         
         elif self.center_pos[0] == self.max_x - 1:
             self.center_pos[0] = self.max_x - 3
             modules_to_move = [self.env.find_module_at([self.max_x - 3, self.center_pos[1]]), self.env.find_module_at([self.max_x - 2, self.center_pos[1]])]
-            movement_dict = {}
+            movement_dict = MoveBatch()
             for module_to_move in modules_to_move:
                 movement_dict[module_to_move.id] = Move.EAST
             self.env.transformation(movement_dict)
-            self.env_queue.append(deepcopy(self.env))
+            self.env_queue.append(self.env.snapshot())
 
         elif self.center_pos[0] == self.max_x:
             self.center_pos[0] = self.max_x - 3
             modules_to_move = [self.env.find_module_at([self.max_x - 3, self.center_pos[1]]), self.env.find_module_at([self.max_x - 2, self.center_pos[1]]), self.env.find_module_at([self.max_x - 1, self.center_pos[1]])]
-            movement_dict = {}
+            movement_dict = MoveBatch()
             for module_to_move in modules_to_move:
                 movement_dict[module_to_move.id] = Move.EAST
             self.env.transformation(movement_dict)
-            self.env_queue.append(deepcopy(self.env))
+            self.env_queue.append(self.env.snapshot())
             
 
             
-        print('Center pos:', self.center_pos)
+        _trace.debug('Center pos:', self.center_pos)
 
         # Grow arm
         self.arm = []
         for x in range(self.center_pos[0], max_x + 1):
             self.arm.append(self.env.find_module_at([x, self.center_pos[1]]))
 
-        print('Arm:', self.arm)
+        _trace.debug('Arm:', self.arm)
 
     def execute_step(self):
-        print("-- Phase 2 step")
+        _trace.debug("-- Phase 2 step")
 
         if len(self.env_queue) == 0:
             self.gather_modules()
             self.build_sweepline()
             
-        print(self.env_queue)
-        env_to_display = self.env_queue.pop(0)
-        self.ui.update_matrix(env_to_display.matrix_from_environment())
+        _trace.debug(self.env_queue)
+        self._display(self.env_queue.pop(0))
 
         if self.done:
-            print('Phase 2 done.')
+            _trace.info('Phase 2 done.')
             return True
 
     def build_sweepline(self):
@@ -192,15 +189,15 @@ class Phase2:
         
 
         if not self.line_1_done:
-            print('Building line 1')
+            _trace.debug('Building line 1')
             max_x = self.max_x
             
         elif not self.line_2_done:
-            print('Building line 2')
+            _trace.debug('Building line 2')
             max_x = self.max_x - 1
 
         elif not self.line_3_done:
-            print('Building line 3')
+            _trace.debug('Building line 3')
             max_x = self.max_x - 2
 
         # Grow arm
@@ -208,32 +205,22 @@ class Phase2:
         for x in range(self.center_pos[0], max_x + 1):
             self.arm.append(self.env.find_module_at([x, self.center_pos[1]]))
 
-        print('Arm:', self.arm)
+        _trace.debug('Arm:', self.arm)
 
-        movement_dict = {}
+        movement_dict = MoveBatch()
         for i, module in enumerate(self.arm):
             if i < len(self.arm) - 1:
                 movement_dict[module.id] = Move.EAST
 
         if not self.line_1_done or not self.line_2_done or not self.line_3_done:
             # Push up?
-            modules_to_move = []
-            for y in range(self.center_pos[1], self.max_y + 1):
-                module = self.env.find_module_at([max_x, y])
-                if type(module) == Module:
-                    modules_to_move.append(module)
-                else:
-                    break
+            modules_to_move = self.env.run_modules((max_x, self.center_pos[1]), Move.NORTH,
+                                                   self.max_y - self.center_pos[1] + 1)
             
             # If no spaces above push down
             if len(modules_to_move) == max_y - self.center_pos[1] + 1:
-                modules_to_move = []
-                for y in range(self.center_pos[1], self.min_y - 1, -1):
-                    module = self.env.find_module_at([max_x, y])
-                    if type(module) == Module:
-                        modules_to_move.append(module)
-                    else:
-                        break
+                modules_to_move = self.env.run_modules((max_x, self.center_pos[1]), Move.SOUTH,
+                                                       self.center_pos[1] - self.min_y + 1)
                 # If no space below either, move on to next line
                 if len(modules_to_move) == self.center_pos[1] - self.min_y + 1:
                     if not self.line_1_done:
@@ -249,45 +236,41 @@ class Phase2:
                     for module in modules_to_move:
                         movement_dict[module.id] = Move.SOUTH
                     self.env.transformation(movement_dict)
-                    self.env_queue.append(deepcopy(self.env))
+                    self.env_queue.append(self.env.snapshot())
                     return
             else:
                 for module in modules_to_move:
                     movement_dict[module.id] = Move.NORTH
                 self.env.transformation(movement_dict)
-                self.env_queue.append(deepcopy(self.env))
+                self.env_queue.append(self.env.snapshot())
                 return
 
         else:
-            print('Sweepline done.')
+            _trace.info('Sweepline done.')
             self.done = True
 
     def gather_modules(self):
         scanned_modules = self.scan()
-        print('Scanned modules:', [(mod, mod.pos, direction) for mod, direction in scanned_modules])
+        if _trace.level >= DEBUG:
+            _trace.debug('Scanned modules:', [(mod, mod.pos, direction) for mod, direction in scanned_modules])
 
         if len(scanned_modules) == 0:
-            print('No modules to gather.')
+            _trace.info('No modules to gather.')
             return
 
-        movement_dict = {}
+        movement_dict = MoveBatch()
         for module, direction in scanned_modules:
             movement_dict[module.id] = direction
 
         self.env.transformation(movement_dict)
-        self.env_queue.append(deepcopy(self.env))
+        self.env_queue.append(self.env.snapshot())
 
     def scan(self):
         min_x, max_x, min_y, max_y = self.env.find_bounds()
-        scanned_modules = []
+        cx, cy = self.center_pos
         # Scan north of center
-        for y in range(self.center_pos[1] + 1, max_y + 1):
-
-            module = self.env.find_module_at([self.center_pos[0], y])
-            if type(module) == Module:
-                scanned_modules.append([module, Move.SOUTH])
-            else:
-                break
+        scanned_modules = [[module, Move.SOUTH]
+                           for module in self.env.run_modules((cx, cy + 1), Move.NORTH, max_y - cy)]
 
         northwest_scanned_modules = []
         northeast_scanned_modules = []
@@ -295,20 +278,12 @@ class Phase2:
         southeast_scanned_modules = []
         if len(scanned_modules) > 0:
             nortwest_y = scanned_modules[-1][0].pos[1]
-            for x in range(self.center_pos[0] - 1, min_x - 1, -1):
-                module = self.env.find_module_at([x, nortwest_y])
-                if type(module) == Module:
-                    northwest_scanned_modules.append([module, Move.EAST])
-                else:
-                    break
+            northwest_scanned_modules = [[module, Move.EAST]
+                                         for module in self.env.run_modules((cx - 1, nortwest_y), Move.WEST, cx - min_x)]
             
             northeast_y = scanned_modules[-1][0].pos[1]
-            for x in range(self.center_pos[0] + 1, max_x - 2):
-                module = self.env.find_module_at([x, northeast_y])
-                if type(module) == Module:
-                    northeast_scanned_modules.append([module, Move.WEST])
-                else:
-                    break
+            northeast_scanned_modules = [[module, Move.WEST]
+                                         for module in self.env.run_modules((cx + 1, northeast_y), Move.EAST, max_x - 3 - cx)]
             
         if len(northwest_scanned_modules) > 0:
             for module, direction in northwest_scanned_modules:
@@ -320,28 +295,16 @@ class Phase2:
 
         if len(scanned_modules) == 0:
             # Scan south of center
-            for y in range(self.center_pos[1] - 1, min_y - 1, -1):
-                module = self.env.find_module_at([self.center_pos[0], y])
-                if type(module) == Module:
-                    scanned_modules.append([module, Move.NORTH])
-                else:
-                    break
+            scanned_modules = [[module, Move.NORTH]
+                               for module in self.env.run_modules((cx, cy - 1), Move.SOUTH, cy - min_y)]
             
             southwest_y = scanned_modules[-1][0].pos[1]
-            for x in range(self.center_pos[0] - 1, min_x - 1, -1):
-                module = self.env.find_module_at([x, southwest_y])
-                if type(module) == Module:
-                    southwest_scanned_modules.append([module, Move.EAST])
-                else:
-                    break
+            southwest_scanned_modules = [[module, Move.EAST]
+                                         for module in self.env.run_modules((cx - 1, southwest_y), Move.WEST, cx - min_x)]
 
             southeast_y = scanned_modules[-1][0].pos[1]
-            for x in range(self.center_pos[0] + 1, max_x - 2):
-                module = self.env.find_module_at([x, southeast_y])
-                if type(module) == Module:
-                    southeast_scanned_modules.append([module, Move.WEST])
-                else:
-                    break
+            southeast_scanned_modules = [[module, Move.WEST]
+                                         for module in self.env.run_modules((cx + 1, southeast_y), Move.EAST, max_x - 3 - cx)]
             
             if len(southwest_scanned_modules) > 0:
                 for module, direction in southwest_scanned_modules:
@@ -353,11 +316,7 @@ class Phase2:
 
         if len(scanned_modules) == 0:
             # Scan west of center
-            for x in range(self.center_pos[0] - 1, min_x - 1, -1):
-                module = self.env.find_module_at([x, self.center_pos[1]])
-                if type(module) == Module:
-                    scanned_modules.append([module, Move.EAST])
-                else:
-                    break
+            scanned_modules = [[module, Move.EAST]
+                               for module in self.env.run_modules((cx - 1, cy), Move.WEST, cx - min_x)]
 
         return scanned_modules
@@ -1,18 +1,27 @@
-from environment import Environment
+from environment import Environment, EnvSnapshot
+from conversion import MatrixMirror, show
 from structures.module import Module
 from structures.sweepline import SweepLine
 from structures.metamodule import MetaModule
 from structures.histogram import Histogram
 from sweep import compute_histogram_from_environment
-from typing import Tuple, List
-from copy import deepcopy
+from typing import Tuple, List, Optional
+from tracing import get_tracer
+
+_trace = get_tracer('phase3')
 
 class Phase_3:
-    def __init__(self, ui):
+    def __init__(self, ui, env: Optional[Environment] = None):
         self.ui = ui
         self.step_count = 0
-        self.env_queue: List[Environment] = []
-        self.env, mid = self.build_env_from_ui()
+        # csak megjelenítésre; self.env mindig a legfrissebb állapotot tartja
+        self.env_queue: List[EnvSnapshot] = []
+        if env is not None:
+            # az előző fázis környezete, a megjelenített mátrix koordináta-rendszerébe tolva
+            self.env = env.normalize_origin()
+        else:
+            self.env, mid = self.build_env_from_ui()
+        self._mirror = MatrixMirror()
         self.done = False
         self.histogram_compact = False
         self.histogram = None
@@ -45,13 +54,12 @@ class Phase_3:
         else:
             self.sweep_line = SweepLine(self.sweep_line.x - 1, metamodules)
         done = self.sweep_line.clean(self.env, self.env_queue)
-        print('---Sweep Line Cleaned---')
-        print('done? ', done)
+        _trace.debug('---Sweep Line Cleaned---')
+        _trace.debug('done? ', done)
 
     def clean_step(self):
         metamodules = []
         if len(self.env_queue) != 0:
-            self.env = self.env_queue[-1]
             for metamodule in self.sweep_line.metamodules:
                 x = metamodule.x
                 metamodules.append(MetaModule(metamodule.x, metamodule.y, self.env))
@@ -60,13 +68,12 @@ class Phase_3:
             self.sweep_line.full_diagnostic(self.env)
 
         done = self.sweep_line.clean(self.env, self.env_queue)
-        print('---Sweep Line Cleaned---')
-        print('done? ', done)
+        _trace.debug('---Sweep Line Cleaned---')
+        _trace.debug('done? ', done)
 
     def gather_step(self, i):
         clean_metamodules = []
         if len(self.env_queue) != 0:
-            self.env = self.env_queue[-1]
             for metamodule in self.sweep_line.metamodules:
                 clean_x = metamodule.x
                 clean_metamodules.append(MetaModule(metamodule.x, metamodule.y, self.env))
@@ -79,7 +86,6 @@ class Phase_3:
     def advance_step(self):
         clean_metamodules = []
         if len(self.env_queue) != 0:
-            self.env = self.env_queue[-1]
             for metamodule in self.sweep_line.metamodules:
                 clean_x = metamodule.x
                 clean_metamodules.append(MetaModule(metamodule.x, metamodule.y, self.env))
@@ -88,19 +94,17 @@ class Phase_3:
             self.sweep_line.full_diagnostic(self.env)
 
         self.sweep_line.advance(self.env, self.env_queue)
-        print('---Sweep Line Advanced---')
+        _trace.debug('---Sweep Line Advanced---')
 
     def execute_step(self):
         if self.done:
-            print('--Sweep line finished sweeping')
+            _trace.info('--Sweep line finished sweeping')
             return True
         
-        print("Executing Step in Phase 3")
+        _trace.debug("Executing Step in Phase 3")
         
         if len(self.env_queue) > 0:
-            env_to_display = self.env_queue.pop(0)
-            self.env = env_to_display
-            self.ui.update_matrix(env_to_display.matrix_from_environment())
+            self._display(self.env_queue.pop(0))
             return False
         
         if not self.sweep_initialized:
@@ -112,12 +116,10 @@ class Phase_3:
             self.advance_done = False
             
             if len(self.env_queue) == 0:
-                print('--Sweep line finished sweeping')
+                _trace.info('--Sweep line finished sweeping')
                 self.done = True
                 return True
-            env_to_display = self.env_queue.pop(0)
-            self.env = env_to_display
-            self.ui.update_matrix(env_to_display.matrix_from_environment())
+            self._display(self.env_queue.pop(0))
             return False
         
         if not self.all_gathers_done:
@@ -127,9 +129,7 @@ class Phase_3:
                     self.gather_step(self.current_gather_index)
                     self.need_clean_after_gather = True
                     if len(self.env_queue) > 0:
-                        env_to_display = self.env_queue.pop(0)
-                        self.env = env_to_display
-                        self.ui.update_matrix(env_to_display.matrix_from_environment())
+                        self._display(self.env_queue.pop(0))
                         return False
                 else:
                     self.all_gathers_done = True
@@ -137,17 +137,13 @@ class Phase_3:
                 self.clean_step()
                 self.need_clean_after_gather = False
                 if len(self.env_queue) > 0:
-                    env_to_display = self.env_queue.pop(0)
-                    self.env = env_to_display
-                    self.ui.update_matrix(env_to_display.matrix_from_environment())
+                    self._display(self.env_queue.pop(0))
                     return False
         
         if self.all_gathers_done and not self.advance_done:
             self.advance_step()
             if len(self.env_queue) > 0:
-                env_to_display = self.env_queue.pop(0)
-                self.env = env_to_display
-                self.ui.update_matrix(env_to_display.matrix_from_environment())
+                self._display(self.env_queue.pop(0))
                 return False
             self.advance_done = True
         
@@ -158,14 +154,12 @@ class Phase_3:
             self.advance_done = False
         
         if len(self.env_queue) == 0:
-            print('--Sweep line finished sweeping')
+            _trace.info('--Sweep line finished sweeping')
             self.done = True
             return True
         
         if len(self.env_queue) > 0:
-            env_to_display = self.env_queue.pop(0)
-            self.env = env_to_display
-            self.ui.update_matrix(env_to_display.matrix_from_environment())
+            self._display(self.env_queue.pop(0))
             return False
         
         return False
@@ -175,10 +169,7 @@ class Phase_3:
             self.histogram = Histogram(self.env)
 
         if len(self.env_queue) > 0:
-            env_to_display = self.env_queue.pop(0)
-            self.env = env_to_display
-            self.histogram.update_env(env_to_display)
-            self.ui.update_matrix(env_to_display.matrix_from_environment())
+            self._display(self.env_queue.pop(0))
             return False
 
         
@@ -186,10 +177,10 @@ class Phase_3:
             is_finished = self.histogram.compact_to_left(self.env_queue)
             
             if not is_finished:
-                print(f"Compacting step generated. Queue size: {len(self.env_queue)}")
+                _trace.debug(f"Compacting step generated. Queue size: {len(self.env_queue)}")
                 return False
             else:
-                print('Compaction complete. Switching to Vertical Shift (Snakes).')
+                _trace.info('Compaction complete. Switching to Vertical Shift (Snakes).')
                 self.histogram_compact = True
                 
                 self.histogram.calculate_ideal_shape()
@@ -199,22 +190,22 @@ class Phase_3:
             result = self.histogram.shift_down()
             
             if result == 'done':
-                print('--Histogram construction complete')
+                _trace.info('--Histogram construction complete')
                 return True
             
             if isinstance(result, Environment):
                 self.env = result
-                self.ui.update_matrix(result.matrix_from_environment())
+                self._display(result)
             
             return False
         
     def execute_phase(self):
-        print("Executing Phase 3")
+        _trace.info("Executing Phase 3")
         
         env, mid = self.build_env_from_ui()
 
         histogram = compute_histogram_from_environment(env)
-        print(f"Histogram generated with {len(histogram)} cells.")
+        _trace.info(f"Histogram generated with {len(histogram)} cells.")
 
         all_positions = histogram
         min_x_pos = min(x for x, _ in all_positions)
@@ -234,24 +225,16 @@ class Phase_3:
 
         self.ui.update_matrix(new_matrix)
         self.ui.update_phase_label("Phase 3: Histogram constructed")
-        print("Phase 3 completed successfully.")
+        _trace.info("Phase 3 completed successfully.")
+
+    def _display(self, env) -> None:
+        # csak az előzőleg megjelenített állapothoz képest változott cellák frissülnek
+        show(self.ui, self._mirror.update(env.positions(), tuple(env.find_bounds())))
 
     def build_env_from_ui(self):
         if self.ui is None:
-            print("No UI reference provided. Phase 3 cannot update GUI.")
+            _trace.info("No UI reference provided. Phase 3 cannot update GUI.")
             return
 
-        matrix = self.ui.matrix
-        rows, cols = len(matrix), len(matrix[0])
-
-
-        env = Environment()
-        mid = 1
-        for y in range(rows):
-            for x in range(cols):
-                if matrix[y][x] == 1:
-                    grid_pos = (x, rows - 1 - y)  # convert GUI->grid
-                    env.add_module(Module(mid, grid_pos))
-                    mid += 1
-
-        return env, mid
\ No newline at end of file
+        env = Environment.from_matrix(self.ui.matrix)
+        return env, len(env.modules) + 1
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+import time
+from contextlib import nullcontext
+from typing import List, Optional, Sequence, Tuple, Union
+
+import tracing
+from environment import Environment
+from grid import make_grid
+from phases.phase_1 import Phase1
+from phases.phase_2 import Phase2
+from phases.phase_3 import Phase_3
+from phases.phase_4 import Phase4
+
+# Fej nélküli futtatás: a négy fázis egymás után, tkinter / PIL nélkül. A fázisok
+# a környezetet közvetlenül adják tovább egymásnak, a HeadlessUI csak a fázisok által
+# hívott visszahívásokat nyeli el.
+
+Matrix = List[List[int]]
+Pos = Tuple[int, int]
+MatrixSource = Union[str, "os.PathLike[str]", Sequence[Sequence[int]]]
+
+PHASE_COUNT = 4
+DEFAULT_MAX_STEPS = 20000
+
+
+def load_matrix(filename) -> Matrix:
+    """0/1 konfigurációs fájl beolvasása (soronként egy mátrixsor, üres sorok nélkül)."""
+    with open(filename) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return [[int(c) for c in line] for line in lines]
+
+
+def _as_matrix(source: MatrixSource) -> Matrix:
+    if isinstance(source, (str, os.PathLike)):
+        return load_matrix(source)
+    return [list(row) for row in source]
+
+
+class HeadlessUI:
+    """A fázisok UI-interfésze rajzolás nélkül: csak az utolsó mátrixot tartja meg."""
+
+    def __init__(self, matrix: Matrix, goal_matrix: Matrix):
+        self.matrix = matrix
+        self.goal_matrix = goal_matrix
+
+    def update_matrix(self, new_matrix: Matrix) -> None:
+        self.matrix = new_matrix
+
+    def update_phase_label(self, text: str) -> None:
+        pass
+
+    def draw_matrix(self) -> None:
+        pass
+
+
+class Result:
+    """
+    Egy run_reconfiguration() eredménye: sikerült-e végigfutni és elérni a célt,
+    fázisonként hány lépés kellett, a futási idő és a végső konfiguráció.
+    """
+    __slots__ = ('success', 'goal_reached', 'phase_steps', 'wall_time', 'final_positions', 'error')
+
+    def __init__(self, success: bool, goal_reached: bool, phase_steps: List[int], wall_time: float,
+                 final_positions: List[Pos], error: Optional[str] = None):
+        self.success = success
+        self.goal_reached = goal_reached
+        self.phase_steps = phase_steps
+        self.wall_time = wall_time
+        self.final_positions = final_positions
+        self.error = error
+
+    @property
+    def step_count(self) -> int:
+        """Az ütemezés hossza: az összes fázis lépésszámának összege."""
+        return sum(self.phase_steps)
+
+    def __bool__(self) -> bool:
+        return self.success
+
+    def __repr__(self) -> str:
+        return (f'Result(success={self.success}, goal_reached={self.goal_reached}, '
+                f'phase_steps={self.phase_steps}, wall_time={self.wall_time:.3f})')
+
+
+def run_reconfiguration(start: MatrixSource, goal: MatrixSource,
+                        max_steps: int = DEFAULT_MAX_STEPS, grid: str = 'dict',
+                        verbose: bool = False) -> Result:
+    """
+    A start konfigurációt a goal konfigurációba alakítja a négy fázissal. Mindkettő
+    lehet fájlnév vagy GUI-tájolású 0/1 mátrix. A grid a rács tárolása a GRID_TYPES
+    nevei közül ('dict', 'array', 'chunked'); a fázisok ugyanazt a környezetet adják
+    tovább, így mindegyik ezen fut. A fázisok nyomkövetése csak verbose=True vagy
+    beállított SQUARES_TRACE esetén jelenik meg. Kivételt nem dob: a hibát a Result
+    error mezője tartalmazza.
+    """
+    loud = verbose or os.environ.get('SQUARES_TRACE')
+    with nullcontext() if loud else tracing.silenced():
+        return _run(start, goal, max_steps, grid)
+
+
+def _run(start: MatrixSource, goal: MatrixSource, max_steps: int, grid: str) -> Result:
+    started = time.perf_counter()
+    phase_steps = [0] * PHASE_COUNT
+    env: Optional[Environment] = None
+    phase_4: Optional[Phase4] = None
+    try:
+        matrix = _as_matrix(start)
+        goal_matrix = _as_matrix(goal)
+        target_file = goal if isinstance(goal, (str, os.PathLike)) else None
+        ui = HeadlessUI(matrix, goal_matrix)
+        env = Environment.from_matrix(matrix, make_grid(grid))
+
+        phase_1 = Phase1(ui, env=env)
+        while not phase_1.execute_step():
+            phase_steps[0] += 1
+            _check_limit(phase_steps, max_steps)
+        phase_steps[0] += 1
+
+        phase_2 = Phase2(ui, env=phase_1.env)
+        env = phase_2.env
+        while not phase_2.execute_step():
+            phase_steps[1] += 1
+            _check_limit(phase_steps, max_steps)
+        phase_steps[1] += 1
+
+        phase_3 = Phase_3(ui, env=phase_2.env)
+        env = phase_3.env
+        while not phase_3.execute_step():
+            phase_steps[2] += 1
+            _check_limit(phase_steps, max_steps)
+        phase_steps[2] += 1
+        while phase_3.execute_histogram_step() != True:
+            phase_steps[2] += 1
+            _check_limit(phase_steps, max_steps)
+        phase_steps[2] += 1
+
+        phase_4 = Phase4(ui, target_file, env=phase_3.env, target_matrix=goal_matrix)
+        while True:
+            phase_4.execute_step()
+            phase_steps[3] += 1
+            if phase_4.is_done():
+                break
+            _check_limit(phase_steps, max_steps)
+        env = phase_4.env
+        error = None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if phase_4 is not None and phase_4.env is not None:
+            env = phase_4.env
+
+    final_positions = sorted(env.positions()) if env is not None else []
+    goal_reached = (error is None and phase_4 is not None
+                    and set(final_positions) == set(phase_4.target_positions))
+    return Result(error is None, goal_reached, phase_steps, time.perf_counter() - started,
+                  final_positions, error)
+
+
+def _check_limit(phase_steps: List[int], max_steps: int) -> None:
+    if sum(phase_steps) >= max_steps:
+        raise RuntimeError(f'step limit of {max_steps} reached')
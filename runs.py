@@ -0,0 +1,86 @@
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+Span = Tuple[int, int]
+
+
+class RunIndex:
+    """
+    Soronkénti (vagy oszloponkénti) futamhossz-index: minden vonalhoz a foglalt cellák
+    összefüggő szakaszai, kezdőpont szerint rendezve. Egy cella ki- vagy beléptetése
+    legfeljebb egy szakaszt bont vagy olvaszt össze, a lekérdezések O(log n) bisect-ek.
+    A foglaltságot a hívó tartja nyilván: add/remove csak foglaltságváltáskor hívható.
+    """
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self):
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+
+    def copy(self) -> "RunIndex":
+        clone = RunIndex.__new__(RunIndex)
+        clone._starts = {line: list(starts) for line, starts in self._starts.items()}
+        clone._ends = {line: list(ends) for line, ends in self._ends.items()}
+        return clone
+
+    def add(self, line: int, k: int) -> None:
+        starts = self._starts.get(line)
+        if starts is None:
+            self._starts[line] = [k]
+            self._ends[line] = [k]
+            return
+        ends = self._ends[line]
+        i = bisect_right(starts, k) - 1
+        joins_left = i >= 0 and ends[i] == k - 1
+        joins_right = i + 1 < len(starts) and starts[i + 1] == k + 1
+        if joins_left and joins_right:
+            ends[i] = ends[i + 1]
+            del starts[i + 1]
+            del ends[i + 1]
+        elif joins_left:
+            ends[i] = k
+        elif joins_right:
+            starts[i + 1] = k
+        else:
+            starts.insert(i + 1, k)
+            ends.insert(i + 1, k)
+
+    def remove(self, line: int, k: int) -> None:
+        starts = self._starts[line]
+        ends = self._ends[line]
+        i = bisect_right(starts, k) - 1
+        a, b = starts[i], ends[i]
+        if a == b:
+            del starts[i]
+            del ends[i]
+            if not starts:
+                del self._starts[line]
+                del self._ends[line]
+        elif k == a:
+            starts[i] = k + 1
+        elif k == b:
+            ends[i] = k - 1
+        else:
+            ends[i] = k - 1
+            starts.insert(i + 1, k + 1)
+            ends.insert(i + 1, b)
+
+    def span(self, line: int, k: int) -> Optional[Span]:
+        """A k cellát tartalmazó szakasz (első, utolsó), vagy None, ha k üres."""
+        starts = self._starts.get(line)
+        if starts is None:
+            return None
+        i = bisect_right(starts, k) - 1
+        if i < 0:
+            return None
+        end = self._ends[line][i]
+        if end < k:
+            return None
+        return (starts[i], end)
+
+    def spans(self, line: int) -> List[Span]:
+        """A vonal összes szakasza növekvő sorrendben."""
+        starts = self._starts.get(line)
+        if starts is None:
+            return []
+        return list(zip(starts, self._ends[line]))
@@ -0,0 +1,125 @@
+from typing import Dict, Optional, Set, Tuple
+
+Pos = Tuple[int, int]
+
+# A 3x3 környezet 8 cellája körbejárási sorrendben: az egymást követő cellák
+# élszomszédosak, így a foglalt cellák ívei éppen a környezeten belül 4-összefüggő
+# darabok. A páros indexek a középpont 4-szomszédai.
+_RING = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+_RING_BIT = {offset: 1 << i for i, offset in enumerate(_RING)}
+
+# a bounded BFS ekkora (2r+1)x(2r+1)-es ablakban keres a forrás körül
+LOCAL_RADIUS = 3
+
+
+def _side_groups(mask: int) -> int:
+    """Hány, a 3x3-as környezeten belül 4-összefüggő csoportba esnek a foglalt 4-szomszédok."""
+    if mask == 0xFF:
+        return 1
+    if not mask:
+        return 0
+    # egy üres cellától indulva körbejárjuk a gyűrűt, és megszámoljuk az oldalt tartalmazó íveket
+    start = next(i for i in range(8) if not mask >> i & 1)
+    groups = 0
+    in_arc = has_side = False
+    for k in range(1, 9):
+        i = (start + k) % 8
+        if mask >> i & 1:
+            in_arc = True
+            has_side = has_side or i % 2 == 0
+        elif in_arc:
+            groups += has_side
+            in_arc = has_side = False
+    return groups
+
+
+# 256 elemű tábla: a középső cella elvétele akkor lokálisan biztonságos (egyszerű pont),
+# ha a foglalt 4-szomszédok pontosan egy csoportot alkotnak
+SIDE_GROUPS = tuple(_side_groups(mask) for mask in range(256))
+
+
+class TierStats:
+    """
+    Melyik szint döntött a mozgások összefüggőség-vizsgálatában: a 3x3-as tábla,
+    a korlátos sugarú BFS, vagy a teljes (globális) vizsgálat. Ez utóbbit a hívók
+    számolják, amikor a check_move() None-t ad.
+    """
+    __slots__ = ('table', 'local', 'full')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.table = 0
+        self.local = 0
+        self.full = 0
+
+    def rates(self) -> Dict[str, float]:
+        total = self.table + self.local + self.full
+        if not total:
+            return {'table': 0.0, 'local': 0.0, 'full': 0.0}
+        return {'table': self.table / total, 'local': self.local / total, 'full': self.full / total}
+
+    def __repr__(self) -> str:
+        return f'TierStats(table={self.table}, local={self.local}, full={self.full})'
+
+
+MOVE_TIERS = TierStats()
+
+
+def neighborhood_mask(cells: Set[Pos], p: Pos) -> int:
+    x, y = p
+    mask = 0
+    for i, (dx, dy) in enumerate(_RING):
+        if (x + dx, y + dy) in cells:
+            mask |= 1 << i
+    return mask
+
+
+def check_move(cells: Set[Pos], src: Pos, dst: Pos, connected: bool = False,
+               radius: int = LOCAL_RADIUS) -> Optional[bool]:
+    """
+    Összefüggő-e a (cells - {src}) | {dst} halmaz, ahol src foglalt és dst szabad.
+    Először a 3x3-as tábla dönt, utána egy (2r+1)x(2r+1)-es ablakra korlátozott BFS;
+    None, ha egyik sem tud dönteni. `connected`: a cells halmaz biztosan összefüggő
+    (enélkül csak nemleges válasz adható).
+    """
+    if len(cells) == 1:
+        MOVE_TIERS.table += 1
+        return True
+    x, y = dst
+    if not any(q != src and q in cells for q in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))):
+        # dst-nek nem maradna szomszédja
+        MOVE_TIERS.table += 1
+        return False
+
+    sx, sy = src
+    mask = neighborhood_mask(cells, src) | _RING_BIT.get((x - sx, y - sy), 0)
+    if connected and SIDE_GROUPS[mask] == 1:
+        # src egyszerű pont a dst-vel bővített halmazban: elvétele nem bont szét
+        MOVE_TIERS.table += 1
+        return True
+
+    # korlátos BFS dst-től az új halmazban: el kell érnie src összes foglalt 4-szomszédját
+    seeds = {q for q in ((sx + 1, sy), (sx - 1, sy), (sx, sy + 1), (sx, sy - 1)) if q in cells or q == dst}
+    visited = {dst}
+    stack = [dst]
+    clipped = False
+    while stack:
+        cx, cy = stack.pop()
+        for q in ((cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)):
+            if q in visited or q == src or q not in cells:
+                continue
+            if abs(q[0] - sx) > radius or abs(q[1] - sy) > radius:
+                clipped = True
+                continue
+            visited.add(q)
+            stack.append(q)
+    if connected and seeds <= visited:
+        MOVE_TIERS.local += 1
+        return True
+    if not clipped:
+        # dst komponense teljesen az ablakon belül van: pontos válasz
+        MOVE_TIERS.local += 1
+        return len(visited) == len(cells)
+    return None
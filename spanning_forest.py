@@ -0,0 +1,241 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from environment import Environment, MoveEvent
+from zobrist import zobrist_key
+
+Pos = Tuple[int, int]
+
+
+def _neighbors4(p: Pos) -> Tuple[Pos, Pos, Pos, Pos]:
+    x, y = p
+    return ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+
+
+class SpanningForest:
+    """
+    A foglalt cellák 4-szomszédsági gráfjának feszítő erdeje, lépésről lépésre
+    karbantartva. Új cella a szomszédos fákhoz kapcsolódik; egy cella kiürülésekor
+    a fája legfeljebb négy darabra esik, és a darabokat egyszerre, felváltva járjuk
+    be a fa élein. A legkisebb darab fogy el először: ha van nem-fa éle a darabon
+    kívülre, az lesz a pótló él, különben a darab külön komponens. Így egy lépés
+    költsége a vágás körüli kis darabokkal arányos, nem a modulszámmal.
+
+    Az attach()-csal környezethez kötött erdő a mozgáseseményekből frissül; a
+    többi (eseményt nem küldő) változást a foglaltsági hash eltérése jelzi, ilyenkor
+    a következő lekérdezés újraépíti az erdőt.
+    """
+
+    def __init__(self, cells: Iterable[Pos] = ()):
+        self.env: Optional[Environment] = None
+        # cella -> a szomszédai a feszítő erdőben
+        self._tree: Dict[Pos, Set[Pos]] = {}
+        self._hash = 0
+        self.components = 0
+        # a javítások során bejárt cellák száma (a karbantartás költsége)
+        self.visited = 0
+        self.rebuilds = 0
+        self._build(cells)
+
+    @classmethod
+    def attach(cls, env: Environment) -> "SpanningForest":
+        """Az env foglalt celláiból épít erdőt, és feliratkozik a mozgáseseményeire."""
+        forest = cls(env.positions())
+        forest.env = env
+        env.subscribe(forest._on_move)
+        return forest
+
+    def detach(self) -> None:
+        if self.env is not None:
+            self.env.unsubscribe(self._on_move)
+            self.env = None
+
+    def _build(self, cells: Iterable[Pos]) -> None:
+        tree: Dict[Pos, Set[Pos]] = {p: set() for p in cells}
+        self._tree = tree
+        self._hash = 0
+        for p in tree:
+            self._hash ^= zobrist_key(p)
+        self.components = 0
+        seen: Set[Pos] = set()
+        for root in tree:
+            if root in seen:
+                continue
+            self.components += 1
+            seen.add(root)
+            q = deque([root])
+            while q:
+                u = q.popleft()
+                for v in _neighbors4(u):
+                    if v in tree and v not in seen:
+                        seen.add(v)
+                        tree[u].add(v)
+                        tree[v].add(u)
+                        q.append(v)
+
+    def __contains__(self, p: Pos) -> bool:
+        return p in self._tree
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    @property
+    def connected(self) -> bool:
+        """Összefüggő-e a konfiguráció (üres és egyelemű halmazra is igaz)."""
+        self.sync()
+        return self.components <= 1
+
+    def sync(self) -> None:
+        """Újraépít, ha a kötött környezet eseményen kívül változott."""
+        env = self.env
+        if env is not None and env.occupancy_hash != self._hash:
+            self.rebuilds += 1
+            self._build(env.positions())
+
+    def _on_move(self, event: MoveEvent) -> None:
+        tree = self._tree
+        occupied = self.env.find_module_at
+        vacated = {src for src in event.sources
+                   if src is not None and src in tree and occupied(src) is None}
+        arrived = {tgt for tgt in event.targets
+                   if tgt is not None and tgt not in tree and occupied(tgt) is not None}
+        self.apply(vacated, arrived)
+
+    def apply(self, vacated: Iterable[Pos], arrived: Iterable[Pos]) -> None:
+        """
+        A cellahalmaz változása: előbb az új cellák kerülnek be, utána ürülnek ki a régiek,
+        így a közbenső halmaz a lehető legkevésbé esik szét.
+        """
+        vacated = [p for p in vacated if p in self._tree]
+        arrived = [p for p in arrived if p not in self._tree]
+        if 2 * (len(vacated) + len(arrived)) > len(self._tree):
+            # a halmaz nagy része változott (pl. eltolás): olcsóbb újraépíteni
+            cells = set(self._tree)
+            cells.difference_update(vacated)
+            cells.update(arrived)
+            self.rebuilds += 1
+            self._build(cells)
+            return
+        for p in arrived:
+            self._add(p)
+        for p in vacated:
+            self._remove(p)
+
+    def _link(self, u: Pos, v: Pos) -> None:
+        self._tree[u].add(v)
+        self._tree[v].add(u)
+
+    def _add(self, p: Pos) -> None:
+        tree = self._tree
+        nbrs = [q for q in _neighbors4(p) if q in tree]
+        tree[p] = set()
+        self._hash ^= zobrist_key(p)
+        if not nbrs:
+            self.components += 1
+            return
+        if self.components == 1 or len(nbrs) == 1:
+            self._link(p, nbrs[0])
+            return
+        groups = self._group_by_tree(nbrs)
+        for q in groups:
+            self._link(p, q)
+        self.components -= len(groups) - 1
+
+    def _remove(self, p: Pos) -> None:
+        tree = self._tree
+        pieces = list(tree.pop(p))
+        self._hash ^= zobrist_key(p)
+        for q in pieces:
+            tree[q].discard(p)
+        if not pieces:
+            self.components -= 1
+            return
+        self.components += len(pieces) - 1
+        if len(pieces) > 1:
+            self._reconnect(pieces)
+
+    def _reconnect(self, pieces: List[Pos]) -> None:
+        """
+        Egy vágás darabjai (különböző fák egy-egy cellája): felváltva bejárjuk őket, és
+        amelyik elfogy, azt egy kifelé mutató nem-fa éllel a többihez kötjük.
+        """
+        tree = self._tree
+        seens = [{s} for s in pieces]
+        queues = [deque([s]) for s in pieces]
+        owner: Dict[Pos, int] = {s: i for i, s in enumerate(pieces)}
+        merged: Dict[int, int] = {}
+        active = list(range(len(pieces)))
+        while len(active) > 1:
+            for i in list(active):
+                seen, q = seens[i], queues[i]
+                u = q.popleft()
+                self.visited += 1
+                for v in tree[u]:
+                    if v not in seen:
+                        seen.add(v)
+                        owner[v] = i
+                        q.append(v)
+                if q:
+                    continue
+                # a darab teljesen bejárva: bármely kifelé mutató él másik darabba visz
+                active.remove(i)
+                edge = self._outgoing_edge(seen)
+                if edge is not None:
+                    self._link(*edge)
+                    self.components -= 1
+                    j = owner.get(edge[1])
+                    if j is not None:
+                        # a túloldali keresés már járhatott ott, ezért a darabot átadjuk neki
+                        while j in merged:
+                            j = merged[j]
+                        seens[j] |= seen
+                        merged[i] = j
+                if len(active) <= 1:
+                    break
+
+    def _outgoing_edge(self, piece: Set[Pos]) -> Optional[Tuple[Pos, Pos]]:
+        tree = self._tree
+        for u in piece:
+            for v in _neighbors4(u):
+                if v in tree and v not in piece:
+                    return (u, v)
+        return None
+
+    def _group_by_tree(self, seeds: List[Pos]) -> List[Pos]:
+        """A seeds cellák közül fánként egy: felváltott bejárás, a találkozó keresések összeolvadnak."""
+        tree = self._tree
+        owner: Dict[Pos, int] = {s: i for i, s in enumerate(seeds)}
+        queues = [deque([s]) for s in seeds]
+        merged: Dict[int, int] = {}
+
+        def find(i: int) -> int:
+            while i in merged:
+                i = merged[i]
+            return i
+
+        active = list(range(len(seeds)))
+        while len(active) > 1:
+            for i in list(active):
+                if i not in active:
+                    continue
+                q = queues[i]
+                u = q.popleft()
+                self.visited += 1
+                for v in tree[u]:
+                    j = owner.get(v)
+                    if j is None:
+                        owner[v] = i
+                        q.append(v)
+                        continue
+                    j = find(j)
+                    if j != i:
+                        # azonos fa: j keresését i folytatja
+                        merged[j] = i
+                        q.extend(queues[j])
+                        if j in active:
+                            active.remove(j)
+                if not q:
+                    active.remove(i)
+                if len(active) <= 1:
+                    break
+        return [s for i, s in enumerate(seeds) if i not in merged]
@@ -1,10 +1,13 @@
 from typing import Any, Callable, List, Optional, Sequence, Tuple
-from .module import Module, Move
+from .module import Module, Move, MoveBatch
 from .metamodule import MetaModule
-from copy import copy, deepcopy
+from copy import copy
 from .snake import Snake, SnakeHead, SnakeSegment
 import math
 from environment import Environment
+from tracing import get_tracer
+
+_trace = get_tracer('histogram')
 
 class Histogram:
     rows: List[List[Optional[Module]]]
@@ -27,25 +30,23 @@ class Histogram:
     def setup_from_env(self, env):
         self.rows = []
         min_x, max_x, min_y, max_y = env.find_bounds()
-        for i, y in enumerate(range(max_y, min_y-1, -1)):
-            found_rightmost_module = False
-            self.rows.append([])
-            for x in range(max_x, min_x-1, -1):
-                if not found_rightmost_module:
-                    module = env.find_module_at([x, y])
-                    if module != None:
-                        self.rows[i].insert(0, module)
-                        found_rightmost_module = True
-                else:
-                    module = env.find_module_at([x, y])
-                    self.rows[i].insert(0, module)
+        for y in range(max_y, min_y-1, -1):
+            # a sor a legbaloldalibb cellától a legjobboldalibb modulig tart, a lyukak helyén None
+            spans = env.row_runs(y)
+            if not spans:
+                self.rows.append([])
+                continue
+            row = [None] * (spans[-1][1] - min_x + 1)
+            for start, end in spans:
+                row[start - min_x:end - min_x + 1] = env.run_modules((start, y), Move.EAST)
+            self.rows.append(row)
 
     def compact_to_left(self, env_queue) -> bool:
         self.setup_from_env(self.env)
         for row in self.rows:
             pass
         did_nothing = True
-        movement_dict = {}
+        movement_dict = MoveBatch()
         for row in self.rows:
             found_hole = False
             for module in row:
@@ -59,7 +60,7 @@ class Histogram:
 
         if not did_nothing:
             new_env = self.env.transformation(movement_dict)
-            env_queue.append(deepcopy(new_env))
+            env_queue.append(new_env.snapshot())
             self.env = new_env
         
         done = did_nothing
@@ -72,10 +73,10 @@ class Histogram:
         if len(self.snakes) == 0:
             result = self.make_snakes()
             if result == 'done':
-                print('Histogram complete')
+                _trace.info('Histogram complete')
                 return 'done'
 
-        movement_dict = {}
+        movement_dict = MoveBatch()
         for snake in list(self.snakes):
             snake_move = snake.movement_dict()
             if snake_move == 'done':
@@ -84,22 +85,18 @@ class Histogram:
             if snake_move is None:
                 self.snakes.remove(snake)
                 continue
-            if isinstance(snake_move, dict):
-                for module_id, move in snake_move.items():
-                    if isinstance(move, Move) and hasattr(move, 'delta'):
-                        movement_dict[module_id] = move
-                    else:
-                        print(f'Warning: Invalid move for module {module_id}: {move}')
+            if isinstance(snake_move, MoveBatch):
+                movement_dict.merge(snake_move)
 
         if not movement_dict and len(self.snakes) == 0:
-             print('Histogram complete')
+             _trace.info('Histogram complete')
              return 'done'
 
         if not movement_dict:
-            print('Warning: No valid movements from snakes')
+            _trace.warn('Warning: No valid movements from snakes')
             return self.env
 
-        print(f'Applying {len(movement_dict)} snake movements')
+        _trace.debug(f'Applying {len(movement_dict)} snake movements')
         
         for module_id in movement_dict.keys():
             if module_id in self.env.modules:
@@ -119,7 +116,7 @@ class Histogram:
         return self.env
         
     def make_snakes(self):
-        print('Making snakes')
+        _trace.debug('Making snakes')
         goal_ids = []
         snake_ids = []
 
@@ -135,10 +132,10 @@ class Histogram:
             if not found_module:
                 snake_ids.append(module.id)
 
-        print('Snake IDs:', snake_ids)
+        _trace.debug('Snake IDs:', snake_ids)
 
         if len(snake_ids) == 0:
-            print('all modules in goal positions')
+            _trace.info('all modules in goal positions')
             return 'done'
 
         triple_rows = []
@@ -189,7 +186,7 @@ class Histogram:
                 self.snakes.append(Snake(snake_head, snake_segments, self.env))
 
         for snake in self.snakes:
-            print('New Snake Created. Head:', snake.head.module.id)
+            _trace.debug('New Snake Created. Head:', snake.head.module.id)
 
     def calculate_ideal_shape(self):
         module_count = len(self.env.modules)
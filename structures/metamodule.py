@@ -1,6 +1,8 @@
 from typing import Any, Callable, List, Optional, Sequence, Tuple
 from .module import Module, Move
-from copy import deepcopy
+from tracing import get_tracer, DEBUG
+
+_trace = get_tracer('metamodule')
 
 
 class MetaModule:
@@ -9,7 +11,7 @@ class MetaModule:
     modules: List[List[Optional[Module]]]
 
     def __init__(self, x, y, env):
-        print('Metamodule created at: ', x, y)
+        _trace.debug('Metamodule created at: ', x, y)
         self.x = x
         self.y = y
         self.modules = [
@@ -67,29 +69,19 @@ class MetaModule:
         return True
     
     def full_diagnostic(self, matrix) -> None:
-        print(f"MetaModule at ({self.x}, {self.y}):")
-        print(f"  Valid: {self.is_valid()}")
-        print(f"  Separator: {self.is_separator(matrix)}")
-        print(f"  Solid: {self.is_solid()}")
-        print(f"  Clean: {self.is_clean()}")
+        if _trace.level < DEBUG:
+            return
+        _trace.debug(f"MetaModule at ({self.x}, {self.y}):")
+        _trace.debug(f"  Valid: {self.is_valid()}")
+        _trace.debug(f"  Separator: {self.is_separator(matrix)}")
+        _trace.debug(f"  Solid: {self.is_solid()}")
+        _trace.debug(f"  Clean: {self.is_clean()}")
 
     def west_strip_full(self, env):
         min_x, max_x, min_y, max_y = env.find_bounds()
-        for x in range(self.x - 2, min_x - 1, -1):
-            module = env.find_module_at((x, self.y + 1))
-            if not module:
+        for y in (self.y + 1, self.y, self.y - 1):
+            if not env.row_full(y, min_x, self.x - 2):
                 return False
-
-        for x in range(self.x - 2, min_x - 1, -1):
-            module = env.find_module_at((x, self.y))
-            if not module:
-                return False
-            
-        for x in range(self.x - 2, min_x - 1, -1):
-            module = env.find_module_at((x, self.y - 1))
-            if not module:
-                return False
-            
         return True
 
     def gather_east_strip(self, env, movement_dict_queue, i) -> None:
@@ -97,29 +89,27 @@ class MetaModule:
             return
         trailing_module = env.find_module_at([self.x + 2, self.y + i])
         if trailing_module == None:
-            print('Sweepline is misaligned')
+            _trace.warn('Sweepline is misaligned')
             return
         
         else:
-            movement_dict = {}
             direction_dictionary = {
                 -1: Move.NORTHWEST,
                 0: Move.WEST,
                 1: Move.SOUTHWEST
             }
-            movement_dict[self.modules[1][2].id] = Move.WEST  # Move right module left
-            movement_dict[trailing_module.id] = direction_dictionary[i]
-            movement_dict_queue[0].update(deepcopy(movement_dict))
+            movement_dict_queue[0][self.modules[1][2].id] = Move.WEST  # Move right module left
+            movement_dict_queue[0][trailing_module.id] = direction_dictionary[i]
 
 
     def clean(self, env, movement_dict_queue) -> bool:
         min_x, max_x, min_y, max_y = env.find_bounds()
         if self.x == min_x + 1:
-            print('reached the wall')
+            _trace.debug('reached the wall')
             return True
         
         if self.west_strip_full(env):
-            print('west strip full')
+            _trace.debug('west strip full')
             return False
         # Clean the center module if it exists
 
@@ -127,29 +117,11 @@ class MetaModule:
         if self.modules[1][1] == None:
             return
         else:
-            movement_dict = {}
             # Gather modules in the west strip of the metamodule
-            west_strip_rows = [[],[],[]]
-            for x in range(self.x - 2, min_x - 1, -1):
-                module = env.find_module_at((x, self.y + 1))
-                if module:
-                    west_strip_rows[0].append(module)
-                else:
-                    break
-
-            for x in range(self.x - 2, min_x - 1, -1):
-                module = env.find_module_at((x, self.y))
-                if module:
-                    west_strip_rows[1].append(module)  
-                else:
-                    break 
-                
-            for x in range(self.x - 2, min_x - 1, -1):
-                module = env.find_module_at((x, self.y - 1))
-                if module:
-                    west_strip_rows[2].append(module)
-                else:
-                    break
+            west_strip_rows = [
+                env.run_modules((self.x - 2, y), Move.WEST, self.x - 2 - min_x + 1)
+                for y in (self.y + 1, self.y, self.y - 1)
+            ]
 
             # Find shortest west strip
             shortest_row = 0
@@ -158,47 +130,37 @@ class MetaModule:
                     shortest_row = i
 
             # Clean into the shortest west strip
-            movement_dict = {}
             for module in west_strip_rows[shortest_row]:
-                movement_dict[module.id] = Move.WEST
+                movement_dict_queue[0][module.id] = Move.WEST
             if shortest_row == 0:
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[0][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.WEST
 
-                movement_dict = {}
-                movement_dict[self.modules[1][1].id] = Move.NORTH
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][1].id] = Move.NORTH
 
             if shortest_row == 1:
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[1][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[1][1].id] = Move.WEST
 
             if shortest_row == 2:
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
-
-                movement_dict = {}
-                movement_dict[self.modules[1][1].id] = Move.SOUTH
-                movement_dict_queue[1].update(deepcopy(movement_dict))
-        print(movement_dict_queue)
+                movement_dict_queue[0][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.WEST
+
+                movement_dict_queue[1][self.modules[1][1].id] = Move.SOUTH
+        _trace.debug(movement_dict_queue)
         return False
 
 
     def advance(self, env, movement_dict_queue, leading) -> None:
         min_x, max_x, min_y, max_y = env.find_bounds()
         if self.x == min_x + 1:
-            print('reached the wall')
+            _trace.debug('reached the wall')
             return
         
         if self.west_strip_full(env):
             if self.is_clean():
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
-            print('west strip full')
+                movement_dict_queue[0][self.modules[1][2].id] = Move.WEST
+            _trace.debug('west strip full')
             return
         # Advance the metamodule one step to the left
         # Check for obscuring modules W1, W2, W3
@@ -210,318 +172,211 @@ class MetaModule:
             # Advance based on which of W1, W2, and W3 are present
             if W1 == W2 == W3 == None:
                 # a) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.SOUTHWEST
-                movement_dict[self.modules[0][1].id] = Move.SOUTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.SOUTHWEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.SOUTHWEST
 
                 # a) step 2
-                movement_dict = {}
-                movement_dict[self.modules[0][1].id] = Move.NORTHWEST
-                movement_dict[self.modules[2][1].id] = Move.NORTHWEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[0][1].id] = Move.NORTHWEST
+                movement_dict_queue[1][self.modules[2][1].id] = Move.NORTHWEST
 
                 # a) step 3
-                movement_dict = {}
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[2][1].id] = Move.WEST
 
                 # a) step 4
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.NORTHWEST
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[1][2].id] = Move.NORTHWEST
+                movement_dict_queue[3][self.modules[2][2].id] = Move.WEST
 
                 # a) step 5
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict_queue[4].update(deepcopy(movement_dict))
+                movement_dict_queue[4][self.modules[0][2].id] = Move.SOUTHWEST
 
             if W2 == W3 == None and W1 != None:
                 # b) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[0][1].id] = Move.SOUTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.SOUTHWEST
 
                 # b) step 2
-                movement_dict = {}
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][1].id] = Move.WEST
 
                 # b) step 3
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.WEST
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[0][2].id] = Move.WEST
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
 
                 # b) step 4
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[2][2].id] = Move.NORTHWEST
 
             if W1 == W3 == None and W2 != None:
                 # b) step 1
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[0][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.WEST
 
                 # b) step 2
-                movement_dict = {}
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][1].id] = Move.WEST
 
                 # b) step 3
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.WEST
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[0][2].id] = Move.WEST
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
 
                 # b) step 4
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[2][2].id] = Move.NORTHWEST
 
             if W1 == W2 == None and W3 != None:
                 # b) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.NORTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.NORTHWEST
 
                 # b) step 2
-                movement_dict = {}
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][1].id] = Move.WEST
 
                 # b) step 3
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.WEST
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[0][2].id] = Move.WEST
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
 
                 # b) step 4
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[2][2].id] = Move.NORTHWEST
 
             if W1 == None and W2 != None and W3 != None:
                 # c) step 1
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[0][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.WEST
 
                 # c) step 2
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.WEST
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[0][2].id] = Move.WEST
+                movement_dict_queue[1][self.modules[1][2].id] = Move.WEST
 
             if W1 != None and W2 == None and W3 != None:
                 # c) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.NORTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.NORTHWEST
 
                 # c) step 2
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][2].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][2].id] = Move.WEST
 
             if W1 != None and W2 != None and W3 == None:
                 # c) step 1
-                movement_dict = {}
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.WEST
 
                 # c) step 2
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][2].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][2].id] = Move.WEST
 
             if W1 != None and W2 != None and W3 != None:
                 # d) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][2].id] = Move.WEST
 
         if not leading:
             if W1 == W2 == W3 == None:
                 # a*) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.SOUTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.SOUTHWEST
 
                 # a*) step 2
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[2][0].id] = Move.NORTHWEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[1][self.modules[2][0].id] = Move.NORTHWEST
 
                 # a*) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.WEST
 
                 # a*) step 4
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.NORTHWEST
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[1][2].id] = Move.NORTHWEST
+                movement_dict_queue[3][self.modules[2][2].id] = Move.NORTHWEST
 
                 # a*) step 5
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict[self.modules[2][2].id] = Move.SOUTHWEST
-                movement_dict_queue[4].update(deepcopy(movement_dict))
+                movement_dict_queue[4][self.modules[0][2].id] = Move.SOUTHWEST
+                movement_dict_queue[4][self.modules[2][2].id] = Move.SOUTHWEST
 
             if W1 != None and W2 == W3 == None:
                 # e) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][0].id] = Move.WEST
 
                 # e) step 2
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][2].id] = Move.WEST
 
                 # e) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
+                movement_dict_queue[2][self.modules[2][2].id] = Move.NORTHWEST
 
                 # e) step 4
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[2][2].id] = Move.WEST
+                movement_dict_queue[3][self.modules[0][2].id] = Move.SOUTHWEST
 
             if W1 == None and W2 != W3 == None:
                 # e) step 1
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
 
                 # e) step 2
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.NORTH
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][0].id] = Move.NORTH
+                movement_dict_queue[1][self.modules[2][0].id] = Move.WEST
 
                 # e) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.WEST
 
                 # e) step 4
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[1][2].id] = Move.SOUTHWEST
+                movement_dict_queue[3][self.modules[2][2].id] = Move.NORTHWEST
 
                 # e) step 5
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict_queue[4].update(deepcopy(movement_dict))
+                movement_dict_queue[4][self.modules[2][2].id] = Move.WEST
+                movement_dict_queue[4][self.modules[0][2].id] = Move.SOUTHWEST
 
             if W1 == W2 == None and W3 != None:
                 # e) step 1
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
 
                 # e) step 2
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[1][2].id] = Move.WEST
 
                 # e) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.NORTHWEST
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.NORTHWEST
+                movement_dict_queue[2][self.modules[2][2].id] = Move.NORTHWEST
 
                 # e) step 4
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.WEST
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict_queue[3].update(deepcopy(movement_dict))
+                movement_dict_queue[3][self.modules[2][2].id] = Move.WEST
+                movement_dict_queue[3][self.modules[0][2].id] = Move.SOUTHWEST
 
             if W1 != W2 == None != W3:
                 # f) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.NORTHWEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.NORTHWEST
 
                 # f) step 2
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[2][2].id] = Move.NORTHWEST
 
                 # f) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
 
             if W1 != None and W2 != W3 == None:
                 # f) step 1
-                movement_dict = {}
-                movement_dict[self.modules[2][0].id] = Move.WEST
-                movement_dict[self.modules[2][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[2][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[2][1].id] = Move.WEST
 
                 # f) step 2
-                movement_dict = {}
-                movement_dict[self.modules[2][2].id] = Move.NORTHWEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[2][2].id] = Move.NORTHWEST
 
                 # f) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.SOUTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.SOUTHWEST
 
             if W1 == None != W2 and W3 != None:
                 # f) step 1
-                movement_dict = {}
-                movement_dict[self.modules[0][0].id] = Move.WEST
-                movement_dict[self.modules[0][1].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[0][0].id] = Move.WEST
+                movement_dict_queue[0][self.modules[0][1].id] = Move.WEST
 
                 # f) step 2
-                movement_dict = {}
-                movement_dict[self.modules[0][2].id] = Move.SOUTHWEST
-                movement_dict_queue[1].update(deepcopy(movement_dict))
+                movement_dict_queue[1][self.modules[0][2].id] = Move.SOUTHWEST
 
                 # f) step 3
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.NORTHWEST
-                movement_dict_queue[2].update(deepcopy(movement_dict))
+                movement_dict_queue[2][self.modules[1][2].id] = Move.NORTHWEST
 
             if W1 != None and W2 != None and W3 != None:
                 # g) step 1
-                movement_dict = {}
-                movement_dict[self.modules[1][2].id] = Move.WEST
-                movement_dict_queue[0].update(deepcopy(movement_dict))
+                movement_dict_queue[0][self.modules[1][2].id] = Move.WEST
 
 
     def advance_move(self, move_number : int, moves : dict, movement_dict_queue, env):
-        movement_dict = {}
-        for id, direction in moves.items():
-            movement_dict[id] = direction
-        movement_dict_queue[move_number-1].update(deepcopy(movement_dict))
+        movement_dict_queue[move_number-1].merge(moves)
         self = MetaModule(self.x, self.y, env)
@@ -1,6 +1,10 @@
 # module.py
-from dataclasses import dataclass
+from array import array
 from enum import Enum
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from tracing import get_tracer
+
+_trace = get_tracer('module')
 
 class Move(Enum):
     STAY = (0, 0)
@@ -17,24 +21,155 @@ class Move(Enum):
     def delta(self):
         return self.value
 
-from dataclasses import dataclass, field
 
-@dataclass
+# kis egész mozgáskódok (a Move tagok sorrendjében) és az elmozdulás-táblák
+MOVES: Tuple[Move, ...] = tuple(Move)
+MOVE_CODE: Dict[Move, int] = {move: code for code, move in enumerate(MOVES)}
+DX = array('b', (move.value[0] for move in MOVES))
+DY = array('b', (move.value[1] for move in MOVES))
+
+
+class MoveBatch:
+    """
+    Egy párhuzamos lépés: modul id-k és mozgáskódok párhuzamos tömbjei. Dict[int, Move]-ként
+    is használható (beszúrási sorrend, kulcs szerinti felülírás), de másolás nélkül
+    összefésülhető, és az elmozdulások a DX/DY táblákból jönnek.
+    """
+    __slots__ = ('_ids', '_codes', '_slot')
+    __hash__ = None
+
+    def __init__(self, moves=None):
+        self._ids = array('i')
+        self._codes = array('b')
+        self._slot: Dict[int, int] = {}
+        if moves:
+            self.merge(moves)
+
+    def set_code(self, mid: int, code: int) -> None:
+        slot = self._slot.get(mid)
+        if slot is None:
+            self._slot[mid] = len(self._ids)
+            self._ids.append(mid)
+            self._codes.append(code)
+        else:
+            self._codes[slot] = code
+
+    def merge(self, other) -> "MoveBatch":
+        """Helyben hozzáfűzi egy másik lépés (MoveBatch, dict vagy (id, Move) párok) mozgásait."""
+        if isinstance(other, MoveBatch):
+            for mid, code in zip(other._ids, other._codes):
+                self.set_code(mid, code)
+        else:
+            pairs = other.items() if hasattr(other, 'items') else other
+            for mid, move in pairs:
+                self.set_code(mid, MOVE_CODE[move])
+        return self
+
+    update = merge
+
+    def filter(self, predicate: Callable[[int, Move], bool]) -> "MoveBatch":
+        """Új lépés azokkal a mozgásokkal, amelyekre predicate(id, move) igaz."""
+        result = MoveBatch()
+        for mid, code in zip(self._ids, self._codes):
+            if predicate(mid, MOVES[code]):
+                result.set_code(mid, code)
+        return result
+
+    def deltas(self) -> Iterator[Tuple[int, int, int]]:
+        """(id, dx, dy) hármasok, Move objektumok nélkül."""
+        for mid, code in zip(self._ids, self._codes):
+            yield mid, DX[code], DY[code]
+
+    def copy(self) -> "MoveBatch":
+        clone = MoveBatch.__new__(MoveBatch)
+        clone._ids = array('i', self._ids)
+        clone._codes = array('b', self._codes)
+        clone._slot = self._slot.copy()
+        return clone
+
+    def __repr__(self) -> str:
+        return f'MoveBatch({dict(self.items())!r})'
+
+    def __eq__(self, other):
+        if isinstance(other, MoveBatch):
+            other = dict(other.items())
+        elif not isinstance(other, dict):
+            return NotImplemented
+        return dict(self.items()) == other
+
+    # --- Dict[int, Move] interfész ---
+
+    def __setitem__(self, mid: int, move: Move) -> None:
+        self.set_code(mid, MOVE_CODE[move])
+
+    def __getitem__(self, mid: int) -> Move:
+        return MOVES[self._codes[self._slot[mid]]]
+
+    def get(self, mid: int, default=None):
+        slot = self._slot.get(mid)
+        if slot is None:
+            return default
+        return MOVES[self._codes[slot]]
+
+    def __contains__(self, mid) -> bool:
+        return mid in self._slot
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def keys(self):
+        return self._slot.keys()
+
+    def values(self):
+        return [MOVES[code] for code in self._codes]
+
+    def items(self):
+        return [(mid, MOVES[code]) for mid, code in zip(self._ids, self._codes)]
+
+
 class Module:
-    id: int
-    _pos: tuple[int, int] = field(repr=False)
+    """
+    Egy modul. Önállóan saját pozíciót tárol; amint egy Environment-hez adjuk,
+    nézetté válik a ModuleStore tömbjeire, a pozíciót onnan olvassa és oda írja.
+    """
+    __slots__ = ('id', '_pos', '_store', '_slot')
+    __hash__ = None
+
+    def __init__(self, id: int, _pos: Optional[Tuple[int, int]]):
+        self.id = id
+        self._store: Optional["ModuleStore"] = None
+        self._slot = -1
+        self._pos = None
+        self.pos = _pos
+
+    def __repr__(self) -> str:
+        return f'Module(id={self.id})'
 
-    def __post_init__(self):
-        self.pos = self._pos
+    def __eq__(self, other):
+        if other.__class__ is not Module:
+            return NotImplemented
+        return self.id == other.id and self.pos == other.pos
 
     @property
     def pos(self):
-        return self._pos
+        store = self._store
+        if store is None:
+            return self._pos
+        slot = self._slot
+        if not store._placed[slot]:
+            return None
+        return (store._xs[slot], store._ys[slot])
 
     @pos.setter
     def pos(self, value: tuple[int, int]):
-        self._pos = value
-        print(f'Module {self.id} pos changed to {self._pos}')    
+        if self._store is None:
+            self._pos = value
+        else:
+            self._store.set_position(self.id, value)
+        _trace.debug('Module', self.id, 'pos changed to', value)
 
     def move_to(self, new_pos: tuple[int, int], env):
         if not isinstance(new_pos, tuple):
@@ -42,7 +177,7 @@ class Module:
         if not env.grid.in_bounds(new_pos):
             raise ValueError(f"Target {new_pos} is out of bounds")
         if new_pos in env.grid.occupied:
-            print(f"[WARN] Cell {new_pos} is occupied, overwriting")
+            _trace.warn(f"Cell {new_pos} is occupied, overwriting")
             env.grid.remove(new_pos)
         env.grid.remove(self.pos)
         env.grid.place(self.id, new_pos)
@@ -53,3 +188,147 @@ class Module:
         dx, dy = move.delta
         new_pos = (self.pos[0] + dx, self.pos[1] + dy)
         self.move_to(new_pos, env)
+
+
+class ModuleStore:
+    """
+    Az Environment moduljai struct-of-arrays formában: id, x, y és egy "van-e pozíció"
+    jelző egy-egy folytonos tömbben. Dict[int, Module]-ként használható; a Module
+    nézeteket igény szerint hozza létre és megőrzi. Másolni néhány buffer-másolással lehet.
+    """
+
+    def __init__(self, owner=None):
+        self._ids = array('i')
+        self._xs = array('i')
+        self._ys = array('i')
+        self._placed = bytearray()
+        self._slot: Dict[int, int] = {}
+        self._views: Dict[int, Module] = {}
+        # Environment, amelyet minden pozícióváltozásról értesítünk
+        self._owner = owner
+
+    def add(self, module: Module) -> Module:
+        pos = module.pos
+        slot = len(self._ids)
+        self._ids.append(module.id)
+        if pos is None:
+            self._xs.append(0)
+            self._ys.append(0)
+            self._placed.append(0)
+        else:
+            self._xs.append(pos[0])
+            self._ys.append(pos[1])
+            self._placed.append(1)
+        self._slot[module.id] = slot
+        # a hozzáadott objektum maga lesz a nézet
+        module._store = self
+        module._slot = slot
+        module._pos = None
+        self._views[module.id] = module
+        return module
+
+    def remove(self, mid: int) -> Optional[Module]:
+        slot = self._slot.pop(mid, None)
+        if slot is None:
+            return None
+        view = self._views.pop(mid, None)
+        if view is not None:
+            # a leválasztott modul megtartja az utolsó pozícióját
+            view._pos = (self._xs[slot], self._ys[slot]) if self._placed[slot] else None
+            view._store = None
+            view._slot = -1
+        last = len(self._ids) - 1
+        if slot != last:
+            # az utolsó elemet tesszük a felszabadult helyre
+            moved_id = self._ids[last]
+            self._ids[slot] = moved_id
+            self._xs[slot] = self._xs[last]
+            self._ys[slot] = self._ys[last]
+            self._placed[slot] = self._placed[last]
+            self._slot[moved_id] = slot
+            moved_view = self._views.get(moved_id)
+            if moved_view is not None:
+                moved_view._slot = slot
+        del self._ids[last]
+        del self._xs[last]
+        del self._ys[last]
+        del self._placed[last]
+        return view
+
+    def position(self, mid: int):
+        slot = self._slot[mid]
+        if not self._placed[slot]:
+            return None
+        return (self._xs[slot], self._ys[slot])
+
+    def set_position(self, mid: int, value) -> None:
+        slot = self._slot[mid]
+        old = (self._xs[slot], self._ys[slot]) if self._placed[slot] else None
+        if value is None:
+            self._placed[slot] = 0
+        else:
+            self._xs[slot] = value[0]
+            self._ys[slot] = value[1]
+            self._placed[slot] = 1
+            value = (value[0], value[1])
+        if self._owner is not None:
+            self._owner._module_moved(mid, old, value)
+
+    def positions(self) -> Iterator[Tuple[int, int]]:
+        """Minden elhelyezett modul pozíciója, nézetek létrehozása nélkül."""
+        xs, ys, placed = self._xs, self._ys, self._placed
+        for slot in range(len(self._ids)):
+            if placed[slot]:
+                yield (xs[slot], ys[slot])
+
+    def freeze(self) -> Tuple[array, array, array, bytes]:
+        """A tömbök csak olvasható másolata (pillanatképek közös alapja)."""
+        return (array('i', self._ids), array('i', self._xs), array('i', self._ys), bytes(self._placed))
+
+    def copy(self, owner=None) -> "ModuleStore":
+        clone = ModuleStore.__new__(ModuleStore)
+        clone._ids = array('i', self._ids)
+        clone._xs = array('i', self._xs)
+        clone._ys = array('i', self._ys)
+        clone._placed = bytearray(self._placed)
+        clone._slot = self._slot.copy()
+        clone._views = {}
+        clone._owner = owner
+        return clone
+
+    # --- Dict[int, Module] interfész ---
+
+    def __getitem__(self, mid: int) -> Module:
+        view = self._views.get(mid)
+        if view is None:
+            slot = self._slot[mid]
+            view = Module.__new__(Module)
+            view.id = mid
+            view._pos = None
+            view._store = self
+            view._slot = slot
+            self._views[mid] = view
+        return view
+
+    def get(self, mid: int, default=None):
+        if mid in self._slot:
+            return self[mid]
+        return default
+
+    def __contains__(self, mid) -> bool:
+        return mid in self._slot
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._slot)
+
+    def keys(self):
+        return self._slot.keys()
+
+    def values(self):
+        return [self[mid] for mid in self._slot]
+
+    def items(self):
+        return [(mid, self[mid]) for mid in self._slot]
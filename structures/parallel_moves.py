@@ -1,49 +1,73 @@
 # parallel_moves.py
-from copy import deepcopy
 from typing import Set, Tuple, List, Dict, Optional
 from environment import Environment
-from structures.module import Move
+from bitboard import BitboardFrame
+from articulation import ArticulationOracle
+from structures.module import Move, MoveBatch
 from structures.skeleton import (
     _assign_modules_to_targets,
     _proposed_cardinal_step,
-    _select_safe_moves,
-    is_connected
+    _select_safe_moves
 )
 
 Pos = Tuple[int, int]
 
 
+def matrix_order(env: Environment) -> List[int]:
+    # module ids in row-major matrix order (top row first, then by x) of their
+    # current positions: the numbering a matrix-built env would give them, so
+    # tie-breaking does not depend on where the ids came from
+    placed = [(mid, m.pos) for mid, m in env.modules.items() if m.pos is not None]
+    placed.sort(key=lambda item: (-item[1][1], item[1][0], item[0]))
+    return [mid for mid, _ in placed]
+
+
 def compute_parallel_moves(env: Environment,
                            target_positions: Set[Pos],
                            max_iters: int = 20000,
-                           movable_ids: Optional[Set[int]] = None) -> List[Dict[int, Move]]:
+                           movable_ids: Optional[Set[int]] = None) -> List[MoveBatch]:
 
     if not target_positions:
         return []
 
-    working_env = deepcopy(env)
-    steps: List[Dict[int, Move]] = []
-
-    if set(working_env.grid.occupied.keys()) == set(target_positions):
-        return steps
+    if set(env.grid.occupied.keys()) == set(target_positions):
+        return []
 
-    prev_positions = None
+    # plan in place on a journaled env, then undo every planned step
+    token = env.checkpoint()
+    try:
+        return _plan_parallel_moves(env, set(target_positions), max_iters, movable_ids)
+    finally:
+        env.revert(token)
+
+
+def _plan_parallel_moves(working_env: Environment,
+                         target_positions: Set[Pos],
+                         max_iters: int,
+                         movable_ids: Optional[Set[int]]) -> List[MoveBatch]:
+    steps: List[MoveBatch] = []
+    # the target check runs on bitboards updated from each step's moves (only step()
+    # touches the grid here); stalls are detected on the env's Zobrist occupancy hash
+    frame, target_bits, cur_bits = _encode_configuration(working_env, target_positions)
+    order = matrix_order(working_env)
+    rank = {mid: i for i, mid in enumerate(order)}
+    prev_hash = None
     no_progress = 0
     MAX_NO_PROGRESS = 60
 
     for it in range(max_iters):
-        cur_positions = set(working_env.grid.occupied.keys())
-        if cur_positions == set(target_positions):
+        if cur_bits == target_bits:
             break
+        cur_hash = working_env.occupancy_hash
 
-        full_assignments = _assign_modules_to_targets(working_env, set(target_positions))
+        full_assignments = _assign_modules_to_targets(working_env, target_positions, order)
 
         if movable_ids is not None:
             assignments = {mid: tgt for mid, tgt in full_assignments.items() if mid in movable_ids}
         else:
             assignments = full_assignments
 
-        proposals: Dict[int, Move] = {}
+        proposals = MoveBatch()
         for mid, tgt in assignments.items():
             if mid not in working_env.modules:
                 continue
@@ -61,65 +85,77 @@ def compute_parallel_moves(env: Environment,
                 proposals[mid] = mv
 
         if not proposals:
-            if prev_positions == cur_positions:
+            if prev_hash == cur_hash:
                 no_progress += 1
                 if no_progress > MAX_NO_PROGRESS:
                     break
             else:
                 no_progress = 0
 
-            prev_positions = cur_positions.copy()
+            prev_hash = cur_hash
             continue
 
-        selected = _select_safe_moves(working_env, proposals)
+        selected = _select_safe_moves(working_env, proposals, rank)
 
         if not selected:
             single_selected = None
+            # one articulation-point pass answers every single-move probe below
+            oracle = ArticulationOracle(set(working_env.grid.occupied.keys()))
             for mid, mv in proposals.items():
-                test_pos = set(working_env.grid.occupied.keys())
                 src = working_env.modules[mid].pos
                 tgt = (src[0] + mv.delta[0], src[1] + mv.delta[1])
 
-                test_pos.discard(src)
-                test_pos.add(tgt)
-
-                if is_connected(test_pos):
-                    single_selected = {mid: mv}
+                if oracle.can_move(src, tgt):
+                    single_selected = MoveBatch({mid: mv})
                     break
 
             if single_selected is None:
-                if prev_positions == cur_positions:
+                if prev_hash == cur_hash:
                     no_progress += 1
                     if no_progress > MAX_NO_PROGRESS:
                         break
                 else:
                     no_progress = 0
 
-                prev_positions = cur_positions.copy()
+                prev_hash = cur_hash
                 continue
 
             selected = single_selected
 
         
-        ok = working_env.step(deepcopy(selected))
-        if not ok:
+        result = working_env.step(selected)
+        if not result:
             no_progress += 1
             if no_progress > MAX_NO_PROGRESS:
                 break
-            prev_positions = cur_positions.copy()
+            prev_hash = cur_hash
             continue
 
-        steps.append(selected.copy())
+        steps.append(selected)
 
-        new_positions = set(working_env.grid.occupied.keys())
+        targets = [result.targets[mid] for mid in result.applied]
+        sources = [(x - dx, y - dy) for (x, y), (_, dx, dy) in zip(targets, result.applied.deltas())]
+        if all(frame.contains(p) for p in targets) and all(frame.contains(p) for p in sources):
+            new_bits = frame.move(cur_bits, sources, targets)
+        else:
+            # a module left the frame: re-encode in a larger one
+            frame, target_bits, new_bits = _encode_configuration(working_env, target_positions)
 
-        no_progress = no_progress + 1 if new_positions == cur_positions else 0
-        prev_positions = new_positions.copy()
+        new_hash = working_env.occupancy_hash
+        no_progress = no_progress + 1 if new_hash == cur_hash else 0
+        prev_hash = new_hash
+        cur_bits = new_bits
 
         if no_progress > MAX_NO_PROGRESS:
             break
 
-        if new_positions == set(target_positions):
+        if new_bits == target_bits:
             break
 
     return steps
+
+
+def _encode_configuration(env: Environment, target_positions: Set[Pos]):
+    occupied = set(env.grid.occupied.keys())
+    frame = BitboardFrame.around(occupied | target_positions, margin=1)
+    return frame, frame.encode(target_positions), frame.encode(occupied)
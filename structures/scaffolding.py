@@ -1,6 +1,10 @@
 from typing import Set, Tuple, List, Optional
-from collections import deque
-from environment import Environment
+from environment import Environment, extended_height
+from connectivity import is_connected, find_connected_components
+from degrees import NeighborDegrees
+from tracing import get_tracer
+
+_trace = get_tracer('scaffolding')
 
 Pos = Tuple[int, int]
 
@@ -11,57 +15,6 @@ def neighbors4_unbounded(p: Pos):
     return [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
 
 
-def is_connected(positions: Set[Pos]) -> bool:
-    """
-    Check if a set of positions forms a connected component via 4-connectivity.
-    Returns True if all positions are reachable from each other.
-    """
-    if not positions:
-        return True
-    if len(positions) == 1:
-        return True
-    
-    # BFS from first position
-    start = next(iter(positions))
-    visited = {start}
-    q = deque([start])
-    
-    while q:
-        current = q.popleft()
-        for neighbor in neighbors4_unbounded(current):
-            if neighbor in positions and neighbor not in visited:
-                visited.add(neighbor)
-                q.append(neighbor)
-    
-    # If we visited all positions, it's connected
-    return len(visited) == len(positions)
-
-
-def _find_connected_components(positions: Set[Pos]) -> List[Set[Pos]]:
-    """Find all connected components in a set of positions."""
-    components = []
-    remaining = positions.copy()
-    
-    while remaining:
-        start = next(iter(remaining))
-        component = set()
-        q = deque([start])
-        visited = {start}
-        
-        while q:
-            current = q.popleft()
-            component.add(current)
-            remaining.discard(current)
-            for neighbor in neighbors4_unbounded(current):
-                if neighbor in remaining and neighbor not in visited:
-                    visited.add(neighbor)
-                    q.append(neighbor)
-        
-        components.append(component)
-    
-    return components
-
-
 def _calculate_bounding_box_with_alignment(occupied: Set[Pos]) -> Tuple[int, int, int, int]:
     """Calculate bounding box and align height to multiple of 3."""
     min_x = min(x for x, _ in occupied)
@@ -70,9 +23,7 @@ def _calculate_bounding_box_with_alignment(occupied: Set[Pos]) -> Tuple[int, int
     max_y = max(y for _, y in occupied)
     
     # Align height to multiple of 3 (required for scaffolding structure)
-    height = max_y - min_y + 1
-    if height % 3 != 0:
-        max_y += 3 - (height % 3)
+    max_y = min_y + extended_height(max_y - min_y + 1) - 1
     
     return (min_x, max_x, min_y, max_y)
 
@@ -155,13 +106,22 @@ def _add_candidates_sorted(scaff: Set[Pos], candidates: List[Pos],
                           total_mods: int, cx: float, cy: float) -> Set[Pos]:
     """Add candidates to scaffolding, sorted by distance to center of mass, maintaining connectivity."""
     candidates.sort(key=lambda p: abs(p[0] - cx) + abs(p[1] - cy))
+    degrees = NeighborDegrees(scaff)
+    connected = is_connected(scaff)
     for c in candidates:
         if len(scaff) >= total_mods:
             break
-        # Only add if it maintains connectivity (must be adjacent to existing scaffold)
-        test_set = scaff | {c}
-        if is_connected(test_set):
+        if c in scaff:
+            continue
+        # Only add if it maintains connectivity (must be adjacent to existing scaffold);
+        # the degree map decides most candidates without a BFS
+        ok = degrees.check_add(c, len(scaff), connected)
+        if ok is None:
+            ok = is_connected(scaff | {c})
+        if ok:
             scaff.add(c)
+            degrees.add(c)
+            connected = True
     return scaff
 
 
@@ -173,12 +133,18 @@ def _trim_scaffold_while_connected(scaff: Set[Pos], target_count: int,
     
     scaff_list = sorted(scaff, key=lambda p: abs(p[0] - cx) + abs(p[1] - cy), reverse=True)
     result = set(scaff_list)
+    degrees = NeighborDegrees(result)
+    connected = is_connected(result)
     for pos in scaff_list:
         if len(result) <= target_count:
             break
-        test_set = result - {pos}
-        if is_connected(test_set):
-            result = test_set
+        ok = degrees.check_remove(pos, len(result), connected)
+        if ok is None:
+            ok = is_connected(result - {pos})
+        if ok:
+            result.discard(pos)
+            degrees.remove(pos)
+            connected = True
     return result
 
 
@@ -296,7 +262,7 @@ def _connect_components_with_bridge(base: Set[Pos], other_comp: Set[Pos],
 def _repair_connectivity(scaff: Set[Pos], min_x: int, max_x: int, min_y: int, max_y: int,
                          total_mods: int, central_cell: Pos, cx: float, cy: float) -> Set[Pos]:
     """Repair disconnected scaffolding by connecting components."""
-    components = _find_connected_components(scaff)
+    components = find_connected_components(scaff)
     if not components:
         return scaff
     
@@ -406,9 +372,9 @@ def _finalize_scaffolding_count(scaff: Set[Pos], min_x: int, max_x: int,
 
 def _update_environment(env: Environment, scaff: Set[Pos]) -> None:
     """Update environment grid with scaffolding positions."""
-    env.grid.occupied.clear()
+    env.grid.clear()
     for pos in scaff:
-        env.grid.occupied[pos] = True
+        env.grid.place(True, pos)
 
 
 def compute_scaffolding_from_env(env: Environment, central_cell: Pos) -> Set[Pos]:
@@ -459,13 +425,13 @@ def compute_scaffolding_from_env(env: Environment, central_cell: Pos) -> Set[Pos
     
     # 6. Final connectivity check and repair
     if not is_connected(scaff):
-        print(f"[Phase 2] WARNING: Scaffolding is not connected! Attempting to repair...")
+        _trace.warn(f"[Phase 2] WARNING: Scaffolding is not connected! Attempting to repair...")
         scaff = _repair_connectivity(scaff, min_x, max_x, min_y, max_y, total_mods, central_cell, cx, cy)
     
     # Update environment
     _update_environment(env, scaff)
     
     connected_status = "connected" if is_connected(scaff) else "NOT CONNECTED"
-    print(f"[Phase 2] Sweep line scaffolding generated with {len(scaff)} modules (target = {total_mods}), {connected_status}")
+    _trace.info(f"[Phase 2] Sweep line scaffolding generated with {len(scaff)} modules (target = {total_mods}), {connected_status}")
     return scaff
 
@@ -1,8 +1,16 @@
 from collections import deque
 from typing import Set, Tuple, List, Optional, Dict
-from copy import deepcopy
 from environment import Environment
-from structures.module import Move
+from connectivity import is_connected, find_connected_components
+from degrees import NeighborDegrees
+from articulation import ArticulationOracle
+from simple_points import MOVE_TIERS, check_move
+from batch_verify import MoveSetVerifier
+from zobrist import configuration_hash, zobrist_key
+from structures.module import Move, MoveBatch
+from tracing import get_tracer, DEBUG
+
+_trace = get_tracer('skeleton')
 
 Pos = Tuple[int, int]
 
@@ -18,34 +26,33 @@ def neighbors4_unbounded(p: Pos) -> List[Pos]:
     x, y = p
     return [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
 
-def is_connected(positions: Set[Pos]) -> bool:
-    if not positions:
-        return True
-    if len(positions) == 1:
-        return True
-    start = next(iter(positions))
-    visited = {start}
-    q = deque([start])
-    while q:
-        c = q.popleft()
-        for n in neighbors4_unbounded(c):
-            if n in positions and n not in visited:
-                visited.add(n)
-                q.append(n)
-    return len(visited) == len(positions)
-
-
 def _find_closest_hole(current_pos: Pos, holes: Set[Pos]) -> Optional[Pos]:
     if not holes:
         return None
     return min(holes, key=lambda h: abs(h[0] - current_pos[0]) + abs(h[1] - current_pos[1]))
 
 
-def _is_move_connectivity_safe(occupied_before_move: Set[Pos], current_pos: Pos, target_pos: Pos) -> bool:
+def _is_move_connectivity_safe(occupied_before_move: Set[Pos], current_pos: Pos, target_pos: Pos,
+                               degrees: Optional[NeighborDegrees] = None, connected: bool = False,
+                               key: Optional[int] = None) -> bool:
+    # `degrees` must describe exactly occupied_before_move; `connected` tells whether that set is connected;
+    # `key` is its Zobrist hash, which lets the full check below use the verdict cache
     if current_pos == target_pos:
         return True
+    if degrees is not None and current_pos in occupied_before_move and target_pos not in occupied_before_move:
+        verdict = degrees.check_move(current_pos, target_pos, len(occupied_before_move), connected)
+        if verdict is None:
+            verdict = check_move(occupied_before_move, current_pos, target_pos, connected)
+        if verdict is not None:
+            return verdict
+    MOVE_TIERS.full += 1
     test_positions = (occupied_before_move - {current_pos}) | {target_pos}
-    return is_connected(test_positions)
+    if key is not None:
+        if current_pos in occupied_before_move:
+            key ^= zobrist_key(current_pos)
+        if target_pos not in occupied_before_move:
+            key ^= zobrist_key(target_pos)
+    return is_connected(test_positions, key)
 
 def _build_skeleton(occupied: Set[Pos], max_x: int, max_y: int) -> Set[Pos]:
     if not occupied:
@@ -102,33 +109,20 @@ def _trim_exoskeleton_unsafe(exo: Set[Pos], skeleton: Set[Pos], total_mods: int,
 def _safe_trim_exoskeleton(exo: Set[Pos], skeleton: Set[Pos], total_mods: int, cx: float, cy: float) -> Set[Pos]:
     candidates = sorted([p for p in exo], key=lambda p: (p in skeleton, abs(p[0] - cx) + abs(p[1] - cy)), reverse=True)
     current = exo.copy()
+    degrees = NeighborDegrees(current)
+    connected = is_connected(current)
     for c in candidates:
         if len(current) <= total_mods:
             break
-        test = current - {c}
-        if is_connected(test):
-            current = test
+        ok = degrees.check_remove(c, len(current), connected)
+        if ok is None:
+            ok = is_connected(current - {c})
+        if ok:
+            current.discard(c)
+            degrees.remove(c)
+            connected = True
     return current
 
-def _find_connected_components(positions: Set[Pos]) -> List[Set[Pos]]:
-    components = []
-    rem = set(positions)
-    while rem:
-        start = next(iter(rem))
-        comp = set()
-        q = deque([start])
-        visited = {start}
-        while q:
-            cur = q.popleft()
-            comp.add(cur)
-            rem.discard(cur)
-            for n in neighbors4_unbounded(cur):
-                if n in rem and n not in visited:
-                    visited.add(n)
-                    q.append(n)
-        components.append(comp)
-    return components
-
 def _connect_components(components: List[Set[Pos]], center_cell: Optional[Pos]) -> Set[Pos]:
     if not components:
         return set()
@@ -176,11 +170,11 @@ def _env_to_console_matrix(positions: Set[Pos]) -> List[List[str]]:
 
 def _print_console_matrix(positions: Set[Pos], title: Optional[str] = None) -> None:
     if title:
-        print(title)
+        _trace.debug(title)
     grid = _env_to_console_matrix(positions)
     for row in grid:
-        print("".join(row))
-    print()
+        _trace.debug("".join(row))
+    _trace.debug()
 
 def _ui_update_from_positions(ui, positions: Set[Pos], keep_centered: bool = True):
     if ui is None:
@@ -218,10 +212,12 @@ def _ui_update_from_positions(ui, positions: Set[Pos], keep_centered: bool = Tru
     ui.update_matrix(new_matrix)
 
 
-def _assign_modules_to_targets(env: Environment, target_exo: Set[Pos]) -> Dict[int, Pos]:
+def _assign_modules_to_targets(env: Environment, target_exo: Set[Pos],
+                               order: Optional[List[int]] = None) -> Dict[int, Pos]:
+    # modules pick their nearest free target in `order` (default: by id)
     assignments: Dict[int, Pos] = {}
     remaining = set(target_exo)
-    for mid in sorted(env.modules.keys()):
+    for mid in (order if order is not None else sorted(env.modules.keys())):
         if not remaining:
             break
         src = env.modules[mid].pos
@@ -243,9 +239,26 @@ def _proposed_cardinal_step(src: Pos, tgt: Pos):
         if dy < 0: return Move.SOUTH
     return None
 
-def _select_safe_moves(env: Environment, proposals: Dict[int, Move]) -> Dict[int, Move]:
+def _select_safe_moves(env: Environment, proposals: MoveBatch,
+                       rank: Optional[Dict[int, int]] = None) -> MoveBatch:
+    # env.step() rejects a move onto a module that stays put; leaving a mover out can
+    # strand its follower that way, so drop the moves it would reject and select again
+    candidates = proposals
+    while candidates:
+        selected = _select_connected_moves(env, candidates, rank)
+        rejected = env.resolve_step(selected).rejected
+        if not rejected:
+            return selected
+        candidates = candidates.filter(lambda mid, _: mid not in rejected)
+    return MoveBatch()
+
+def _select_connected_moves(env: Environment, proposals: MoveBatch,
+                            rank: Optional[Dict[int, int]] = None) -> MoveBatch:
     if not proposals:
-        return {}
+        return MoveBatch()
+
+    # ties between candidates are broken by `rank` (default: by id)
+    order = rank.__getitem__ if rank is not None else int
 
     positions = {mid: env.modules[mid].pos for mid in proposals}
     targets = {mid: (positions[mid][0]+mv.delta[0], positions[mid][1]+mv.delta[1]) for mid,mv in proposals.items()}
@@ -263,37 +276,132 @@ def _select_safe_moves(env: Environment, proposals: Dict[int, Move]) -> Dict[int
     remaining: Set[int] = set(proposals.keys())
     current_occ: Set[Pos] = set(env.grid.occupied.keys())
 
+    # trial occupancy is updated in place and undone on rejection:
+    # occ_after == (current_occ - vacated) | arrived
+    occ_after = current_occ.copy()
+    # Zobrist hash of occ_after, the key of its cached connectivity verdicts
+    occ_key = configuration_hash(current_occ)
+    vacated: Set[Pos] = set()
+    arrived: Set[Pos] = set()
+    # neighbor degrees of occ_after, seeded from the grid's own map
+    degrees = env.grid.degrees.copy()
+    # articulation points of the step's starting configuration: exact answers for
+    # single moves as long as nothing has been accepted (occ_after == current_occ)
+    oracle = ArticulationOracle(current_occ)
+    connected = oracle.connected
+
+    if connected and not any(conflicts.values()) and all(t not in current_occ for t in targets.values()):
+        # every move lands on a free cell: verify the whole set at once and drop the
+        # moves failing_subset() blames until the rest keeps the configuration connected
+        kept = _drop_failing_moves(MoveSetVerifier(current_occ, connected=True, key=occ_key),
+                                   {mid: (positions[mid], targets[mid]) for mid in proposals})
+        if kept:
+            return MoveBatch((mid, proposals[mid]) for mid in sorted(kept, key=order))
+
+    def _refresh(cell: Pos) -> None:
+        nonlocal occ_key
+        if cell in arrived or (cell in current_occ and cell not in vacated):
+            if cell not in occ_after:
+                occ_after.add(cell)
+                degrees.add(cell)
+                occ_key ^= zobrist_key(cell)
+        elif cell in occ_after:
+            occ_after.discard(cell)
+            degrees.remove(cell)
+            occ_key ^= zobrist_key(cell)
+
     while remaining:
-        cand = min(remaining, key=lambda m: (len(conflicts[m] & remaining), m))
-        
-        trial = selected | {cand}
-        
-        occ_after = current_occ.copy()
-        for mid in trial:
-            occ_after.discard(positions[mid]) 
-        for mid in trial:
-            occ_after.add(targets[mid]) 
-            
-        if is_connected(occ_after):
+        cand = min(remaining, key=lambda m: (len(conflicts[m] & remaining), order(m)))
+
+        src, tgt = positions[cand], targets[cand]
+        verdict = None
+        if src != tgt and src in occ_after and src not in arrived and tgt not in occ_after:
+            # a plain single-cell move on occ_after: try the O(1) degree check first,
+            # then the 3x3 simple-point table and the bounded local search
+            verdict = degrees.check_move(src, tgt, len(occ_after), connected)
+            if verdict is None:
+                verdict = check_move(occ_after, src, tgt, connected)
+        if verdict is None and not selected:
+            MOVE_TIERS.full += 1
+            verdict = oracle.can_move(src, tgt)
+        if verdict is False:
+            remaining.remove(cand)
+            continue
+
+        new_vacated = src not in vacated
+        new_arrived = tgt not in arrived
+        vacated.add(src)
+        arrived.add(tgt)
+        if verdict is None:
+            # occ_after is connected here (only connected sets are ever accepted), so the
+            # candidate's net change to it can be verified locally with a union-find
+            removed, added = set(), set()
+            for cell in (src, tgt):
+                now = cell in arrived or (cell in current_occ and cell not in vacated)
+                if now != (cell in occ_after):
+                    (added if now else removed).add(cell)
+            if connected:
+                verdict = (not (removed or added)
+                           or MoveSetVerifier(occ_after, connected=True, key=occ_key)
+                           .is_connected_after_change(removed, added))
+        _refresh(src)
+        _refresh(tgt)
+
+        if verdict is None:
+            MOVE_TIERS.full += 1
+        if verdict or is_connected(occ_after, occ_key):
             selected.add(cand)
             remaining.remove(cand)
             remaining -= (conflicts[cand] & remaining) 
+            connected = True
         else:
+            if new_arrived:
+                arrived.discard(tgt)
+            if new_vacated:
+                vacated.discard(src)
+            _refresh(src)
+            _refresh(tgt)
             remaining.remove(cand) 
 
     if selected:
-        return {mid: proposals[mid] for mid in selected}
+        return MoveBatch((mid, proposals[mid]) for mid in sorted(selected, key=order))
 
-    for mid, mv in sorted(proposals.items(), key=lambda it: (abs(env.modules[it[0]].pos[0]- (env.modules[it[0]].pos[0] + it[1].delta[0])) + abs(env.modules[it[0]].pos[1] - (env.modules[it[0]].pos[1] + it[1].delta[1])), it[0])):
-        occ_after = set(env.grid.occupied.keys())
+    for mid, mv in sorted(proposals.items(), key=lambda it: (abs(env.modules[it[0]].pos[0]- (env.modules[it[0]].pos[0] + it[1].delta[0])) + abs(env.modules[it[0]].pos[1] - (env.modules[it[0]].pos[1] + it[1].delta[1])), order(it[0]))):
         src = env.modules[mid].pos
         tgt = (src[0]+mv.delta[0], src[1]+mv.delta[1])
-        occ_after.discard(src)
-        occ_after.add(tgt)
-        if is_connected(occ_after):
-            return {mid: mv}
-
-    return {}
+        if tgt not in current_occ and oracle.can_move(src, tgt):
+            return MoveBatch({mid: mv})
+
+    return MoveBatch()
+
+def _drop_failing_moves(verifier: MoveSetVerifier, moves: Dict[int, Tuple[Pos, Pos]]) -> Set[int]:
+    """
+    The ids of `moves` left after removing each failing subset the verifier names as a
+    whole, until the rest is safe to apply at once.
+    """
+    moves = dict(moves)
+    while moves:
+        culprits = verifier.failing_subset(moves)
+        if not culprits:
+            break
+        for mid in culprits:
+            del moves[mid]
+    return set(moves)
+
+def _disconnecting_moves(env: Environment, step: MoveBatch) -> List[int]:
+    """
+    After `step` has been applied to env and broken connectivity: the ids of a minimal
+    subset of its moves that disconnects the pre-step configuration on its own.
+    """
+    moves: Dict[int, Tuple[Pos, Pos]] = {}
+    for mid, dx, dy in step.deltas():
+        tgt = env.modules[mid].pos
+        if tgt is not None:
+            moves[mid] = ((tgt[0] - dx, tgt[1] - dy), tgt)
+    before = set(env.grid.occupied.keys())
+    before.difference_update(tgt for _, tgt in moves.values())
+    before.update(src for src, _ in moves.values())
+    return MoveSetVerifier(before).failing_subset(moves)
 
 def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 10000, return_steps: bool=False):
     occupied = set(env.grid.occupied.keys())
@@ -329,7 +437,7 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
             target_exo.discard(center_cell)
 
     if not is_connected(target_exo):
-        comps = _find_connected_components(target_exo)
+        comps = find_connected_components(target_exo)
         target_exo = _connect_components(comps, center_cell)
         if len(target_exo) > total_mods:
             target_exo = _trim_exoskeleton_unsafe(target_exo, skeleton, total_mods, cx, cy)
@@ -338,13 +446,13 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
 
     assignments = _assign_modules_to_targets(env, target_exo)
 
-    steps_executed: List[Dict[int, Move]] = []
+    steps_executed: List[MoveBatch] = []
     it = 0
     while it < max_iters:
         it += 1
         assignments = _assign_modules_to_targets(env, target_exo)
 
-        proposals: Dict[int, Move] = {}
+        proposals = MoveBatch()
         for mid, tgt in assignments.items():
             src = env.modules[mid].pos
             mv = _proposed_cardinal_step(src, tgt)
@@ -352,20 +460,20 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
                 proposals[mid] = mv
 
         if not proposals:
-            print(f"Step {it}: no more moves; modules at targets (or cannot propose).")
+            _trace.info(f"Step {it}: no more moves; modules at targets (or cannot propose).")
             break
 
         selected = _select_safe_moves(env, proposals)
         if not selected:
-            print(f"Step {it}: cannot move further without breaking connectivity. Stopping.")
+            _trace.warn(f"Step {it}: cannot move further without breaking connectivity. Stopping.")
             break
 
         
-        env.step(deepcopy(selected))
+        env.step(selected)
         
         new_positions = set(env.grid.occupied.keys())
         if not is_connected(new_positions):
-            print(f"[Skeleton] WARNING: Connectivity broken after step {it}! This should not happen.")
+            _trace.warn(f"[Skeleton] WARNING: Connectivity broken after step {it}! This should not happen.")
         
         position_to_modules: Dict[Pos, List[int]] = {}
         for mid, mod in env.modules.items():
@@ -376,20 +484,21 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
         
         duplicates = {pos: mids for pos, mids in position_to_modules.items() if len(mids) > 1}
         if duplicates:
-            print(f"[Skeleton] WARNING: {len(duplicates)} duplicate positions detected after step {it}!")
-            for pos, mids in duplicates.items():
-                print(f"[Skeleton]   Position {pos} has {len(mids)} modules: {mids}")
+            _trace.warn(f"[Skeleton] WARNING: {len(duplicates)} duplicate positions detected after step {it}!")
+            if _trace.level >= DEBUG:
+                for pos, mids in duplicates.items():
+                    _trace.debug(f"[Skeleton]   Position {pos} has {len(mids)} modules: {mids}")
         
-        steps_executed.append(selected.copy())
-
-        print(f"Step {it}: executed {len(selected)} moves")
-        for mid, mv in selected.items():
-            cur = env.modules[mid].pos
-            prev = (cur[0]-mv.delta[0], cur[1]-mv.delta[1])
-            print(f"  Module {mid}: {prev} -> {cur} ({mv.name})")
+        steps_executed.append(selected)
 
+        _trace.info(f"Step {it}: executed {len(selected)} moves")
         final_positions = set(env.grid.occupied.keys())
-        _print_console_matrix(final_positions, title=f"After step {it} (console view):")
+        if _trace.level >= DEBUG:
+            for mid, mv in selected.items():
+                cur = env.modules[mid].pos
+                prev = (cur[0]-mv.delta[0], cur[1]-mv.delta[1])
+                _trace.debug(f"  Module {mid}: {prev} -> {cur} ({mv.name})")
+            _print_console_matrix(final_positions, title=f"After step {it} (console view):")
         if ui:
             _ui_update_from_positions(ui, final_positions, keep_centered=True)
             try:
@@ -398,7 +507,7 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
                 pass
 
         if final_positions == target_exo:
-            print(f"All modules reached target exoskeleton at step {it}.")
+            _trace.info(f"All modules reached target exoskeleton at step {it}.")
             break
 
     final_occ = set(env.grid.occupied.keys())
@@ -414,7 +523,7 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
                 final_occ.add(c)
 
     if not is_connected(final_occ):
-        comps = _find_connected_components(final_occ)
+        comps = find_connected_components(final_occ)
         final_occ = _connect_components(comps, center_cell)
         if len(final_occ) > total_mods:
             final_occ = set(sorted(final_occ, key=lambda p: (abs(p[0]-cx)+abs(p[1]-cy)))[:total_mods])
@@ -428,7 +537,8 @@ def compute_exoskeleton_from_env(env: Environment, ui=None, max_iters: int = 100
             ui.update_phase_label("Phase 1: Exoskeleton Constructed")
         except Exception:
             pass
-    _print_console_matrix(final_occ, title="Final exoskeleton (console view):")
+    if _trace.level >= DEBUG:
+        _print_console_matrix(final_occ, title="Final exoskeleton (console view):")
 
     if return_steps:
         return steps_executed
@@ -445,10 +555,10 @@ def _update_env_positions(env: Environment, final_occ: Set[Pos]) -> None:
         best = min(remaining_targets, key=lambda t: abs(t[0]-pos[0]) + abs(t[1]-pos[1]))
         assignments[mid] = best
         remaining_targets.remove(best)
-    env.grid.occupied.clear()
+    env.grid.clear()
     for mid, tgt in assignments.items():
         env.modules[mid].pos = tgt
-        env.grid.occupied[tgt] = True
+        env.grid.place(True, tgt)
     for t in remaining_targets:
-        env.grid.occupied[t] = True
+        env.grid.place(True, t)
 
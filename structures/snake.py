@@ -1,5 +1,9 @@
-from .module import Module, Move
+from .module import Module, Move, MoveBatch
 from typing import Any, Callable, List, Optional, Sequence, Tuple
+from tracing import get_tracer
+
+_trace = get_tracer('snake')
+
 class SnakeSegment:
     module: Module
     segment_ahead: Module
@@ -41,10 +45,10 @@ class SnakeHead(SnakeSegment):
                 'left_flank' : [0, 1]
             }
         }
-        print('-------------------------------------------------------facing', self.facing)
-        print(scan_dict[self.facing])
-        print(self.module.pos)
-        print(self.module.id)
+        _trace.debug('-------------------------------------------------------facing', self.facing)
+        _trace.debug(scan_dict[self.facing])
+        _trace.debug(self.module.pos)
+        _trace.debug(self.module.id)
         deltas = scan_dict[self.facing]
         right_module = self.env.find_module_at([self.module.pos[0] + deltas['right'][0], self.module.pos[1] + deltas['right'][1]], check_for_oob=True)
         left_module = self.env.find_module_at([self.module.pos[0] + deltas['left'][0], self.module.pos[1] + deltas['left'][1]], check_for_oob=True)
@@ -79,40 +83,40 @@ class SnakeHead(SnakeSegment):
         new_facing = None
 
         if ahead_module == 'oob':
-            print('reached bounding box end, remaking snake')
+            _trace.debug('reached bounding box end, remaking snake')
             return 'done'
 
         elif not isinstance(right_module, Module) and not isinstance(left_module, Module) and not isinstance(ahead_module, Module):
-            print('turning right on convex corner or dead end')
+            _trace.debug('turning right on convex corner or dead end')
             move = head_move['diagonal_right'][0]
             new_facing = head_move['diagonal_right'][1]
 
         elif not isinstance(left_module, Module) and not isinstance(ahead_module, Module) and not isinstance(far_ahead_module, Module) and isinstance(right_module, Module):
-            print('going ahead along smooth wall')
+            _trace.debug('going ahead along smooth wall')
             move = head_move['ahead'][0]
             new_facing = head_move['ahead'][1]
         
         elif not isinstance(left_module, Module) and not isinstance(ahead_module, Module) and isinstance(right_module, Module) and isinstance(far_ahead_module, Module):
-            print('turning left on concave corner')
+            _trace.debug('turning left on concave corner')
             move = head_move['diagonal_left'][0]
             new_facing = head_move['diagonal_right'][1]
 
         elif isinstance(left_module, Module) and isinstance(right_module, Module) and not isinstance(ahead_module, Module):
-            print('going deeper into dead end')
+            _trace.debug('going deeper into dead end')
             move = head_move['ahead'][0]
             new_facing = head_move['ahead'][1]
 
         elif isinstance(left_module, Module) and isinstance(right_module, Module) and isinstance(ahead_module, Module) and isinstance(left_flank_module, Module):
-            print('reached end of dead end, remaking snake')
+            _trace.debug('reached end of dead end, remaking snake')
             return 'remake_snake'
         
         elif isinstance(right_module, Module) and isinstance(ahead_module, Module) and not isinstance(left_module, Module):
-            print('after right corner turn, running into corner with left space to go into')
+            _trace.debug('after right corner turn, running into corner with left space to go into')
             move = head_move['diagonal_left'][0]
             new_facing = head_move['ahead'][1]
 
         elif isinstance(left_module, Module) and isinstance(right_module, Module) and isinstance(ahead_module, Module) and not isinstance(left_flank_module, Module):
-            print('after right corner turn, running into corner with no left space to go into')
+            _trace.debug('after right corner turn, running into corner with no left space to go into')
             move = head_move['just_left'][0]
             new_facing = head_move['just_left'][1]
         
@@ -137,7 +141,7 @@ class Snake:
             self.head.env = env
 
     def movement_dict(self):
-        movement_dict = {}
+        movement_dict = MoveBatch()
         move = self.head.calculate_next_move()
         if move == 'done':
             return 'done'
@@ -154,10 +158,10 @@ class Snake:
                 return None
         
         if move is None:
-            print(f'Warning: Snake head {self.head.module.id} calculate_next_move returned None')
+            _trace.warn(f'Warning: Snake head {self.head.module.id} calculate_next_move returned None')
             return None
         if not isinstance(move, Move):
-            print(f'Warning: Snake head {self.head.module.id} calculate_next_move returned non-Move: {type(move)}, {move}')
+            _trace.warn(f'Warning: Snake head {self.head.module.id} calculate_next_move returned non-Move: {type(move)}, {move}')
             return None
         
         movement_dict[self.head.module.id] = move
@@ -168,7 +172,7 @@ class Snake:
                 if isinstance(segment_move, Move) and hasattr(segment_move, 'delta'):
                     movement_dict[segment.module.id] = segment_move
                 else:
-                    print(f'Warning: Segment {segment.module.id} has invalid last_move: {segment_move} (type: {type(segment_move)})')
+                    _trace.warn(f'Warning: Segment {segment.module.id} has invalid last_move: {segment_move} (type: {type(segment_move)})')
 
             
         for segment in reversed(self.segments):
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 from typing import List
 from .metamodule import MetaModule
-from copy import deepcopy
+from .module import MoveBatch
+from tracing import get_tracer, DEBUG
+
+_trace = get_tracer('sweepline')
 
 @dataclass
 class SweepLine:
@@ -10,7 +13,7 @@ class SweepLine:
 
     def __init__(self, x, metamodules):
         
-        print('Sweepline created at: ', x)
+        _trace.debug('Sweepline created at: ', x)
         self.x = x
         self.metamodules = metamodules
 
@@ -53,65 +56,67 @@ class SweepLine:
         return True
     
     def full_diagnostic(self, env) -> None:
-        print(f"SweepLine at x={self.x}:")
-        print(f"  Valid: {self.is_valid()}")
-        print(f"  Separator: {self.is_separator(env)}")
-        print(f"  Solid: {self.is_solid()}")
-        print(f"  Clean: {self.is_clean()}")
+        if _trace.level < DEBUG:
+            return
+        _trace.debug(f"SweepLine at x={self.x}:")
+        _trace.debug(f"  Valid: {self.is_valid()}")
+        _trace.debug(f"  Separator: {self.is_separator(env)}")
+        _trace.debug(f"  Solid: {self.is_solid()}")
+        _trace.debug(f"  Clean: {self.is_clean()}")
         for metamodule in self.metamodules:
             metamodule.full_diagnostic(env)
 
     def gather_east_strip(self, env, env_queue, i):
-        movement_dict_queue = [{}]
+        movement_dict_queue = [MoveBatch()]
         for metamodule in self.metamodules:
             metamodule.gather_east_strip(env, movement_dict_queue, i)
 
         for movement_dict in movement_dict_queue:
-            if movement_dict != {}:
-                env_queue.append(deepcopy(env.transformation(movement_dict)))
+            if movement_dict:
+                env_queue.append(env.transformation(movement_dict).snapshot())
 
     def clean(self, env, env_queue) -> bool:
         done = True
-        movement_dict_queue = [{}, {}]
+        movement_dict_queue = [MoveBatch() for _ in range(2)]
         #Clean leading metamodules first
         for i, metamodule in enumerate(reversed(self.metamodules)):
             if i % 2 == 0:
                 if not metamodule.clean(env, movement_dict_queue):
                     done = False
         for movement_dict in movement_dict_queue:
-            if movement_dict != {}:
-                env_queue.append(deepcopy(env.transformation(movement_dict)))
+            if movement_dict:
+                env_queue.append(env.transformation(movement_dict).snapshot())
         
-        movement_dict_queue = [{}, {}]
+        movement_dict_queue = [MoveBatch() for _ in range(2)]
         #Clean trailing metamodules second
         for i, metamodule in enumerate(reversed(self.metamodules)):
             if i % 2 == 1:
                 if not metamodule.clean(env, movement_dict_queue):
                     done = False
         for movement_dict in movement_dict_queue:
-            if movement_dict != {}:
-                env_queue.append(deepcopy(env.transformation(movement_dict)))
+            if movement_dict:
+                env_queue.append(env.transformation(movement_dict).snapshot())
 
         return done
 
 
     def advance(self, env, env_queue) -> None:
         #Advance leading metamodules first
-        movement_dict_queue = [{}, {}, {}, {}, {}]
+        movement_dict_queue = [MoveBatch() for _ in range(5)]
         for i, metamodule in enumerate(self.metamodules):
             if i % 2 == 0:
                 metamodule.advance(env, movement_dict_queue, True)
 
         for movement_dict in movement_dict_queue:
-            if movement_dict != {}:
-                env_queue.append(deepcopy(env.transformation(movement_dict)))
+            if movement_dict:
+                env_queue.append(env.transformation(movement_dict).snapshot())
 
         #Advance trailing metamodules second
-        movement_dict_queue = [{}, {}, {}, {}, {}]
+        movement_dict_queue = [MoveBatch() for _ in range(5)]
         for i, metamodule in enumerate(self.metamodules):
             if i % 2 == 1:
                 metamodule.advance(env, movement_dict_queue, False)
 
         for movement_dict in movement_dict_queue:
-            if movement_dict != {}:
-                env_queue.append(deepcopy(env.transformation(movement_dict)))
\ No newline at end of file
+            if movement_dict:
+                env_queue.append(env.transformation(movement_dict).snapshot())
\ No newline at end of file
@@ -1,4 +1,4 @@
-from environment import Environment
+from environment import Environment, extended_height
 
 def compute_histogram_from_environment(env: Environment) -> dict:
     """
@@ -15,8 +15,7 @@ def compute_histogram_from_environment(env: Environment) -> dict:
     min_y = min(y for _, y in occupied)
     max_y = max(y for _, y in occupied)
     # Align (max_y - min_y) to multiple of 3
-    if (max_y - min_y + 1) % 3 != 0:
-        max_y += 3 - ((max_y - min_y + 1) % 3)
+    max_y = min_y + extended_height(max_y - min_y + 1) - 1
     total_mods = len(occupied)
     
     """Sweep line on the west side"""
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# a modulok a repó gyökeréből, csomagnév nélkül importálódnak
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
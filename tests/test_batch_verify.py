@@ -0,0 +1,57 @@
+from batch_verify import MoveSetVerifier
+from environment import Environment
+from structures.module import Move, MoveBatch
+from structures.skeleton import _drop_failing_moves, _select_safe_moves
+
+# itt egyetlen törlő kör a [0, 1, 3] halmazt adná: a 3-ast még a 2-es mellett tartja
+# meg, a 2-es elhagyása után viszont az 1-es is elhagyhatóvá válik
+CELLS = {(-1, 0), (0, -2), (0, -1), (0, 0), (0, 1), (1, -3), (1, -2), (1, -1),
+         (1, 0), (1, 1), (1, 2), (2, -2), (2, 1), (2, 2)}
+MOVES = {0: ((2, -2), (2, -3)), 1: ((0, 1), (0, 2)), 2: ((1, 0), (2, 0)), 3: ((1, -1), (2, -1))}
+
+
+def test_failing_subset_is_inclusion_minimal():
+    verifier = MoveSetVerifier(CELLS)
+    culprits = verifier.failing_subset(MOVES)
+    assert culprits == [0, 3]
+    assert not verifier.is_connected_after(MOVES[m] for m in culprits)
+    for mid in culprits:
+        assert verifier.is_connected_after(MOVES[m] for m in culprits if m != mid)
+
+
+def test_failing_subset_of_safe_moves_is_empty():
+    verifier = MoveSetVerifier(CELLS)
+    assert verifier.failing_subset({2: MOVES[2]}) == []
+
+
+def test_drop_failing_moves_removes_whole_subsets():
+    class Counting(MoveSetVerifier):
+        rounds = 0
+
+        def failing_subset(self, moves):
+            Counting.rounds += 1
+            return super().failing_subset(moves)
+
+    verifier = Counting(CELLS)
+    safe = {4: ((-1, 0), (-1, -1))}
+    kept = _drop_failing_moves(verifier, {**MOVES, **safe})
+    assert kept == set(safe)
+    # [0, 3], majd [1, 2]: körönként egy teljes bűnös halmaz esik ki
+    assert Counting.rounds == 3
+
+
+def test_select_safe_moves_keeps_moves_only_safe_together():
+    # egy 1x3-as sor: egyik modul sem léphet fel egyedül, együtt viszont igen
+    env = Environment.from_matrix([[1, 1, 1]])
+    proposals = MoveBatch({mid: Move.NORTH for mid in env.modules})
+    selected = _select_safe_moves(env, proposals)
+    assert set(selected.keys()) == set(env.modules)
+
+
+def test_select_safe_moves_drops_blamed_moves():
+    # L alak: a felső modul végigcsúszhat a soron, a jobb szélső lelépése viszont leválna
+    env = Environment.from_matrix([[1, 0, 0], [1, 1, 1]])
+    by_pos = {m.pos: mid for mid, m in env.modules.items()}
+    proposals = MoveBatch({by_pos[(0, 1)]: Move.EAST, by_pos[(2, 0)]: Move.SOUTH})
+    selected = _select_safe_moves(env, proposals)
+    assert dict(selected.items()) == {by_pos[(0, 1)]: Move.EAST}
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from connectivity import find_connected_components, grid_components, grid_is_connected, is_connected
+from environment import Environment
+from grid import ChunkedGrid, Grid, make_grid
+from structures.module import Module
+
+
+def _random_cells(rng, n, spread):
+    if rng.random() < 0.5:
+        cells = {(0, 0)}
+        while len(cells) < n:
+            x, y = rng.choice(sorted(cells))
+            dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            cells.add((x + dx, y + dy))
+        return cells
+    return {(rng.randint(-spread, spread), rng.randint(-spread, spread)) for _ in range(n)}
+
+
+@pytest.mark.parametrize('chunk_size', [2, 3, 8, 32])
+def test_tile_connectivity_matches_position_sets(chunk_size):
+    rng = random.Random(chunk_size)
+    for _ in range(60):
+        cells = _random_cells(rng, rng.randint(1, 150), rng.choice((4, 12, 60)))
+        grid = ChunkedGrid(chunk_size=chunk_size)
+        for mid, p in enumerate(sorted(cells)):
+            grid.place(mid, p)
+        assert grid_is_connected(grid) == is_connected(cells)
+        assert sorted(map(sorted, grid_components(grid))) == \
+            sorted(map(sorted, find_connected_components(cells)))
+
+
+def test_far_apart_tiles_are_not_connected():
+    grid = ChunkedGrid()
+    grid.place(1, (0, 0))
+    grid.place(2, (10_000, 10_000))
+    assert grid.chunk_count == 2
+    assert not grid_is_connected(grid)
+
+
+def test_chunked_exports_and_strip_checks_match_dict_grid():
+    rng = random.Random(7)
+    cells = _random_cells(rng, 120, 20)
+    envs = []
+    for grid in (Grid(), ChunkedGrid(chunk_size=4)):
+        env = Environment(grid)
+        for mid, p in enumerate(sorted(cells), start=1):
+            env.add_module(Module(mid, p))
+        envs.append(env)
+    plain, chunked = envs
+    assert chunked.matrix_from_environment() == plain.matrix_from_environment()
+    min_x, max_x, min_y, max_y = plain.find_bounds()
+    for y in range(min_y, max_y + 1):
+        for lo in range(min_x, max_x + 1):
+            for hi in (lo, lo + 1, lo + 3, max_x):
+                expected = all((x, y) in cells for x in range(lo, hi + 1))
+                assert plain.row_full(y, lo, hi) == expected
+                assert chunked.row_full(y, lo, hi) == expected
+
+
+def test_make_grid():
+    assert isinstance(make_grid('chunked'), ChunkedGrid)
+    assert type(make_grid()) is Grid
+    with pytest.raises(ValueError):
+        make_grid('sparse')
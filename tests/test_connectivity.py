@@ -0,0 +1,42 @@
+import os
+
+from batch_verify import MoveSetVerifier
+from connectivity import CONNECTIVITY_CACHE, is_connected
+from zobrist import configuration_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_only_keyed_calls_are_memoized():
+    CONNECTIVITY_CACHE.clear()
+    cells = {(0, 0), (1, 0), (1, 1)}
+    assert is_connected(cells)
+    assert not is_connected(cells - {(1, 0)})
+    assert len(CONNECTIVITY_CACHE) == 0
+
+    key = configuration_hash(cells)
+    assert is_connected(cells, key=key)
+    assert is_connected(cells, key=key)
+    assert len(CONNECTIVITY_CACHE) == 1
+    assert CONNECTIVITY_CACHE.hits == 1
+
+
+def test_verifier_keys_its_full_checks_by_the_resulting_set():
+    CONNECTIVITY_CACHE.clear()
+    # connected=False mellett a verifier mindig a teljes új halmazt ellenőrzi
+    verifier = MoveSetVerifier({(0, 0), (1, 0), (2, 0)}, connected=False)
+    assert verifier.is_connected_after([((2, 0), (1, 1))])
+    after = {(0, 0), (1, 0), (1, 1)}
+    assert is_connected(after, key=configuration_hash(after))
+    assert CONNECTIVITY_CACHE.hits == 1
+
+
+def test_pipeline_reuses_cached_verdicts():
+    from pipeline import run_reconfiguration
+    CONNECTIVITY_CACHE.clear()
+    result = run_reconfiguration(os.path.join(ROOT, 'configurations', '008-input.txt'),
+                                 os.path.join(ROOT, 'configurations', '001-goal.txt'))
+    assert result.goal_reached
+    # a tervezés és a végrehajtás ugyanazokat a lépés utáni alakzatokat ellenőrzi
+    assert CONNECTIVITY_CACHE.hits > 0
+    assert CONNECTIVITY_CACHE.hit_rate() > 0.5
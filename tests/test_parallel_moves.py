@@ -0,0 +1,46 @@
+from environment import Environment
+from structures.module import Module
+from structures.parallel_moves import compute_parallel_moves, matrix_order
+
+START = [
+    [1, 1, 1, 0, 0],
+    [1, 0, 0, 0, 0],
+    [1, 1, 1, 1, 0],
+]
+GOAL = [
+    [0, 0, 1, 1, 1],
+    [0, 0, 0, 0, 1],
+    [0, 1, 1, 1, 1],
+]
+
+
+def _relabeled(env, ids):
+    # ugyanaz a konfiguráció, más modulazonosítókkal (mint egy fázisok közti átadásnál)
+    out = Environment()
+    for mid, new_id in zip(sorted(env.modules), ids):
+        out.add_module(Module(new_id, env.modules[mid].pos))
+    return out
+
+
+def _cells(env, steps):
+    return [sorted(env.modules[mid].pos for mid in step) for step in steps]
+
+
+def test_matrix_order_follows_positions():
+    env = Environment.from_matrix(START)
+    assert matrix_order(env) == sorted(env.modules)
+    shuffled = _relabeled(env, [7, 3, 9, 1, 8, 2, 6, 5, 4])
+    assert [shuffled.modules[mid].pos for mid in matrix_order(shuffled)] == \
+        [env.modules[mid].pos for mid in matrix_order(env)]
+
+
+def test_schedule_does_not_depend_on_module_ids():
+    env = Environment.from_matrix(START)
+    targets = {m.pos for m in Environment.from_matrix(GOAL).modules.values()}
+    shuffled = _relabeled(env, [7, 3, 9, 1, 8, 2, 6, 5, 4])
+
+    steps = compute_parallel_moves(env, targets)
+    shuffled_steps = compute_parallel_moves(shuffled, targets)
+    assert steps
+    assert len(steps) == len(shuffled_steps)
+    assert _cells(env, steps[:1]) == _cells(shuffled, shuffled_steps[:1])
@@ -0,0 +1,37 @@
+from environment import REJECT_OCCUPIED, Environment
+from structures.module import Move, MoveBatch
+
+
+def _row(n):
+    env = Environment.from_matrix([[1] * n])
+    by_pos = {m.pos: mid for mid, m in env.modules.items()}
+    return env, [by_pos[p] for p in sorted(by_pos)]
+
+
+def test_move_onto_stationary_module_is_rejected():
+    env, (a, b) = _row(2)
+    result = env.resolve_step(MoveBatch({a: Move.EAST}))
+    assert result.rejected == {a: REJECT_OCCUPIED}
+    assert not result.applied
+
+
+def test_rejections_cascade_along_a_chain():
+    # a, b és c egymás helyére lépne, de d helyben marad: c elutasítása b-t, az pedig a-t is visszatartja
+    env, (a, b, c, d) = _row(4)
+    before = {mid: m.pos for mid, m in env.modules.items()}
+    result = env.step(MoveBatch({a: Move.EAST, b: Move.EAST, c: Move.EAST}))
+    assert result.rejected == {a: REJECT_OCCUPIED, b: REJECT_OCCUPIED, c: REJECT_OCCUPIED}
+    assert {mid: m.pos for mid, m in env.modules.items()} == before
+
+    # ha a lánc eleje is lép, az egész lánc elmozdul
+    result = env.step(MoveBatch({a: Move.EAST, b: Move.EAST, c: Move.EAST, d: Move.EAST}))
+    assert not result.rejected
+    assert sorted(env.grid.occupied) == [(1, 0), (2, 0), (3, 0), (4, 0)]
+
+
+def test_step_keeps_shared_cell_occupied():
+    env, (a, b, c) = _row(3)
+    env.transformation(MoveBatch({a: Move.EAST}))
+    assert env.step(MoveBatch({b: Move.NORTH})).applied
+    assert env.grid.occupied.get(env.modules[a].pos) == a
+    assert set(env.grid.occupied) == {m.pos for m in env.modules.values()}
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tracing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_bad_level_is_rejected_without_side_effects():
+    tracer = tracing.get_tracer('test-tracing')
+    before = tracer.level
+    with pytest.raises(ValueError, match='verbose'):
+        tracing.configure_from_string('debug,test-tracing=verbose')
+    assert tracer.level == before
+
+
+def test_bad_environment_level_does_not_break_import():
+    env = dict(os.environ, SQUARES_TRACE='loud')
+    proc = subprocess.run([sys.executable, '-c', 'import tracing; print(tracing._default_level)'],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    assert proc.returncode == 0
+    assert proc.stdout.strip() == str(tracing.DEFAULT_LEVEL)
+    assert 'SQUARES_TRACE ignored' in proc.stderr
+
+
+def test_headless_run_is_quiet_unless_verbose(capsys, monkeypatch):
+    from pipeline import run_reconfiguration
+    monkeypatch.delenv('SQUARES_TRACE', raising=False)
+    tracer = tracing.get_tracer('phase1')
+    before = tracer.level
+    start = os.path.join(ROOT, 'configurations', '008-input.txt')
+    goal = os.path.join(ROOT, 'configurations', '001-goal.txt')
+
+    run_reconfiguration(start, goal)
+    assert capsys.readouterr().out == ''
+    assert tracer.level == before
+
+    run_reconfiguration(start, goal, verbose=True)
+    assert capsys.readouterr().out != ''
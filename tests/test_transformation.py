@@ -0,0 +1,53 @@
+import pytest
+
+from environment import Environment
+from grid import ArrayGrid, ChunkedGrid, Grid, np
+from structures.module import Module, Move, MoveBatch
+
+GRIDS = [Grid, ChunkedGrid]
+if np is not None:
+    GRIDS.append(ArrayGrid)
+
+
+def _env(grid_cls):
+    env = Environment(grid_cls())
+    for mid, pos in ((1, (1, 0)), (2, (0, 0)), (3, (1, 1))):
+        env.add_module(Module(mid, pos))
+    return env
+
+
+@pytest.mark.parametrize('grid_cls', GRIDS)
+def test_transformation_keeps_stationary_module_on_shared_cell(grid_cls):
+    env = _env(grid_cls)
+    # a 2-es modul rácsúszik az álló 1-esre, majd továbbhalad
+    env.transformation(MoveBatch({2: Move.EAST}))
+    assert set(env.grid.occupied) == {(1, 0), (1, 1)}
+    assert env.grid.occupied[(1, 0)] == 1
+
+    env.transformation(MoveBatch({2: Move.EAST}))
+    assert env.modules[1].pos == (1, 0)
+    assert set(env.grid.occupied) == {(1, 0), (2, 0), (1, 1)}
+    assert env.grid.occupied[(1, 0)] == 1
+    assert env.grid.occupied[(2, 0)] == 2
+    assert env.grid.degrees.degree4((1, 0)) == 2
+    assert env.grid.row_full(0, 1, 2)
+
+
+@pytest.mark.parametrize('grid_cls', GRIDS)
+def test_transformation_moves_off_stacked_cell_together(grid_cls):
+    env = _env(grid_cls)
+    env.transformation(MoveBatch({2: Move.EAST}))
+    env.transformation(MoveBatch({1: Move.EAST, 2: Move.EAST}))
+    assert env.modules[1].pos == env.modules[2].pos == (2, 0)
+    assert set(env.grid.occupied) == {(2, 0), (1, 1)}
+    assert env.find_module_at((2, 0)).id == env.grid.occupied[(2, 0)]
+
+
+@pytest.mark.parametrize('grid_cls', GRIDS)
+def test_exported_matrix_does_not_follow_later_moves(grid_cls):
+    env = _env(grid_cls)
+    matrix = env.matrix_from_environment()
+    assert type(matrix) is list and type(matrix[0]) is list
+    assert matrix == [[0, 1], [1, 1]]
+    env.transformation(MoveBatch({3: Move.WEST}))
+    assert matrix == [[0, 1], [1, 1]]
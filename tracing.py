@@ -0,0 +1,133 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# szintek: minél nagyobb, annál bőbeszédűbb
+OFF = 0
+ERROR = 10
+WARN = 20
+INFO = 30
+DEBUG = 40
+
+_LEVEL_NAMES = {'off': OFF, 'error': ERROR, 'warn': WARN, 'info': INFO, 'debug': DEBUG}
+
+# alapból csendes (fej nélküli futtatás): csak a figyelmeztetések és hibák jelennek meg
+DEFAULT_LEVEL = WARN
+
+
+def _noop(*args, **kwargs) -> None:
+    pass
+
+
+class Tracer:
+    """
+    Egy kategória (pl. 'phase1', 'snake') nyomkövetője. A szintenkénti metódusok
+    (error, warn, info, debug) print-szerűen hívhatók; a kikapcsolt szintek helyén
+    egy üres függvény áll, így a hívás ára egy attribútum-keresés. Drága üzenet
+    összeállítása előtt `if tracer.level >= DEBUG:` ellenőrizhető.
+    """
+    __slots__ = ('category', 'level', 'error', 'warn', 'info', 'debug')
+
+    def __init__(self, category: str, level: int):
+        self.category = category
+        self._set_level(level)
+
+    def _set_level(self, level: int) -> None:
+        self.level = level
+        for name, threshold in (('error', ERROR), ('warn', WARN), ('info', INFO), ('debug', DEBUG)):
+            setattr(self, name, _emit if level >= threshold else _noop)
+
+    def __repr__(self) -> str:
+        return f'Tracer({self.category!r}, level={self.level})'
+
+
+def _emit(*args, sep: str = ' ', end: str = '\n') -> None:
+    # a sys.stdout-ot hívási időben kérjük le, hogy a redirect_stdout is működjön
+    print(*args, sep=sep, end=end, file=_stream if _stream is not None else sys.stdout)
+
+
+_tracers: Dict[str, Tracer] = {}
+_overrides: Dict[str, int] = {}
+_default_level = DEFAULT_LEVEL
+_stream = None
+
+
+def get_tracer(category: str) -> Tracer:
+    tracer = _tracers.get(category)
+    if tracer is None:
+        tracer = _tracers[category] = Tracer(category, _overrides.get(category, _default_level))
+    return tracer
+
+
+def _parse_level(level) -> int:
+    if isinstance(level, str):
+        try:
+            return _LEVEL_NAMES[level.lower()]
+        except KeyError:
+            raise ValueError(f"unknown trace level {level!r}, expected one of "
+                             f"{', '.join(_LEVEL_NAMES)}") from None
+    return level
+
+
+def configure(level=None, categories: Optional[Dict[str, object]] = None, stream=None) -> None:
+    """
+    Beállítja az alapszintet és/vagy kategóriánkénti szinteket (szám vagy 'debug',
+    'info', 'warn', 'error', 'off'), valamint a kimeneti streamet (None: sys.stdout).
+    """
+    global _default_level, _stream
+    if level is not None:
+        _default_level = _parse_level(level)
+    if categories:
+        for category, cat_level in categories.items():
+            _overrides[category] = _parse_level(cat_level)
+    if stream is not None:
+        _stream = stream
+    for category, tracer in _tracers.items():
+        tracer._set_level(_overrides.get(category, _default_level))
+
+
+def quiet() -> None:
+    """Mindent elhallgattat, a kategóriánkénti beállításokkal együtt."""
+    _overrides.clear()
+    configure(OFF)
+
+
+@contextmanager
+def silenced():
+    """A with-blokk idejére mindent elhallgattat, utána visszaállítja a korábbi szinteket."""
+    saved_level, saved_overrides = _default_level, dict(_overrides)
+    quiet()
+    try:
+        yield
+    finally:
+        _overrides.update(saved_overrides)
+        configure(saved_level)
+
+
+def configure_from_string(spec: str) -> None:
+    """
+    'info' vagy 'warn,snake=debug,phase4=off' alakú beállítás (pl. a SQUARES_TRACE
+    környezeti változóból): a kategória nélküli elem az alapszint. Ismeretlen szintnévre
+    ValueError, és ilyenkor semmit sem állítunk át.
+    """
+    level = None
+    categories = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '=' in item:
+            category, cat_level = item.split('=', 1)
+            categories[category.strip()] = _parse_level(cat_level.strip())
+        else:
+            level = _parse_level(item)
+    configure(level, categories)
+
+
+if os.environ.get('SQUARES_TRACE'):
+    try:
+        configure_from_string(os.environ['SQUARES_TRACE'])
+    except ValueError as e:
+        # egy elgépelt környezeti változó miatt ne álljon le az import
+        print(f'SQUARES_TRACE ignored: {e}', file=sys.stderr)
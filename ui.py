@@ -84,6 +84,19 @@ class RobotUI:
         
         self.canvas.bind('<Configure>', configure_canvas_width)
 
+    def _make_cell(self, i, j, val):
+        frame = tk.Frame(self.scrollable_frame, width=44, height=44, padx=2, pady=2, highlightbackground="black", highlightthickness=1)
+        frame.grid(row=i + 1, column=j, padx=1, pady=1)
+        frame.grid_propagate(False)  # fix méret
+
+        if val == 1:
+            label = tk.Label(frame, image=self.robot_img)
+            label.image = self.robot_img
+            label.pack(expand=True, fill="both")
+        else:
+            frame.config(bg="lightgray")
+        return frame
+
     def draw_matrix(self):
         for widget in self.labels:
             widget.destroy()
@@ -91,18 +104,7 @@ class RobotUI:
 
         for i, row in enumerate(self.matrix):
             for j, val in enumerate(row):
-                frame = tk.Frame(self.scrollable_frame, width=44, height=44, padx=2, pady=2, highlightbackground="black", highlightthickness=1)
-                frame.grid(row=i + 1, column=j, padx=1, pady=1)
-                frame.grid_propagate(False)  # fix méret
-
-                if val == 1:
-                    label = tk.Label(frame, image=self.robot_img)
-                    label.image = self.robot_img
-                    label.pack(expand=True, fill="both")
-                else:
-                    frame.config(bg="lightgray")
-
-                self.labels.append(frame)
+                self.labels.append(self._make_cell(i, j, val))
 
         matrix_rows = len(self.matrix)
         matrix_cols = len(self.matrix[0]) if matrix_rows > 0 else 0
@@ -139,6 +141,19 @@ class RobotUI:
         self.matrix = new_matrix
         self.draw_matrix()
 
+    def refresh_cells(self, new_matrix, changed):
+        """Csak a megváltozott (sor, oszlop) cellákat rajzolja újra; eltérő méretnél teljes újrarajzolás."""
+        cols = len(new_matrix[0]) if new_matrix else 0
+        if len(self.labels) != len(new_matrix) * cols:
+            self.update_matrix(new_matrix)
+            return
+        self.matrix = new_matrix
+        for i, j in changed:
+            k = i * cols + j
+            self.labels[k].destroy()
+            self.labels[k] = self._make_cell(i, j, new_matrix[i][j])
+        self.canvas.update_idletasks()
+
     def update_phase_label(self, text):
         self.title_label.config(text=text)
 
@@ -154,14 +169,14 @@ class RobotUI:
                         self.update_phase_label(phases_dict[self.phase_num])
             case 1:
                 if not self.phase_2:
-                    self.phase_2 = Phase2(self)
+                    self.phase_2 = Phase2(self, env=self.phase_1.env if self.phase_1 else None)
                 if self.phase_2.execute_step():
                     self.phase_num += 1
                     if self.phase_num in phases_dict:
                         self.update_phase_label(phases_dict[self.phase_num])
             case 2:
                 if not self.phase_3:
-                    self.phase_3 = Phase_3(self)
+                    self.phase_3 = Phase_3(self, env=self.phase_2.env if self.phase_2 else None)
                 if not self.sweep_done:
                     self.sweep_done = self.phase_3.execute_step()
                 elif self.phase_3.execute_histogram_step() == True:
@@ -170,7 +185,8 @@ class RobotUI:
                         self.update_phase_label(phases_dict[self.phase_num])
             case 3:
                 if not self.phase_4:
-                    self.phase_4 = phase_4.Phase4(self, "configurations/001-goal.txt")
+                    self.phase_4 = phase_4.Phase4(self, "configurations/001-goal.txt",
+                                                  env=self.phase_3.env if self.phase_3 else None)
                 self.phase_4.execute_step()
                 if self.phase_4.is_done():
                     self.phase_num += 1
@@ -5,8 +5,8 @@ import os
 from typing import Set, Tuple
 from collections import deque
 
-# Import connectivity check from skeleton
-from sturctures.skeleton import is_connected
+# Shared connectivity check (also used by the skeleton and scaffolding code)
+from connectivity import is_connected
 
 Pos = Tuple[int, int]
 CONFIGURATIONS_DIR = "configurations"
@@ -0,0 +1,35 @@
+from typing import Tuple
+
+Pos = Tuple[int, int]
+
+# Zobrist-hash a konfigurációkhoz: minden cellához (és (modul id, cella) párhoz) egy
+# 64 bites kulcs, a halmaz hash-e a kulcsok XOR-ja, így egy mozgás O(1)-ben frissíti.
+# Az Environment, a connectivity és a spanning_forest közösen használja.
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(z: int) -> int:
+    """splitmix64 keverés: a Zobrist-kulcsokat táblázat helyett a koordinátákból számoljuk."""
+    z = (z + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+def zobrist_key(pos: Pos) -> int:
+    """Egy foglalt cella 64 bites Zobrist-kulcsa."""
+    return _mix64(((pos[0] & 0xFFFFFFFF) << 32) | (pos[1] & 0xFFFFFFFF))
+
+
+def zobrist_labeled_key(mid: int, pos: Pos) -> int:
+    """Egy (modul id, cella) pár 64 bites Zobrist-kulcsa."""
+    return _mix64(zobrist_key(pos) ^ ((mid * 0xD6E8FEB86659FD93) & _MASK64))
+
+
+def configuration_hash(positions) -> int:
+    """Pozícióhalmaz Zobrist-hash-e; megegyezik az Environment.occupancy_hash értékével."""
+    h = 0
+    for pos in set(map(tuple, positions)):
+        h ^= zobrist_key(pos)
+    return h